@@ -1,13 +1,25 @@
 import os
 import sys
+import time
 import ctypes
+import ctypes.wintypes
 import subprocess
-import winreg
+import tempfile
+import random
+import array
+import struct
+import mmap
+import types
+import math
+import heapq
+import hashlib
+import uuid
 import argparse
 import logging
 import platform
 import json
 import psutil
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
 
 init(autoreset=True)
@@ -15,11 +27,2988 @@ init(autoreset=True)
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 status_logger = logging.getLogger(__name__)
 
+try:
+    import winreg
+except ImportError:
+    # Offline modes (simulated tuning, snapshot diffing) also run on non-Windows hosts
+    winreg = types.SimpleNamespace(
+        HKEY_CLASSES_ROOT=0x80000000, HKEY_CURRENT_USER=0x80000001, HKEY_LOCAL_MACHINE=0x80000002,
+        HKEY_USERS=0x80000003, HKEY_CURRENT_CONFIG=0x80000005,
+        REG_NONE=0, REG_SZ=1, REG_EXPAND_SZ=2, REG_BINARY=3, REG_DWORD=4, REG_MULTI_SZ=7, REG_QWORD=11
+    )
+
+SERVICE_START_TYPE_NAMES = {
+    0: "boot",
+    1: "system",
+    2: "automatic",
+    3: "manual",
+    4: "disabled"
+}
+
+SERVICE_STATE_NAMES = {
+    1: "stopped",
+    2: "start_pending",
+    3: "stop_pending",
+    4: "running",
+    5: "continue_pending",
+    6: "pause_pending",
+    7: "paused"
+}
+
+
+class SERVICE_STATUS(ctypes.Structure):
+    _fields_ = [
+        ("dwServiceType", ctypes.wintypes.DWORD),
+        ("dwCurrentState", ctypes.wintypes.DWORD),
+        ("dwControlsAccepted", ctypes.wintypes.DWORD),
+        ("dwWin32ExitCode", ctypes.wintypes.DWORD),
+        ("dwServiceSpecificExitCode", ctypes.wintypes.DWORD),
+        ("dwCheckPoint", ctypes.wintypes.DWORD),
+        ("dwWaitHint", ctypes.wintypes.DWORD)
+    ]
+
+
+class ENUM_SERVICE_STATUSW(ctypes.Structure):
+    _fields_ = [
+        ("lpServiceName", ctypes.wintypes.LPWSTR),
+        ("lpDisplayName", ctypes.wintypes.LPWSTR),
+        ("ServiceStatus", SERVICE_STATUS)
+    ]
+
+
+class SERVICE_STATUS_PROCESS(ctypes.Structure):
+    _fields_ = SERVICE_STATUS._fields_ + [
+        ("dwProcessId", ctypes.wintypes.DWORD),
+        ("dwServiceFlags", ctypes.wintypes.DWORD)
+    ]
+
+
+class ENUM_SERVICE_STATUS_PROCESSW(ctypes.Structure):
+    _fields_ = [
+        ("lpServiceName", ctypes.wintypes.LPWSTR),
+        ("lpDisplayName", ctypes.wintypes.LPWSTR),
+        ("ServiceStatusProcess", SERVICE_STATUS_PROCESS)
+    ]
+
+
+class WindowsServiceController:
+    SC_MANAGER_ALL_ACCESS = 0xF003F
+    SC_ENUM_PROCESS_INFO = 0
+    SERVICE_WIN32 = 0x00000030
+    SERVICE_STATE_ALL = 0x00000003
+    SERVICE_CHANGE_CONFIG = 0x0002
+    SERVICE_QUERY_STATUS = 0x0004
+    SERVICE_ENUMERATE_DEPENDENTS = 0x0008
+    SERVICE_STOP = 0x0020
+    SERVICE_NO_CHANGE = 0xFFFFFFFF
+    SERVICE_CONTROL_STOP = 0x00000001
+    SERVICE_ACTIVE = 0x00000001
+    SERVICE_STOPPED = 1
+    ERROR_MORE_DATA = 234
+    ERROR_SERVICE_CANNOT_ACCEPT_CTRL = 1061
+    ERROR_SERVICE_NOT_ACTIVE = 1062
+    ERROR_SERVICE_DOES_NOT_EXIST = 1060
+
+    def __init__(self, stop_deadline_seconds=30.0, initial_poll_interval=0.05, maximum_poll_interval=1.0):
+        self.stop_deadline_seconds = stop_deadline_seconds
+        self.initial_poll_interval = initial_poll_interval
+        self.maximum_poll_interval = maximum_poll_interval
+        self._advapi32 = None
+        self._manager_handle = None
+
+    def _ensure_manager_handle(self):
+        if self._manager_handle:
+            return self._manager_handle
+
+        advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+        advapi32.OpenSCManagerW.restype = ctypes.wintypes.HANDLE
+        advapi32.OpenSCManagerW.argtypes = [ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPCWSTR, ctypes.wintypes.DWORD]
+        advapi32.OpenServiceW.restype = ctypes.wintypes.HANDLE
+        advapi32.OpenServiceW.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.LPCWSTR, ctypes.wintypes.DWORD]
+        advapi32.CloseServiceHandle.argtypes = [ctypes.wintypes.HANDLE]
+        advapi32.QueryServiceStatus.argtypes = [ctypes.wintypes.HANDLE, ctypes.POINTER(SERVICE_STATUS)]
+        advapi32.ControlService.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.POINTER(SERVICE_STATUS)]
+        advapi32.ChangeServiceConfigW.argtypes = [
+            ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD,
+            ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPDWORD, ctypes.wintypes.LPCWSTR,
+            ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPCWSTR
+        ]
+        advapi32.EnumServicesStatusExW.argtypes = [
+            ctypes.wintypes.HANDLE, ctypes.c_int, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD, ctypes.c_void_p,
+            ctypes.wintypes.DWORD, ctypes.wintypes.LPDWORD, ctypes.wintypes.LPDWORD, ctypes.wintypes.LPDWORD, ctypes.wintypes.LPCWSTR
+        ]
+        advapi32.EnumDependentServicesW.argtypes = [
+            ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.c_void_p, ctypes.wintypes.DWORD,
+            ctypes.wintypes.LPDWORD, ctypes.wintypes.LPDWORD
+        ]
+
+        manager_handle = advapi32.OpenSCManagerW(None, None, self.SC_MANAGER_ALL_ACCESS)
+        if not manager_handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+
+        self._advapi32 = advapi32
+        self._manager_handle = manager_handle
+        return manager_handle
+
+    def _open_service(self, service_name, desired_access):
+        manager_handle = self._ensure_manager_handle()
+        service_handle = self._advapi32.OpenServiceW(manager_handle, service_name, desired_access)
+        if not service_handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        return service_handle
+
+    def _read_current_state(self, service_handle):
+        service_status = SERVICE_STATUS()
+        if not self._advapi32.QueryServiceStatus(service_handle, ctypes.byref(service_status)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return service_status.dwCurrentState
+
+    def close(self):
+        if self._manager_handle:
+            self._advapi32.CloseServiceHandle(self._manager_handle)
+            self._manager_handle = None
+
+    def query_service_states(self, service_names):
+        manager_handle = self._ensure_manager_handle()
+        requested_names = {service_name.lower(): service_name for service_name in service_names}
+        service_states = {service_name: {"state": "missing", "process_id": None} for service_name in service_names}
+
+        bytes_needed = ctypes.wintypes.DWORD(0)
+        services_returned = ctypes.wintypes.DWORD(0)
+        resume_handle = ctypes.wintypes.DWORD(0)
+        status_buffer, buffer_size = None, 0
+        while True:
+            enumeration_complete = self._advapi32.EnumServicesStatusExW(
+                manager_handle, self.SC_ENUM_PROCESS_INFO, self.SERVICE_WIN32, self.SERVICE_STATE_ALL,
+                status_buffer, buffer_size, ctypes.byref(bytes_needed), ctypes.byref(services_returned),
+                ctypes.byref(resume_handle), None
+            )
+            if not enumeration_complete and ctypes.get_last_error() != self.ERROR_MORE_DATA:
+                raise ctypes.WinError(ctypes.get_last_error())
+
+            if services_returned.value:
+                status_entries = ctypes.cast(status_buffer, ctypes.POINTER(ENUM_SERVICE_STATUS_PROCESSW))
+                for index in range(services_returned.value):
+                    requested_name = requested_names.get(status_entries[index].lpServiceName.lower())
+                    if requested_name is not None:
+                        service_status = status_entries[index].ServiceStatusProcess
+                        service_states[requested_name] = {
+                            "state": SERVICE_STATE_NAMES.get(service_status.dwCurrentState, str(service_status.dwCurrentState)),
+                            "process_id": service_status.dwProcessId or None
+                        }
+            if enumeration_complete:
+                return service_states
+            if bytes_needed.value > buffer_size:
+                buffer_size = bytes_needed.value
+                status_buffer = ctypes.create_string_buffer(buffer_size)
+
+    def configure_start_types(self, start_type_by_service):
+        configuration_results = {}
+        for service_name, start_type in start_type_by_service.items():
+            try:
+                service_handle = self._open_service(service_name, self.SERVICE_CHANGE_CONFIG)
+                try:
+                    if not self._advapi32.ChangeServiceConfigW(
+                        service_handle, self.SERVICE_NO_CHANGE, start_type, self.SERVICE_NO_CHANGE,
+                        None, None, None, None, None, None, None
+                    ):
+                        raise ctypes.WinError(ctypes.get_last_error())
+                finally:
+                    self._advapi32.CloseServiceHandle(service_handle)
+                configuration_results[service_name] = "scm"
+            except OSError as scm_error:
+                if getattr(scm_error, "winerror", None) == self.ERROR_SERVICE_DOES_NOT_EXIST:
+                    configuration_results[service_name] = "missing"
+                    continue
+                # Protected services (WaaSMedicSvc) reject SCM changes, fall back to the Start value
+                try:
+                    service_key_path = f"SYSTEM\\CurrentControlSet\\Services\\{service_name}"
+                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, service_key_path, 0, winreg.KEY_SET_VALUE) as service_key:
+                        winreg.SetValueEx(service_key, "Start", 0, winreg.REG_DWORD, start_type)
+                    configuration_results[service_name] = "registry"
+                except OSError as registry_error:
+                    configuration_results[service_name] = f"failed: {registry_error}"
+        return configuration_results
+
+    def _list_active_dependents(self, service_handle):
+        bytes_needed = ctypes.wintypes.DWORD(0)
+        services_returned = ctypes.wintypes.DWORD(0)
+        if self._advapi32.EnumDependentServicesW(
+            service_handle, self.SERVICE_ACTIVE, None, 0,
+            ctypes.byref(bytes_needed), ctypes.byref(services_returned)
+        ):
+            return []
+        if ctypes.get_last_error() != self.ERROR_MORE_DATA:
+            return []
+
+        dependent_buffer = ctypes.create_string_buffer(bytes_needed.value)
+        if not self._advapi32.EnumDependentServicesW(
+            service_handle, self.SERVICE_ACTIVE, dependent_buffer, bytes_needed,
+            ctypes.byref(bytes_needed), ctypes.byref(services_returned)
+        ):
+            return []
+
+        dependent_entries = ctypes.cast(dependent_buffer, ctypes.POINTER(ENUM_SERVICE_STATUSW))
+        return [dependent_entries[index].lpServiceName for index in range(services_returned.value)]
+
+    def _wait_for_state(self, service_handle, target_state, deadline):
+        poll_interval = self.initial_poll_interval
+        current_state = self._read_current_state(service_handle)
+        while current_state != target_state:
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                break
+            time.sleep(min(poll_interval, remaining_time))
+            poll_interval = min(poll_interval * 2, self.maximum_poll_interval)
+            current_state = self._read_current_state(service_handle)
+        return current_state
+
+    def stop_service(self, service_name, deadline=None):
+        started_at = time.monotonic()
+        deadline = deadline or started_at + self.stop_deadline_seconds
+        stop_result = {"service_name": service_name, "dependents": [], "final_state": None, "outcome": None}
+        try:
+            service_handle = self._open_service(
+                service_name, self.SERVICE_STOP | self.SERVICE_QUERY_STATUS | self.SERVICE_ENUMERATE_DEPENDENTS
+            )
+        except OSError as error:
+            stop_result["outcome"] = "missing" if getattr(error, "winerror", None) == self.ERROR_SERVICE_DOES_NOT_EXIST else f"failed: {error}"
+            stop_result["elapsed_seconds"] = time.monotonic() - started_at
+            return stop_result
+
+        try:
+            for dependent_name in self._list_active_dependents(service_handle):
+                dependent_result = self.stop_service(dependent_name, deadline)
+                stop_result["dependents"].append(dependent_result)
+
+            service_status = SERVICE_STATUS()
+            if not self._advapi32.ControlService(service_handle, self.SERVICE_CONTROL_STOP, ctypes.byref(service_status)):
+                control_error = ctypes.get_last_error()
+                # A service already stopping (or still starting) rejects the control; wait for STOPPED instead
+                if control_error not in (self.ERROR_SERVICE_NOT_ACTIVE, self.ERROR_SERVICE_CANNOT_ACCEPT_CTRL):
+                    raise ctypes.WinError(control_error)
+
+            final_state = self._wait_for_state(service_handle, self.SERVICE_STOPPED, deadline)
+            stop_result["final_state"] = SERVICE_STATE_NAMES.get(final_state, str(final_state))
+            stop_result["outcome"] = "stopped" if final_state == self.SERVICE_STOPPED else "timeout"
+        except OSError as error:
+            stop_result["outcome"] = f"failed: {error}"
+        finally:
+            self._advapi32.CloseServiceHandle(service_handle)
+
+        stop_result["elapsed_seconds"] = time.monotonic() - started_at
+        return stop_result
+
+    def stop_services_concurrently(self, service_names):
+        self._ensure_manager_handle()
+        deadline = time.monotonic() + self.stop_deadline_seconds
+        with ThreadPoolExecutor(max_workers=max(1, len(service_names))) as executor:
+            return list(executor.map(lambda service_name: self.stop_service(service_name, deadline), service_names))
+
+
+class DeadlineCommandRunner:
+    def __init__(self, default_timeout_seconds=120.0, run_budget_seconds=None, termination_grace_seconds=3.0):
+        self.default_timeout_seconds = default_timeout_seconds
+        self.run_budget_seconds = run_budget_seconds
+        self.termination_grace_seconds = termination_grace_seconds
+        self.run_started_at = time.monotonic()
+        self.command_statistics = {
+            "commands": 0,
+            "completed": 0,
+            "timeouts": 0,
+            "retries": 0,
+            "budget_skips": 0,
+            "command_seconds": 0.0,
+            "timed_out_commands": []
+        }
+
+    def remaining_budget(self):
+        if self.run_budget_seconds is None:
+            return None
+        return self.run_budget_seconds - (time.monotonic() - self.run_started_at)
+
+    def terminate_process_tree(self, root_pid):
+        try:
+            root_process = psutil.Process(root_pid)
+            tree_processes = root_process.children(recursive=True) + [root_process]
+        except psutil.NoSuchProcess:
+            return 0
+
+        for tree_process in tree_processes:
+            try:
+                tree_process.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        _, surviving_processes = psutil.wait_procs(tree_processes, timeout=self.termination_grace_seconds)
+        for tree_process in surviving_processes:
+            try:
+                tree_process.kill()
+            except psutil.NoSuchProcess:
+                pass
+        psutil.wait_procs(surviving_processes, timeout=self.termination_grace_seconds)
+        return len(tree_processes)
+
+    def _run_once(self, shell_command, timeout_seconds, text):
+        started_at = time.monotonic()
+        process = subprocess.Popen(
+            shell_command, shell=isinstance(shell_command, str),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout_seconds)
+        except subprocess.TimeoutExpired:
+            self.terminate_process_tree(process.pid)
+            try:
+                stdout, stderr = process.communicate(timeout=self.termination_grace_seconds)
+            except subprocess.TimeoutExpired as drain_timeout:
+                stdout, stderr = drain_timeout.output, drain_timeout.stderr
+                for pipe_stream in (process.stdout, process.stderr):
+                    if pipe_stream is not None:
+                        pipe_stream.close()
+            raise subprocess.TimeoutExpired(shell_command, timeout_seconds, output=stdout, stderr=stderr)
+        finally:
+            self.command_statistics["command_seconds"] += time.monotonic() - started_at
+        return subprocess.CompletedProcess(shell_command, process.returncode, stdout, stderr)
+
+    def run(self, shell_command, timeout_seconds=None, retries=0, retry_base_delay=1.0, check=False, text=False):
+        timeout_seconds = timeout_seconds or self.default_timeout_seconds
+        self.command_statistics["commands"] += 1
+
+        for attempt_number in range(retries + 1):
+            remaining_budget = self.remaining_budget()
+            if remaining_budget is not None and remaining_budget <= 0:
+                self.command_statistics["budget_skips"] += 1
+                raise subprocess.TimeoutExpired(shell_command, 0)
+            effective_timeout = timeout_seconds if remaining_budget is None else min(timeout_seconds, remaining_budget)
+
+            try:
+                completed_process = self._run_once(shell_command, effective_timeout, text)
+            except subprocess.TimeoutExpired:
+                self.command_statistics["timeouts"] += 1
+                if attempt_number == retries:
+                    self.command_statistics["timed_out_commands"].append({
+                        "command": shell_command if isinstance(shell_command, str) else " ".join(shell_command),
+                        "timeout_seconds": round(effective_timeout, 1),
+                        "attempts": attempt_number + 1
+                    })
+                    raise
+                self.command_statistics["retries"] += 1
+                time.sleep(retry_base_delay * (2 ** attempt_number) * random.uniform(0.5, 1.5))
+                continue
+
+            self.command_statistics["completed"] += 1
+            if check and completed_process.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    completed_process.returncode, shell_command, completed_process.stdout, completed_process.stderr
+                )
+            return completed_process
+
+
+class RunCheckpointJournal:
+    def __init__(self, journal_path, sync_batch_size=16, sync_interval_seconds=2.0):
+        self.journal_path = journal_path
+        self.sync_batch_size = sync_batch_size
+        self.sync_interval_seconds = sync_interval_seconds
+        self.completed_stages = set()
+        self.completed_commands = set()
+        self.started_stages = []
+        self.run_options = None
+        self.run_completed = False
+        self.unsynced_records = 0
+        self.last_sync_at = time.monotonic()
+        self.journal_file = None
+
+    def load(self):
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as journal_file:
+                journal_lines = journal_file.read().splitlines()
+        except FileNotFoundError:
+            return False
+
+        for journal_line in journal_lines:
+            try:
+                journal_record = json.loads(journal_line)
+            except ValueError:
+                break
+            record_event = journal_record.get("event")
+            if record_event == "run_started":
+                self.run_options = journal_record.get("options")
+            elif record_event == "stage_started":
+                self.started_stages.append(journal_record["stage"])
+            elif record_event == "stage_completed":
+                self.completed_stages.add(journal_record["stage"])
+            elif record_event == "command_completed":
+                self.completed_commands.add(journal_record["command"])
+            elif record_event == "run_completed":
+                self.run_completed = True
+        return True
+
+    def in_flight_stage(self):
+        for stage_key in reversed(self.started_stages):
+            if stage_key not in self.completed_stages:
+                return stage_key
+        return None
+
+    def open(self, run_options, resume):
+        if resume:
+            self.journal_file = open(self.journal_path, "a", encoding="utf-8")
+            self.append({"event": "run_resumed", "options": run_options}, force_sync=True)
+        else:
+            self.completed_stages.clear()
+            self.completed_commands.clear()
+            self.started_stages.clear()
+            self.run_completed = False
+            self.journal_file = open(self.journal_path, "w", encoding="utf-8")
+            self.append({"event": "run_started", "options": run_options}, force_sync=True)
+
+    def append(self, journal_record, force_sync=False):
+        if self.journal_file is None:
+            return
+        journal_record["at"] = round(time.time(), 3)
+        self.journal_file.write(json.dumps(journal_record, ensure_ascii=False) + "\n")
+        self.unsynced_records += 1
+        if (force_sync or self.unsynced_records >= self.sync_batch_size
+                or time.monotonic() - self.last_sync_at >= self.sync_interval_seconds):
+            self.sync()
+
+    def sync(self):
+        if self.journal_file is None or not self.unsynced_records:
+            return
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+        self.unsynced_records = 0
+        self.last_sync_at = time.monotonic()
+
+    def record_stage_started(self, stage_key):
+        self.started_stages.append(stage_key)
+        self.append({"event": "stage_started", "stage": stage_key})
+
+    def record_stage_completed(self, stage_key):
+        self.completed_stages.add(stage_key)
+        self.append({"event": "stage_completed", "stage": stage_key}, force_sync=True)
+
+    def record_command_completed(self, command_key):
+        self.completed_commands.add(command_key)
+        self.append({"event": "command_completed", "command": command_key})
+
+    def close(self, run_completed=False):
+        if run_completed:
+            self.run_completed = True
+            self.append({"event": "run_completed"}, force_sync=True)
+        self.sync()
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+
+
+REGISTRY_HIVE_NAMES = {
+    winreg.HKEY_LOCAL_MACHINE: "HKEY_LOCAL_MACHINE",
+    winreg.HKEY_CURRENT_USER: "HKEY_CURRENT_USER",
+    winreg.HKEY_USERS: "HKEY_USERS",
+    winreg.HKEY_CLASSES_ROOT: "HKEY_CLASSES_ROOT",
+    winreg.HKEY_CURRENT_CONFIG: "HKEY_CURRENT_CONFIG"
+}
+
+REGISTRY_HIVES_BY_NAME = {
+    **{hive_name: hive_root for hive_root, hive_name in REGISTRY_HIVE_NAMES.items()},
+    "HKLM": winreg.HKEY_LOCAL_MACHINE,
+    "HKCU": winreg.HKEY_CURRENT_USER,
+    "HKU": winreg.HKEY_USERS,
+    "HKCR": winreg.HKEY_CLASSES_ROOT,
+    "HKCC": winreg.HKEY_CURRENT_CONFIG
+}
+
+REGISTRY_TYPE_NAMES = {
+    winreg.REG_NONE: "REG_NONE",
+    winreg.REG_SZ: "REG_SZ",
+    winreg.REG_EXPAND_SZ: "REG_EXPAND_SZ",
+    winreg.REG_BINARY: "REG_BINARY",
+    winreg.REG_DWORD: "REG_DWORD",
+    winreg.REG_MULTI_SZ: "REG_MULTI_SZ",
+    winreg.REG_QWORD: "REG_QWORD"
+}
+
+
+def iterate_entry_values(optimization_entry):
+    if "multiple_entries" in optimization_entry:
+        yield from optimization_entry["multiple_entries"].items()
+    elif "entry_name" in optimization_entry:
+        yield optimization_entry["entry_name"], optimization_entry["entry_value"]
+
+
+def describe_catalog_entry(optimization_entry):
+    def readable_value(value):
+        if isinstance(value, bytes):
+            return value.hex(",")
+        return value
+
+    described_entry = {}
+    for field_name, field_value in optimization_entry.items():
+        if field_name == "hive_root":
+            field_value = REGISTRY_HIVE_NAMES.get(field_value, field_value)
+        elif field_name == "data_type":
+            field_value = REGISTRY_TYPE_NAMES.get(field_value, field_value)
+        elif field_name == "multiple_entries":
+            field_value = {name: readable_value(value) for name, value in field_value.items()}
+        elif field_name == "entry_value":
+            field_value = readable_value(field_value)
+        described_entry[field_name] = field_value
+    return described_entry
+
+
+class RegistryFileCodec:
+    HEADER_UNICODE = "Windows Registry Editor Version 5.00"
+    HEADER_ANSI = "REGEDIT4"
+    ANSI_STRING_ENCODING = "mbcs" if os.name == "nt" else "cp1251"
+
+    def decode_file_bytes(self, raw_bytes):
+        if raw_bytes.startswith(b"\xff\xfe"):
+            return raw_bytes[2:].decode("utf-16-le")
+        if raw_bytes.startswith(b"\xfe\xff"):
+            return raw_bytes[2:].decode("utf-16-be")
+        if raw_bytes.startswith(b"\xef\xbb\xbf"):
+            return raw_bytes[3:].decode("utf-8")
+        if len(raw_bytes) > 1 and raw_bytes[1] == 0:
+            return raw_bytes.decode("utf-16-le")
+        try:
+            return raw_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            return raw_bytes.decode("cp1251", errors="replace")
+
+    def parse_file(self, file_path):
+        with open(file_path, "rb") as registry_file:
+            file_text = self.decode_file_bytes(registry_file.read())
+        return self.parse_text(file_text, os.path.splitext(os.path.basename(file_path))[0])
+
+    def parse_paths(self, registry_file_paths):
+        catalog_entries = []
+        for registry_file_path in registry_file_paths:
+            if os.path.isdir(registry_file_path):
+                nested_paths = sorted(
+                    os.path.join(registry_file_path, file_name)
+                    for file_name in os.listdir(registry_file_path) if file_name.lower().endswith(".reg")
+                )
+                catalog_entries.extend(self.parse_paths(nested_paths))
+            else:
+                catalog_entries.extend(self.parse_file(registry_file_path))
+        return catalog_entries
+
+    def _join_continuation_lines(self, file_text):
+        logical_lines = []
+        pending_line = None
+        for raw_line in file_text.splitlines():
+            line = raw_line.strip() if pending_line is not None else raw_line.rstrip()
+            if pending_line is not None:
+                line = pending_line + line
+                pending_line = None
+            if line.endswith("\\") and "=hex" in line:
+                pending_line = line[:-1]
+                continue
+            logical_lines.append(line)
+        if pending_line is not None:
+            logical_lines.append(pending_line)
+        return logical_lines
+
+    def _read_quoted_string(self, text, start_index):
+        if text[start_index] != '"':
+            raise ValueError(f"Expected quoted string: {text}")
+        characters = []
+        index = start_index + 1
+        while index < len(text):
+            character = text[index]
+            if character == "\\" and index + 1 < len(text):
+                characters.append(text[index + 1])
+                index += 2
+                continue
+            if character == '"':
+                return "".join(characters), index + 1
+            characters.append(character)
+            index += 1
+        raise ValueError(f"Unterminated string: {text}")
+
+    def _decode_hex_bytes(self, hex_text):
+        hex_digits = [byte_text.strip() for byte_text in hex_text.split(",") if byte_text.strip()]
+        return bytes(int(byte_text, 16) for byte_text in hex_digits)
+
+    def _decode_registry_string(self, raw_bytes, string_encoding):
+        terminator = "\x00".encode(string_encoding)
+        if raw_bytes.endswith(terminator):
+            raw_bytes = raw_bytes[:-len(terminator)]
+        return raw_bytes.decode(string_encoding, errors="replace")
+
+    def _decode_value_data(self, data_text, string_encoding="utf-16-le"):
+        if data_text.startswith('"'):
+            string_value, _ = self._read_quoted_string(data_text, 0)
+            return string_value, winreg.REG_SZ
+        if data_text.lower().startswith("dword:"):
+            return int(data_text[6:], 16), winreg.REG_DWORD
+        if data_text.lower().startswith("hex:"):
+            return self._decode_hex_bytes(data_text[4:]), winreg.REG_BINARY
+        if data_text.lower().startswith("hex("):
+            type_end = data_text.index(")")
+            data_type = int(data_text[4:type_end], 16)
+            raw_bytes = self._decode_hex_bytes(data_text[type_end + 2:])
+            if data_type == winreg.REG_EXPAND_SZ:
+                return self._decode_registry_string(raw_bytes, string_encoding).rstrip("\x00"), data_type
+            if data_type == winreg.REG_MULTI_SZ:
+                multi_string_text = self._decode_registry_string(raw_bytes, string_encoding)
+                if multi_string_text.endswith("\x00"):
+                    multi_string_text = multi_string_text[:-1]
+                return (multi_string_text.split("\x00") if multi_string_text else []), data_type
+            if data_type == winreg.REG_QWORD:
+                return int.from_bytes(raw_bytes, "little"), data_type
+            if data_type == winreg.REG_DWORD:
+                return int.from_bytes(raw_bytes, "little"), data_type
+            return raw_bytes, data_type
+        raise ValueError(f"Unsupported value data: {data_text}")
+
+    def _split_key_path(self, full_key_path):
+        hive_name, _, registry_path = full_key_path.partition("\\")
+        if hive_name.upper() not in REGISTRY_HIVES_BY_NAME:
+            raise ValueError(f"Unknown registry hive: {hive_name}")
+        return REGISTRY_HIVES_BY_NAME[hive_name.upper()], registry_path
+
+    def parse_text(self, file_text, source_name="registry file"):
+        logical_lines = [line for line in self._join_continuation_lines(file_text.lstrip("﻿")) if line.strip()]
+        if not logical_lines or logical_lines[0].strip() not in (self.HEADER_UNICODE, self.HEADER_ANSI):
+            raise ValueError(f"{source_name}: missing registry editor header")
+        string_encoding = self.ANSI_STRING_ENCODING if logical_lines[0].strip() == self.HEADER_ANSI else "utf-16-le"
+
+        catalog_entries = []
+        current_key = None
+        grouped_values = {}
+        deleted_values = []
+
+        def flush_current_key():
+            if current_key is None:
+                return
+            hive_root, registry_path = current_key
+            key_leaf_name = registry_path.rsplit("\\", 1)[-1]
+            for data_type, values in grouped_values.items():
+                catalog_entry = {"registry_path": registry_path}
+                if len(values) == 1:
+                    (entry_name, entry_value), = values.items()
+                    catalog_entry["entry_name"] = entry_name
+                    catalog_entry["entry_value"] = entry_value
+                else:
+                    catalog_entry["multiple_entries"] = dict(values)
+                catalog_entry.update({
+                    "data_type": data_type,
+                    "hive_root": hive_root,
+                    "task_description": f"{source_name} ({key_leaf_name})"
+                })
+                catalog_entries.append(catalog_entry)
+            if deleted_values:
+                catalog_entries.append({
+                    "registry_path": registry_path,
+                    "delete_entries": list(deleted_values),
+                    "hive_root": hive_root,
+                    "task_description": f"{source_name} (remove values)"
+                })
+
+        for line in logical_lines[1:]:
+            stripped_line = line.strip()
+            if stripped_line.startswith(";"):
+                continue
+
+            if stripped_line.startswith("[") and stripped_line.endswith("]"):
+                flush_current_key()
+                grouped_values = {}
+                deleted_values = []
+                key_text = stripped_line[1:-1]
+                if key_text.startswith("-"):
+                    hive_root, registry_path = self._split_key_path(key_text[1:])
+                    catalog_entries.append({
+                        "registry_path": registry_path,
+                        "delete_key": True,
+                        "hive_root": hive_root,
+                        "task_description": f"{source_name} (remove key)"
+                    })
+                    current_key = None
+                else:
+                    current_key = self._split_key_path(key_text)
+                continue
+
+            if current_key is None:
+                raise ValueError(f"{source_name}: value outside of a key: {stripped_line}")
+
+            if stripped_line.startswith("@"):
+                entry_name, separator_index = "", 1
+            else:
+                entry_name, separator_index = self._read_quoted_string(stripped_line, 0)
+            data_text = stripped_line[separator_index:].lstrip()
+            if not data_text.startswith("="):
+                raise ValueError(f"{source_name}: malformed value line: {stripped_line}")
+            data_text = data_text[1:].strip()
+
+            if data_text == "-":
+                deleted_values.append(entry_name)
+                continue
+
+            entry_value, data_type = self._decode_value_data(data_text, string_encoding)
+            grouped_values.setdefault(data_type, {})[entry_name] = entry_value
+
+        flush_current_key()
+        return catalog_entries
+
+    def _encode_string(self, text):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    def _encode_value_data(self, entry_value, data_type):
+        if data_type == winreg.REG_SZ:
+            return self._encode_string(str(entry_value))
+        if data_type == winreg.REG_DWORD:
+            return f"dword:{int(entry_value) & 0xFFFFFFFF:08x}"
+        if data_type == winreg.REG_BINARY:
+            return "hex:" + bytes(entry_value).hex(",")
+        if data_type == winreg.REG_EXPAND_SZ:
+            raw_bytes = (str(entry_value) + "\x00").encode("utf-16-le")
+        elif data_type == winreg.REG_MULTI_SZ:
+            raw_bytes = "".join(item + "\x00" for item in entry_value).encode("utf-16-le") + b"\x00\x00"
+        elif data_type == winreg.REG_QWORD:
+            raw_bytes = int(entry_value).to_bytes(8, "little")
+        else:
+            raw_bytes = bytes(entry_value)
+        return f"hex({data_type:x}):" + raw_bytes.hex(",")
+
+    def compile_entries(self, catalog_entries):
+        output_lines = [self.HEADER_UNICODE]
+        open_key_text = None
+        for catalog_entry in catalog_entries:
+            key_text = f"{REGISTRY_HIVE_NAMES[catalog_entry['hive_root']]}\\{catalog_entry['registry_path']}"
+            if catalog_entry.get("delete_key"):
+                output_lines.extend(["", f"[-{key_text}]"])
+                open_key_text = None
+                continue
+            if key_text != open_key_text:
+                output_lines.extend(["", f"[{key_text}]"])
+                open_key_text = key_text
+            for entry_name in catalog_entry.get("delete_entries", []):
+                output_lines.append(f"{'@' if entry_name == '' else self._encode_string(entry_name)}=-")
+            for entry_name, entry_value in iterate_entry_values(catalog_entry):
+                encoded_name = "@" if entry_name == "" else self._encode_string(entry_name)
+                output_lines.append(f"{encoded_name}={self._encode_value_data(entry_value, catalog_entry['data_type'])}")
+        return "\r\n".join(output_lines) + "\r\n\r\n"
+
+    def write_bundle(self, catalog_entries, output_path):
+        with open(output_path, "wb") as bundle_file:
+            bundle_file.write(b"\xff\xfe" + self.compile_entries(catalog_entries).encode("utf-16-le"))
+        return output_path
+
+
+def canonical_registry_path(registry_path):
+    registry_path = registry_path.strip("\\")
+    if registry_path.lower().startswith("system\\controlset001\\"):
+        return "SYSTEM\\CurrentControlSet\\" + registry_path[len("system\\controlset001\\"):]
+    return registry_path
+
+
+def normalize_registry_key(hive_root, registry_path):
+    normalized_path = registry_path.strip("\\").lower()
+    if normalized_path.startswith("system\\controlset001\\"):
+        normalized_path = "system\\currentcontrolset\\" + normalized_path[len("system\\controlset001\\"):]
+    return hive_root, normalized_path
+
+
+class OptimizationPlanCompiler:
+    def compile(self, registry_stages):
+        key_groups = {}
+        subkey_templates = []
+        service_start_types = {}
+        diagnostics = {"redundant": [], "conflicts": [], "superseded": []}
+        catalog_value_count = 0
+
+        def group_for(optimization_entry):
+            group_key = normalize_registry_key(optimization_entry["hive_root"], optimization_entry["registry_path"])
+            if group_key not in key_groups:
+                key_groups[group_key] = {
+                    "hive_root": optimization_entry["hive_root"],
+                    "registry_path": canonical_registry_path(optimization_entry["registry_path"]),
+                    "delete_key": False,
+                    "values": {}
+                }
+            return key_groups[group_key]
+
+        for stage_number, _, stage_entries in registry_stages:
+            for optimization_entry in stage_entries:
+                if optimization_entry.get("managed_service"):
+                    service_start_types[optimization_entry["managed_service"]] = optimization_entry["entry_value"]
+                    continue
+                if optimization_entry.get("apply_to_all_subkeys"):
+                    subkey_templates.append(dict(optimization_entry, stage_number=stage_number))
+                    continue
+
+                if optimization_entry.get("delete_key"):
+                    deleted_key = normalize_registry_key(optimization_entry["hive_root"], optimization_entry["registry_path"])
+                    for group_key, key_group in list(key_groups.items()):
+                        if group_key[0] == deleted_key[0] and (group_key[1] + "\\").startswith(deleted_key[1] + "\\"):
+                            for planned_value in key_group["values"].values():
+                                diagnostics["superseded"].append({
+                                    "target": f"{REGISTRY_HIVE_NAMES[key_group['hive_root']]}\\{key_group['registry_path']}\\{planned_value['entry_name']}",
+                                    "by_stage": stage_number,
+                                    "reason": "key deleted later"
+                                })
+                            del key_groups[group_key]
+                    group_for(optimization_entry)["delete_key"] = True
+                    continue
+
+                key_group = group_for(optimization_entry)
+                for value_name in optimization_entry.get("delete_entries", []):
+                    planned_value = key_group["values"].get(value_name.lower())
+                    if planned_value and planned_value["action"] == "set":
+                        diagnostics["superseded"].append({
+                            "target": f"{REGISTRY_HIVE_NAMES[key_group['hive_root']]}\\{key_group['registry_path']}\\{value_name}",
+                            "by_stage": stage_number,
+                            "reason": "value deleted later"
+                        })
+                    key_group["values"][value_name.lower()] = {
+                        "action": "delete", "entry_name": value_name, "stages": [stage_number]
+                    }
+
+                for value_name, entry_value in iterate_entry_values(optimization_entry):
+                    catalog_value_count += 1
+                    data_type = optimization_entry["data_type"]
+                    target = f"{REGISTRY_HIVE_NAMES[key_group['hive_root']]}\\{key_group['registry_path']}\\{value_name}"
+                    planned_value = key_group["values"].get(value_name.lower())
+
+                    if planned_value and planned_value["action"] == "set":
+                        if planned_value["entry_value"] == entry_value and planned_value["data_type"] == data_type:
+                            planned_value["stages"].append(stage_number)
+                            diagnostics["redundant"].append({
+                                "target": target,
+                                "stages": list(planned_value["stages"]),
+                                "task_description": optimization_entry["task_description"]
+                            })
+                            continue
+                        diagnostics["conflicts"].append({
+                            "target": target,
+                            "previous": {
+                                "stages": list(planned_value["stages"]),
+                                "entry_value": planned_value["entry_value"],
+                                "data_type": REGISTRY_TYPE_NAMES.get(planned_value["data_type"], planned_value["data_type"])
+                            },
+                            "winning": {
+                                "stages": [stage_number],
+                                "entry_value": entry_value,
+                                "data_type": REGISTRY_TYPE_NAMES.get(data_type, data_type)
+                            }
+                        })
+
+                    key_group["values"][value_name.lower()] = {
+                        "action": "set",
+                        "entry_name": value_name,
+                        "entry_value": entry_value,
+                        "data_type": data_type,
+                        "stages": [stage_number],
+                        "task_description": optimization_entry["task_description"]
+                    }
+
+        ordered_groups = sorted(
+            key_groups.items(),
+            key=lambda item: (not item[1]["delete_key"], REGISTRY_HIVE_NAMES[item[0][0]], item[0][1].split("\\"))
+        )
+        planned_key_groups = [
+            {
+                "hive_root": key_group["hive_root"],
+                "registry_path": key_group["registry_path"],
+                "delete_key": key_group["delete_key"],
+                "values": list(key_group["values"].values())
+            }
+            for _, key_group in ordered_groups
+        ]
+
+        return {
+            "key_groups": planned_key_groups,
+            "subkey_templates": subkey_templates,
+            "service_start_types": service_start_types,
+            "diagnostics": diagnostics,
+            "statistics": {
+                "catalog_values": catalog_value_count,
+                "planned_values": sum(
+                    1 for key_group in planned_key_groups for planned_value in key_group["values"] if planned_value["action"] == "set"
+                ),
+                "keys": len(planned_key_groups),
+                "redundant_writes": len(diagnostics["redundant"]),
+                "conflicts": len(diagnostics["conflicts"])
+            }
+        }
+
+    def plan_to_catalog_entries(self, optimization_plan):
+        catalog_entries = []
+        for key_group in optimization_plan["key_groups"]:
+            if key_group["delete_key"]:
+                catalog_entries.append({
+                    "registry_path": key_group["registry_path"],
+                    "delete_key": True,
+                    "hive_root": key_group["hive_root"],
+                    "task_description": "Planned key removal"
+                })
+            deleted_names = [value["entry_name"] for value in key_group["values"] if value["action"] == "delete"]
+            if deleted_names:
+                catalog_entries.append({
+                    "registry_path": key_group["registry_path"],
+                    "delete_entries": deleted_names,
+                    "hive_root": key_group["hive_root"],
+                    "task_description": "Planned value removal"
+                })
+            values_by_type = {}
+            for planned_value in key_group["values"]:
+                if planned_value["action"] == "set":
+                    values_by_type.setdefault(planned_value["data_type"], {})[planned_value["entry_name"]] = planned_value["entry_value"]
+            for data_type, values in values_by_type.items():
+                catalog_entries.append({
+                    "registry_path": key_group["registry_path"],
+                    "multiple_entries": values,
+                    "data_type": data_type,
+                    "hive_root": key_group["hive_root"],
+                    "task_description": "Planned value writes"
+                })
+        return catalog_entries
+
+    def describe_plan(self, optimization_plan):
+        def readable_value(value):
+            return value.hex(",") if isinstance(value, bytes) else value
+
+        return {
+            "statistics": optimization_plan["statistics"],
+            "diagnostics": optimization_plan["diagnostics"],
+            "service_start_types": {
+                service_name: SERVICE_START_TYPE_NAMES.get(start_type, start_type)
+                for service_name, start_type in optimization_plan["service_start_types"].items()
+            },
+            "subkey_templates": [describe_catalog_entry(template) for template in optimization_plan["subkey_templates"]],
+            "key_groups": [
+                {
+                    "key": f"{REGISTRY_HIVE_NAMES[key_group['hive_root']]}\\{key_group['registry_path']}",
+                    "delete_key": key_group["delete_key"],
+                    "values": [
+                        {
+                            **planned_value,
+                            **({"entry_value": readable_value(planned_value["entry_value"]),
+                                "data_type": REGISTRY_TYPE_NAMES.get(planned_value["data_type"], planned_value["data_type"])}
+                               if planned_value["action"] == "set" else {})
+                        }
+                        for planned_value in key_group["values"]
+                    ]
+                }
+                for key_group in optimization_plan["key_groups"]
+            ]
+        }
+
+
+class SampleRingBuffer:
+    def __init__(self, column_names, capacity):
+        self.column_names = list(column_names)
+        self.column_count = len(self.column_names)
+        self.capacity = capacity
+        self.timestamps = array.array('d', bytes(8 * capacity))
+        self.values = array.array('d', bytes(8 * capacity * self.column_count))
+        self.write_index = 0
+        self.sample_count = 0
+
+    def row_offset(self):
+        return self.write_index * self.column_count
+
+    def commit_row(self, timestamp):
+        self.timestamps[self.write_index] = timestamp
+        self.write_index = (self.write_index + 1) % self.capacity
+        self.sample_count = min(self.sample_count + 1, self.capacity)
+
+    def column_window(self, column_index, window_samples):
+        window_samples = min(window_samples, self.sample_count)
+        newest_index = self.write_index - 1
+        return [
+            self.values[((newest_index - offset) % self.capacity) * self.column_count + column_index]
+            for offset in range(window_samples)
+        ]
+
+
+class RealTimeMetricsSampler:
+    BINARY_LOG_MAGIC = b"ANTM"
+    BINARY_LOG_VERSION = 1
+
+    def __init__(self, sample_rate_hz=5.0, window_seconds=60.0, export_interval_seconds=5.0,
+                 textfile_path="antweaker.prom", binary_log_path="antweaker_metrics.bin",
+                 top_process_count=5, process_scan_interval_seconds=5.0, slow_counter_interval_seconds=1.0):
+        self.sample_interval = 1.0 / sample_rate_hz
+        self.window_samples = max(1, int(window_seconds * sample_rate_hz))
+        self.export_interval_seconds = export_interval_seconds
+        self.textfile_path = textfile_path
+        self.binary_log_path = binary_log_path
+        self.top_process_count = top_process_count
+        self.process_scan_interval_seconds = process_scan_interval_seconds
+        self.slow_counter_interval_seconds = slow_counter_interval_seconds
+
+        self.core_count = psutil.cpu_count(logical=True) or 1
+        self.has_dpc_time = hasattr(psutil.cpu_times(), "dpc")
+        column_names = [f"cpu_core_{core_index}_percent" for core_index in range(self.core_count)]
+        column_names += [
+            "cpu_total_percent",
+            "dpc_percent" if self.has_dpc_time else "softirq_percent",
+            "interrupt_percent",
+            "context_switches_per_second",
+            "interrupts_per_second",
+            "soft_interrupts_per_second",
+            "disk_read_bytes_per_second",
+            "disk_write_bytes_per_second",
+            "net_sent_bytes_per_second",
+            "net_recv_bytes_per_second",
+            "memory_available_bytes"
+        ]
+        self.ring_buffer = SampleRingBuffer(column_names, self.window_samples)
+        self.previous_core_times = array.array('d', bytes(8 * self.core_count * 4))
+        self.binary_record = struct.Struct("<d" + "f" * len(column_names))
+        self.previous_fast_counters = None
+        self.previous_slow_counters = None
+        self.previous_process_times = {}
+        self.top_processes = []
+        self.monitor_process = psutil.Process()
+        self.sampler_cpu_percent = 0.0
+
+    def _read_fast_counters(self):
+        cpu_statistics = psutil.cpu_stats()
+        return (time.monotonic(), cpu_statistics.ctx_switches, cpu_statistics.interrupts, cpu_statistics.soft_interrupts)
+
+    def _read_slow_counters(self):
+        disk_counters = psutil.disk_io_counters(nowrap=False)
+        network_counters = psutil.net_io_counters(nowrap=False)
+        return (
+            time.monotonic(),
+            disk_counters.read_bytes if disk_counters else 0,
+            disk_counters.write_bytes if disk_counters else 0,
+            network_counters.bytes_sent,
+            network_counters.bytes_recv,
+            psutil.virtual_memory().available
+        )
+
+    def _write_counter_rates(self, values, first_column, current_counters, previous_counters):
+        if previous_counters is None:
+            for counter_index in range(1, len(current_counters)):
+                values[first_column + counter_index - 1] = 0.0
+            return
+        elapsed = (current_counters[0] - previous_counters[0]) or self.sample_interval
+        for counter_index in range(1, len(current_counters)):
+            counter_delta = current_counters[counter_index] - previous_counters[counter_index]
+            values[first_column + counter_index - 1] = counter_delta / elapsed if counter_delta > 0 else 0.0
+
+    def _sample_core_times(self, values, offset):
+        previous_core_times = self.previous_core_times
+        busy_percent_sum = 0.0
+        deferred_delta_sum = 0.0
+        interrupt_delta_sum = 0.0
+        total_delta_sum = 0.0
+
+        for core_index, core_times in enumerate(psutil.cpu_times(percpu=True)[:self.core_count]):
+            total_time = sum(core_times)
+            idle_time = core_times.idle + getattr(core_times, "iowait", 0.0)
+            deferred_time = core_times.dpc if self.has_dpc_time else getattr(core_times, "softirq", 0.0)
+            interrupt_time = getattr(core_times, "interrupt", getattr(core_times, "irq", 0.0))
+
+            slot = core_index * 4
+            total_delta = total_time - previous_core_times[slot]
+            busy_delta = (total_time - idle_time) - previous_core_times[slot + 1]
+            deferred_delta_sum += deferred_time - previous_core_times[slot + 2]
+            interrupt_delta_sum += interrupt_time - previous_core_times[slot + 3]
+            total_delta_sum += total_delta
+            previous_core_times[slot] = total_time
+            previous_core_times[slot + 1] = total_time - idle_time
+            previous_core_times[slot + 2] = deferred_time
+            previous_core_times[slot + 3] = interrupt_time
+
+            core_percent = max(0.0, 100.0 * busy_delta / total_delta) if total_delta > 0 else 0.0
+            values[offset + core_index] = core_percent
+            busy_percent_sum += core_percent
+
+        offset += self.core_count
+        values[offset] = busy_percent_sum / self.core_count
+        values[offset + 1] = max(0.0, 100.0 * deferred_delta_sum / total_delta_sum) if total_delta_sum > 0 else 0.0
+        values[offset + 2] = max(0.0, 100.0 * interrupt_delta_sum / total_delta_sum) if total_delta_sum > 0 else 0.0
+        return offset
+
+    def prime_counters(self):
+        self._sample_core_times(array.array('d', bytes(8 * self.ring_buffer.column_count)), 0)
+        self.previous_fast_counters = self._read_fast_counters()
+        self.previous_slow_counters = self._read_slow_counters()
+
+    def take_sample(self):
+        values = self.ring_buffer.values
+        offset = self._sample_core_times(values, self.ring_buffer.row_offset())
+
+        fast_counters = self._read_fast_counters()
+        self._write_counter_rates(values, offset + 3, fast_counters, self.previous_fast_counters)
+        self.previous_fast_counters = fast_counters
+
+        # Disk, network and memory move slowly and cost the most to read; refresh them once per interval
+        previous_slow_counters = self.previous_slow_counters
+        if (previous_slow_counters is None or self.ring_buffer.sample_count == 0
+                or fast_counters[0] - previous_slow_counters[0] >= self.slow_counter_interval_seconds):
+            slow_counters = self._read_slow_counters()
+            self._write_counter_rates(values, offset + 6, slow_counters[:5], previous_slow_counters and previous_slow_counters[:5])
+            values[offset + 10] = slow_counters[5]
+            self.previous_slow_counters = slow_counters
+        else:
+            previous_slow_start = ((self.ring_buffer.write_index - 1) % self.ring_buffer.capacity) * self.ring_buffer.column_count + self.core_count + 6
+            values[offset + 6:offset + 11] = values[previous_slow_start:previous_slow_start + 5]
+
+        self.ring_buffer.commit_row(time.time())
+
+    def scan_top_processes(self, elapsed_seconds):
+        current_process_times = {}
+        process_usage = []
+        for process in psutil.process_iter(["cpu_times"]):
+            cpu_times = process.info["cpu_times"]
+            if cpu_times is None:
+                continue
+            total_cpu_time = cpu_times.user + cpu_times.system
+            current_process_times[process.pid] = total_cpu_time
+            previous_cpu_time = self.previous_process_times.get(process.pid)
+            if previous_cpu_time is not None and elapsed_seconds > 0 and total_cpu_time > previous_cpu_time:
+                process_usage.append((100.0 * (total_cpu_time - previous_cpu_time) / elapsed_seconds, process))
+        self.previous_process_times = current_process_times
+
+        top_processes = []
+        for cpu_percent, process in heapq.nlargest(self.top_process_count, process_usage, key=lambda usage: usage[0]):
+            try:
+                process_name = process.name()
+            except psutil.Error:
+                process_name = "?"
+            top_processes.append((cpu_percent, process.pid, process_name or "?"))
+        self.top_processes = top_processes
+
+    def rolling_aggregates(self):
+        aggregates = []
+        for column_index, column_name in enumerate(self.ring_buffer.column_names):
+            window = sorted(self.ring_buffer.column_window(column_index, self.window_samples))
+            if not window:
+                continue
+            newest_value = self.ring_buffer.values[((self.ring_buffer.write_index - 1) % self.ring_buffer.capacity) * self.ring_buffer.column_count + column_index]
+            aggregates.append((column_name, {
+                "last": newest_value,
+                "mean": sum(window) / len(window),
+                "min": window[0],
+                "max": window[-1],
+                "p95": window[min(len(window) - 1, int(len(window) * 0.95))],
+                "p99": window[min(len(window) - 1, int(len(window) * 0.99))]
+            }))
+        return aggregates
+
+    def write_prometheus_textfile(self):
+        output_lines = []
+        for column_name, statistics in self.rolling_aggregates():
+            if column_name.startswith("cpu_core_"):
+                metric_name = "antweaker_cpu_core_percent"
+                labels = f'core="{column_name.split("_")[2]}",'
+            else:
+                metric_name = f"antweaker_{column_name}"
+                labels = ""
+            if not output_lines or f"# TYPE {metric_name} gauge" not in output_lines:
+                output_lines.append(f"# TYPE {metric_name} gauge")
+            for statistic_name, statistic_value in statistics.items():
+                output_lines.append(f'{metric_name}{{{labels}stat="{statistic_name}"}} {statistic_value:.6g}')
+
+        output_lines.append("# TYPE antweaker_top_process_cpu_percent gauge")
+        for rank, (cpu_percent, process_id, process_name) in enumerate(self.top_processes):
+            escaped_name = process_name.replace("\\", "\\\\").replace('"', '\\"')
+            output_lines.append(f'antweaker_top_process_cpu_percent{{rank="{rank}",pid="{process_id}",name="{escaped_name}"}} {cpu_percent:.3g}')
+        output_lines.append("# TYPE antweaker_monitor_self_cpu_percent gauge")
+        output_lines.append(f"antweaker_monitor_self_cpu_percent {self.sampler_cpu_percent:.4g}")
+
+        temporary_path = self.textfile_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as textfile:
+            textfile.write("\n".join(output_lines) + "\n")
+        os.replace(temporary_path, self.textfile_path)
+
+    def _write_binary_header(self, binary_log):
+        binary_log.write(self.BINARY_LOG_MAGIC + struct.pack("<HH", self.BINARY_LOG_VERSION, self.ring_buffer.column_count))
+        for column_name in self.ring_buffer.column_names:
+            encoded_name = column_name.encode("utf-8")
+            binary_log.write(struct.pack("<H", len(encoded_name)) + encoded_name)
+
+    def _prepare_existing_binary_log(self):
+        if not os.path.exists(self.binary_log_path) or os.path.getsize(self.binary_log_path) == 0:
+            return False
+        try:
+            with open(self.binary_log_path, "rb") as existing_log:
+                log_version, column_names = read_binary_metric_header(existing_log)
+                header_size = existing_log.tell()
+        except (ValueError, struct.error):
+            log_version, column_names = None, None
+
+        if log_version != self.BINARY_LOG_VERSION or column_names != self.ring_buffer.column_names:
+            rotated_log_path = f"{self.binary_log_path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.binary_log_path, rotated_log_path)
+            status_logger.info(f"  {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} {self.binary_log_path} has a different layout, rotated to {rotated_log_path}")
+            return False
+
+        partial_record_bytes = (os.path.getsize(self.binary_log_path) - header_size) % self.binary_record.size
+        if partial_record_bytes:
+            with open(self.binary_log_path, "r+b") as existing_log:
+                existing_log.truncate(os.path.getsize(self.binary_log_path) - partial_record_bytes)
+        return True
+
+    def _append_binary_record(self, binary_log):
+        newest_index = (self.ring_buffer.write_index - 1) % self.ring_buffer.capacity
+        row_start = newest_index * self.ring_buffer.column_count
+        binary_log.write(self.binary_record.pack(
+            self.ring_buffer.timestamps[newest_index],
+            *self.ring_buffer.values[row_start:row_start + self.ring_buffer.column_count]
+        ))
+
+    def run(self, duration_seconds=None):
+        self.prime_counters()
+        self.scan_top_processes(0)
+        time.sleep(self.sample_interval)
+
+        log_exists = self._prepare_existing_binary_log()
+        with open(self.binary_log_path, "ab", buffering=64 * 1024) as binary_log:
+            if not log_exists:
+                self._write_binary_header(binary_log)
+
+            started_at = time.monotonic()
+            next_sample_at = started_at
+            next_export_at = started_at + self.export_interval_seconds
+            last_process_scan_at = started_at
+            last_cpu_time = sum(self.monitor_process.cpu_times()[:2])
+            last_cpu_check_at = started_at
+            sample_count = 0
+
+            try:
+                while duration_seconds is None or time.monotonic() - started_at < duration_seconds:
+                    self.take_sample()
+                    self._append_binary_record(binary_log)
+                    sample_count += 1
+                    now = time.monotonic()
+
+                    if now - last_process_scan_at >= self.process_scan_interval_seconds:
+                        self.scan_top_processes(now - last_process_scan_at)
+                        last_process_scan_at = now
+
+                    if now >= next_export_at:
+                        current_cpu_time = sum(self.monitor_process.cpu_times()[:2])
+                        self.sampler_cpu_percent = 100.0 * (current_cpu_time - last_cpu_time) / (now - last_cpu_check_at)
+                        last_cpu_time, last_cpu_check_at = current_cpu_time, now
+                        self.write_prometheus_textfile()
+                        binary_log.flush()
+                        next_export_at += self.export_interval_seconds
+
+                    next_sample_at += self.sample_interval
+                    sleep_time = next_sample_at - time.monotonic()
+                    if sleep_time > 0:
+                        time.sleep(sleep_time)
+                    else:
+                        next_sample_at = time.monotonic()
+            except KeyboardInterrupt:
+                pass
+
+            self.write_prometheus_textfile()
+        return sample_count
+
+
+def read_binary_metric_header(binary_log):
+    if binary_log.read(4) != RealTimeMetricsSampler.BINARY_LOG_MAGIC:
+        raise ValueError(f"{binary_log.name} is not an ANTweaker metric log")
+    log_version, column_count = struct.unpack("<HH", binary_log.read(4))
+    column_names = []
+    for _ in range(column_count):
+        (name_length,) = struct.unpack("<H", binary_log.read(2))
+        column_names.append(binary_log.read(name_length).decode("utf-8"))
+    return log_version, column_names
+
+
+def read_binary_metric_log(binary_log_path):
+    with open(binary_log_path, "rb") as binary_log:
+        log_version, column_names = read_binary_metric_header(binary_log)
+        if log_version != RealTimeMetricsSampler.BINARY_LOG_VERSION:
+            raise ValueError(f"{binary_log_path} uses metric log version {log_version}, expected {RealTimeMetricsSampler.BINARY_LOG_VERSION}")
+        binary_record = struct.Struct("<d" + "f" * len(column_names))
+        while True:
+            record_bytes = binary_log.read(binary_record.size)
+            if len(record_bytes) < binary_record.size:
+                break
+            record_values = binary_record.unpack(record_bytes)
+            yield record_values[0], dict(zip(column_names, record_values[1:]))
+
+
+def dump_binary_metric_log(binary_log_path):
+    try:
+        with open(binary_log_path, "rb") as binary_log:
+            _, column_names = read_binary_metric_header(binary_log)
+        sys.stdout.write(",".join(["timestamp"] + column_names) + "\n")
+        for timestamp, column_values in read_binary_metric_log(binary_log_path):
+            sys.stdout.write(f"{timestamp:.3f}," + ",".join(f"{column_value:.6g}" for column_value in column_values.values()) + "\n")
+    except (OSError, ValueError, struct.error) as dump_error:
+        status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Could not read {binary_log_path}: {dump_error}")
+        return False
+    return True
+
+
+class LUID(ctypes.Structure):
+    _fields_ = [("LowPart", ctypes.wintypes.DWORD), ("HighPart", ctypes.wintypes.LONG)]
+
+
+class LUID_AND_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [("Luid", LUID), ("Attributes", ctypes.wintypes.DWORD)]
+
+
+class TOKEN_PRIVILEGES(ctypes.Structure):
+    _fields_ = [("PrivilegeCount", ctypes.wintypes.DWORD), ("Privileges", LUID_AND_ATTRIBUTES * 1)]
+
+
+class SYSTEM_MEMORY_LIST_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("ZeroPageCount", ctypes.c_size_t),
+        ("FreePageCount", ctypes.c_size_t),
+        ("ModifiedPageCount", ctypes.c_size_t),
+        ("ModifiedNoWritePageCount", ctypes.c_size_t),
+        ("BadPageCount", ctypes.c_size_t),
+        ("PageCountByPriority", ctypes.c_size_t * 8),
+        ("RepurposedPagesByPriority", ctypes.c_size_t * 8),
+        ("ModifiedPageCountPageFile", ctypes.c_size_t)
+    ]
+
+
+class WindowsMemoryBackend:
+    SYSTEM_MEMORY_LIST_INFORMATION_CLASS = 80
+    MEMORY_PURGE_STANDBY_LIST = 4
+    PROCESS_SET_QUOTA = 0x0100
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    TOKEN_ADJUST_PRIVILEGES = 0x0020
+    TOKEN_QUERY = 0x0008
+    SE_PRIVILEGE_ENABLED = 0x00000002
+    ERROR_NOT_ALL_ASSIGNED = 1300
+    PAGE_SIZE = 4096
+
+    def __init__(self):
+        self._kernel32 = None
+        self._ntdll = None
+        self.memory_lists_available = False
+
+    def _load_libraries(self):
+        if self._kernel32 is not None:
+            return
+        try:
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        except AttributeError as error:
+            raise OSError("Working set and standby list control is only available on Windows") from error
+        kernel32.OpenProcess.restype = ctypes.wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = [ctypes.wintypes.DWORD, ctypes.wintypes.BOOL, ctypes.wintypes.DWORD]
+        kernel32.K32EmptyWorkingSet.argtypes = [ctypes.wintypes.HANDLE]
+        kernel32.CloseHandle.argtypes = [ctypes.wintypes.HANDLE]
+        kernel32.GetCurrentProcess.restype = ctypes.wintypes.HANDLE
+        ntdll = ctypes.WinDLL('ntdll')
+        ntdll.NtQuerySystemInformation.restype = ctypes.c_long
+        ntdll.NtQuerySystemInformation.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong)]
+        ntdll.NtSetSystemInformation.restype = ctypes.c_long
+        ntdll.NtSetSystemInformation.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_ulong]
+        self._kernel32, self._ntdll = kernel32, ntdll
+
+        try:
+            self._enable_privilege("SeProfileSingleProcessPrivilege")
+            self._query_memory_lists()
+            self.memory_lists_available = True
+        except OSError:
+            self.memory_lists_available = False
+
+    def _enable_privilege(self, privilege_name):
+        advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+        advapi32.OpenProcessToken.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.POINTER(ctypes.wintypes.HANDLE)]
+        advapi32.LookupPrivilegeValueW.argtypes = [ctypes.wintypes.LPCWSTR, ctypes.wintypes.LPCWSTR, ctypes.POINTER(LUID)]
+        advapi32.AdjustTokenPrivileges.argtypes = [
+            ctypes.wintypes.HANDLE, ctypes.wintypes.BOOL, ctypes.POINTER(TOKEN_PRIVILEGES),
+            ctypes.wintypes.DWORD, ctypes.c_void_p, ctypes.c_void_p
+        ]
+        token_handle = ctypes.wintypes.HANDLE()
+        if not advapi32.OpenProcessToken(self._kernel32.GetCurrentProcess(), self.TOKEN_ADJUST_PRIVILEGES | self.TOKEN_QUERY, ctypes.byref(token_handle)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            privilege_luid = LUID()
+            if not advapi32.LookupPrivilegeValueW(None, privilege_name, ctypes.byref(privilege_luid)):
+                raise ctypes.WinError(ctypes.get_last_error())
+            token_privileges = TOKEN_PRIVILEGES(1, (LUID_AND_ATTRIBUTES * 1)(LUID_AND_ATTRIBUTES(privilege_luid, self.SE_PRIVILEGE_ENABLED)))
+            if not advapi32.AdjustTokenPrivileges(token_handle, False, ctypes.byref(token_privileges), 0, None, None):
+                raise ctypes.WinError(ctypes.get_last_error())
+            if ctypes.get_last_error() == self.ERROR_NOT_ALL_ASSIGNED:
+                raise OSError(self.ERROR_NOT_ALL_ASSIGNED, f"{privilege_name} is not held by this account")
+        finally:
+            self._kernel32.CloseHandle(token_handle)
+
+    def _query_memory_lists(self):
+        memory_lists = SYSTEM_MEMORY_LIST_INFORMATION()
+        status_code = self._ntdll.NtQuerySystemInformation(
+            self.SYSTEM_MEMORY_LIST_INFORMATION_CLASS, ctypes.byref(memory_lists), ctypes.sizeof(memory_lists), None
+        )
+        if status_code:
+            raise OSError(status_code & 0xFFFFFFFF, "NtQuerySystemInformation(SystemMemoryListInformation) failed")
+        return memory_lists
+
+    def memory_status(self):
+        self._load_libraries()
+        virtual_memory = psutil.virtual_memory()
+        memory_status = {
+            "total_bytes": virtual_memory.total, "available_bytes": virtual_memory.available,
+            "free_bytes": None, "standby_bytes": None
+        }
+        if self.memory_lists_available:
+            memory_lists = self._query_memory_lists()
+            memory_status["free_bytes"] = (memory_lists.ZeroPageCount + memory_lists.FreePageCount) * self.PAGE_SIZE
+            memory_status["standby_bytes"] = sum(memory_lists.PageCountByPriority) * self.PAGE_SIZE
+        return memory_status
+
+    def list_processes(self):
+        process_list = []
+        for running_process in psutil.process_iter(["name", "memory_info"]):
+            if running_process.info["memory_info"] is None or not running_process.info["name"]:
+                continue
+            process_list.append({
+                "pid": running_process.pid, "name": running_process.info["name"],
+                "working_set_bytes": running_process.info["memory_info"].rss
+            })
+        return process_list
+
+    def trim_working_set(self, process_id):
+        self._load_libraries()
+        working_set_before = psutil.Process(process_id).memory_info().rss
+        process_handle = self._kernel32.OpenProcess(self.PROCESS_SET_QUOTA | self.PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
+        if not process_handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            if not self._kernel32.K32EmptyWorkingSet(process_handle):
+                raise ctypes.WinError(ctypes.get_last_error())
+        finally:
+            self._kernel32.CloseHandle(process_handle)
+        return max(0, working_set_before - psutil.Process(process_id).memory_info().rss)
+
+    def purge_standby_list(self):
+        self._load_libraries()
+        if not self.memory_lists_available:
+            raise OSError("SeProfileSingleProcessPrivilege is required to purge the standby list")
+        standby_before = sum(self._query_memory_lists().PageCountByPriority)
+        purge_command = ctypes.c_int(self.MEMORY_PURGE_STANDBY_LIST)
+        status_code = self._ntdll.NtSetSystemInformation(
+            self.SYSTEM_MEMORY_LIST_INFORMATION_CLASS, ctypes.byref(purge_command), ctypes.sizeof(purge_command)
+        )
+        if status_code:
+            raise OSError(status_code & 0xFFFFFFFF, "NtSetSystemInformation(MemoryPurgeStandbyList) failed")
+        return max(0, standby_before - sum(self._query_memory_lists().PageCountByPriority)) * self.PAGE_SIZE
+
+
+class SimulatedMemoryBackend:
+    def __init__(self, total_bytes, available_bytes, free_bytes, standby_bytes, processes=None,
+                 trim_fraction=0.6, drift_bytes=0):
+        self.total_bytes = total_bytes
+        self.available_bytes = available_bytes
+        self.free_bytes = free_bytes
+        self.standby_bytes = standby_bytes
+        self.processes = processes or []
+        self.trim_fraction = trim_fraction
+        self.drift_bytes = drift_bytes
+
+    def memory_status(self):
+        if self.drift_bytes:
+            drift_bytes = min(self.drift_bytes, self.free_bytes)
+            self.free_bytes -= drift_bytes
+            self.standby_bytes += drift_bytes // 2
+            self.available_bytes = max(0, self.available_bytes - drift_bytes // 2)
+            for simulated_process in self.processes:
+                simulated_process["working_set_bytes"] += drift_bytes // (4 * max(1, len(self.processes)))
+        return {
+            "total_bytes": self.total_bytes, "available_bytes": self.available_bytes,
+            "free_bytes": self.free_bytes, "standby_bytes": self.standby_bytes
+        }
+
+    def list_processes(self):
+        return [dict(simulated_process) for simulated_process in self.processes]
+
+    def trim_working_set(self, process_id):
+        for simulated_process in self.processes:
+            if simulated_process["pid"] == process_id:
+                reclaimed_bytes = int(simulated_process["working_set_bytes"] * self.trim_fraction)
+                simulated_process["working_set_bytes"] -= reclaimed_bytes
+                self.available_bytes += reclaimed_bytes
+                self.standby_bytes += reclaimed_bytes
+                return reclaimed_bytes
+        raise ProcessLookupError(f"Simulated process {process_id} not found")
+
+    def purge_standby_list(self):
+        reclaimed_bytes = self.standby_bytes
+        self.free_bytes += reclaimed_bytes
+        self.standby_bytes = 0
+        return reclaimed_bytes
+
+
+DEFAULT_BACKGROUND_PROCESSES = [
+    "Discord.exe", "Spotify.exe", "chrome.exe", "msedge.exe", "firefox.exe", "steamwebhelper.exe",
+    "EpicGamesLauncher.exe", "EpicWebHelper.exe", "Teams.exe", "OneDrive.exe", "Telegram.exe"
+]
+
+
+class MemoryPressureManager:
+    def __init__(self, memory_backend, background_processes=None, trim_below_percent=15.0, trim_above_percent=25.0,
+                 minimum_working_set_mb=100.0, trim_cooldown_seconds=120.0, purge_free_below_mb=1024.0,
+                 purge_standby_above_mb=2048.0, purge_cooldown_seconds=300.0):
+        self.memory_backend = memory_backend
+        self.background_processes = {process_name.lower() for process_name in (background_processes or DEFAULT_BACKGROUND_PROCESSES)}
+        self.trim_below_percent = trim_below_percent
+        self.trim_above_percent = trim_above_percent
+        self.minimum_working_set_bytes = minimum_working_set_mb * 1024 * 1024
+        self.trim_cooldown_seconds = trim_cooldown_seconds
+        self.purge_free_below_bytes = purge_free_below_mb * 1024 * 1024
+        self.purge_standby_above_bytes = purge_standby_above_mb * 1024 * 1024
+        self.purge_cooldown_seconds = purge_cooldown_seconds
+        self.under_pressure = False
+        self.purge_armed = True
+        self.last_trim_at = {}
+        self.last_purge_at = None
+        self.reclaim_statistics = {"trims": 0, "trimmed_bytes": 0, "purges": 0, "purged_bytes": 0, "errors": 0}
+
+    def _trim_background_processes(self, current_time):
+        trim_actions = []
+        running_processes = self.memory_backend.list_processes()
+        running_pids = {running_process["pid"] for running_process in running_processes}
+        self.last_trim_at = {
+            process_id: trimmed_at for process_id, trimmed_at in self.last_trim_at.items() if process_id in running_pids
+        }
+        trim_candidates = sorted(
+            (
+                running_process for running_process in running_processes
+                if running_process["name"].lower() in self.background_processes
+                and running_process["working_set_bytes"] >= self.minimum_working_set_bytes
+                and current_time - self.last_trim_at.get(running_process["pid"], float("-inf")) >= self.trim_cooldown_seconds
+            ),
+            key=lambda running_process: running_process["working_set_bytes"], reverse=True
+        )
+        for running_process in trim_candidates:
+            self.last_trim_at[running_process["pid"]] = current_time
+            try:
+                reclaimed_bytes = self.memory_backend.trim_working_set(running_process["pid"])
+            except (OSError, psutil.Error) as error:
+                self.reclaim_statistics["errors"] += 1
+                trim_actions.append({"action": "trim", "pid": running_process["pid"], "name": running_process["name"], "error": str(error)})
+                continue
+            self.reclaim_statistics["trims"] += 1
+            self.reclaim_statistics["trimmed_bytes"] += reclaimed_bytes
+            trim_actions.append({"action": "trim", "pid": running_process["pid"], "name": running_process["name"], "reclaimed_bytes": reclaimed_bytes})
+
+            memory_status = self.memory_backend.memory_status()
+            if memory_status["available_bytes"] / memory_status["total_bytes"] * 100 > self.trim_above_percent:
+                break
+        return trim_actions
+
+    def evaluate(self, current_time=None):
+        current_time = time.monotonic() if current_time is None else current_time
+        memory_status = self.memory_backend.memory_status()
+        available_percent = memory_status["available_bytes"] / memory_status["total_bytes"] * 100
+        policy_actions = []
+        if self.last_trim_at:
+            self.last_trim_at = {
+                process_id: trimmed_at for process_id, trimmed_at in self.last_trim_at.items()
+                if current_time - trimmed_at < self.trim_cooldown_seconds
+            }
+
+        if not self.under_pressure and available_percent < self.trim_below_percent:
+            self.under_pressure = True
+            policy_actions.append({"action": "pressure_on", "available_percent": available_percent})
+        elif self.under_pressure and available_percent > self.trim_above_percent:
+            self.under_pressure = False
+            policy_actions.append({"action": "pressure_off", "available_percent": available_percent})
+        if self.under_pressure:
+            policy_actions.extend(self._trim_background_processes(current_time))
+
+        free_bytes, standby_bytes = memory_status["free_bytes"], memory_status["standby_bytes"]
+        if free_bytes is not None and standby_bytes is not None:
+            if not self.purge_armed and free_bytes > 2 * self.purge_free_below_bytes:
+                self.purge_armed = True
+            purge_cooled_down = self.last_purge_at is None or current_time - self.last_purge_at >= self.purge_cooldown_seconds
+            if (self.purge_armed and purge_cooled_down and free_bytes < self.purge_free_below_bytes
+                    and standby_bytes > self.purge_standby_above_bytes):
+                self.purge_armed = False
+                self.last_purge_at = current_time
+                try:
+                    reclaimed_bytes = self.memory_backend.purge_standby_list()
+                    self.reclaim_statistics["purges"] += 1
+                    self.reclaim_statistics["purged_bytes"] += reclaimed_bytes
+                    policy_actions.append({"action": "purge", "reclaimed_bytes": reclaimed_bytes})
+                except OSError as error:
+                    self.reclaim_statistics["errors"] += 1
+                    policy_actions.append({"action": "purge", "error": str(error)})
+        return memory_status, policy_actions
+
+    def run(self, poll_interval_seconds=5.0, duration_seconds=None, action_callback=None):
+        started_at = time.monotonic()
+        next_poll_at = started_at
+        try:
+            while duration_seconds is None or time.monotonic() - started_at < duration_seconds:
+                memory_status, policy_actions = self.evaluate()
+                if action_callback:
+                    for policy_action in policy_actions:
+                        action_callback(memory_status, policy_action)
+                next_poll_at += poll_interval_seconds
+                time.sleep(max(0.0, next_poll_at - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+        return self.reclaim_statistics
+
+
+class WindowsRegistryBackend:
+    def read_value(self, hive_root, registry_path, entry_name):
+        with winreg.OpenKey(hive_root, registry_path, 0, winreg.KEY_READ) as registry_handle:
+            return winreg.QueryValueEx(registry_handle, entry_name)
+
+    def write_value(self, hive_root, registry_path, entry_name, entry_value, data_type):
+        with winreg.CreateKeyEx(hive_root, registry_path, 0, winreg.KEY_SET_VALUE) as registry_handle:
+            winreg.SetValueEx(registry_handle, entry_name, 0, data_type, entry_value)
+
+    def delete_value(self, hive_root, registry_path, entry_name):
+        with winreg.OpenKey(hive_root, registry_path, 0, winreg.KEY_SET_VALUE) as registry_handle:
+            winreg.DeleteValue(registry_handle, entry_name)
+
+    def delete_key_tree(self, hive_root, registry_path):
+        try:
+            subkey_names = self.enumerate_subkeys(hive_root, registry_path)
+        except FileNotFoundError:
+            return
+        for subkey_name in subkey_names:
+            self.delete_key_tree(hive_root, f"{registry_path}\\{subkey_name}")
+        winreg.DeleteKey(hive_root, registry_path)
+
+    def write_key_group(self, key_group):
+        if key_group.get("delete_key"):
+            self.delete_key_tree(key_group["hive_root"], key_group["registry_path"])
+            if not key_group["values"]:
+                return
+        with winreg.CreateKeyEx(key_group["hive_root"], key_group["registry_path"], 0, winreg.KEY_SET_VALUE) as registry_handle:
+            for planned_value in key_group["values"]:
+                if planned_value["action"] == "delete":
+                    try:
+                        winreg.DeleteValue(registry_handle, planned_value["entry_name"])
+                    except FileNotFoundError:
+                        pass
+                else:
+                    winreg.SetValueEx(registry_handle, planned_value["entry_name"], 0, planned_value["data_type"], planned_value["entry_value"])
+
+    def enumerate_subkeys(self, hive_root, registry_path):
+        subkey_names = []
+        with winreg.OpenKey(hive_root, registry_path, 0, winreg.KEY_READ) as registry_handle:
+            while True:
+                try:
+                    subkey_names.append(winreg.EnumKey(registry_handle, len(subkey_names)))
+                except OSError:
+                    return subkey_names
+
+    def enumerate_values(self, hive_root, registry_path):
+        registry_values = []
+        with winreg.OpenKey(hive_root, registry_path, 0, winreg.KEY_READ) as registry_handle:
+            while True:
+                try:
+                    registry_values.append(winreg.EnumValue(registry_handle, len(registry_values)))
+                except OSError:
+                    return registry_values
+
+
+class SimulatedRegistryBackend:
+    def __init__(self):
+        self.registry_keys = {}
+
+    def _lookup_key(self, hive_root, registry_path):
+        registry_key = self.registry_keys.get(normalize_registry_key(hive_root, registry_path))
+        if registry_key is None:
+            raise FileNotFoundError(f"Simulated key not found: {REGISTRY_HIVE_NAMES.get(hive_root, hive_root)}\\{registry_path}")
+        return registry_key
+
+    def create_key(self, hive_root, registry_path):
+        path_parts = registry_path.strip("\\").split("\\")
+        for part_count in range(1, len(path_parts) + 1):
+            partial_path = "\\".join(path_parts[:part_count])
+            self.registry_keys.setdefault(
+                normalize_registry_key(hive_root, partial_path),
+                {"registry_path": partial_path, "values": {}}
+            )
+        return self.registry_keys[normalize_registry_key(hive_root, registry_path)]
+
+    def read_value(self, hive_root, registry_path, entry_name):
+        stored_value = self._lookup_key(hive_root, registry_path)["values"].get(entry_name.lower())
+        if stored_value is None:
+            raise FileNotFoundError(f"Simulated value not found: {registry_path}\\{entry_name}")
+        return stored_value[1], stored_value[2]
+
+    def write_value(self, hive_root, registry_path, entry_name, entry_value, data_type):
+        self.create_key(hive_root, registry_path)["values"][entry_name.lower()] = (entry_name, entry_value, data_type)
+
+    def delete_value(self, hive_root, registry_path, entry_name):
+        if self._lookup_key(hive_root, registry_path)["values"].pop(entry_name.lower(), None) is None:
+            raise FileNotFoundError(f"Simulated value not found: {registry_path}\\{entry_name}")
+
+    def delete_key_tree(self, hive_root, registry_path):
+        deleted_hive, deleted_path = normalize_registry_key(hive_root, registry_path)
+        for registry_key in list(self.registry_keys):
+            if registry_key[0] == deleted_hive and (registry_key[1] + "\\").startswith(deleted_path + "\\"):
+                del self.registry_keys[registry_key]
+
+    def write_key_group(self, key_group):
+        if key_group.get("delete_key"):
+            self.delete_key_tree(key_group["hive_root"], key_group["registry_path"])
+            if not key_group["values"]:
+                return
+        key_values = self.create_key(key_group["hive_root"], key_group["registry_path"])["values"]
+        for planned_value in key_group["values"]:
+            if planned_value["action"] == "delete":
+                key_values.pop(planned_value["entry_name"].lower(), None)
+            else:
+                key_values[planned_value["entry_name"].lower()] = (planned_value["entry_name"], planned_value["entry_value"], planned_value["data_type"])
+
+    def enumerate_subkeys(self, hive_root, registry_path):
+        _, parent_path = normalize_registry_key(hive_root, registry_path)
+        if parent_path:
+            self._lookup_key(hive_root, registry_path)
+        return sorted(
+            registry_key["registry_path"].rsplit("\\", 1)[-1]
+            for (key_hive, key_path), registry_key in self.registry_keys.items()
+            if key_hive == hive_root and key_path != parent_path
+            and (key_path.rsplit("\\", 1)[0] if "\\" in key_path else "") == parent_path
+        )
+
+    def enumerate_values(self, hive_root, registry_path):
+        return list(self._lookup_key(hive_root, registry_path)["values"].values())
+
+
+TUNABLE_CATALOG_PARAMETERS = [
+    {
+        "parameter_name": "Win32PrioritySeparation",
+        "registry_path": r"SYSTEM\ControlSet001\Control\PriorityControl",
+        "entry_name": "Win32PrioritySeparation",
+        "data_type": winreg.REG_DWORD,
+        "hive_root": winreg.HKEY_LOCAL_MACHINE,
+        "candidate_values": [0x16, 0x18, 0x1A, 0x24, 0x26, 0x28, 0x2A]
+    },
+    {
+        "parameter_name": "LazyModeTimeout",
+        "registry_path": r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile",
+        "entry_name": "LazyModeTimeout",
+        "data_type": winreg.REG_DWORD,
+        "hive_root": winreg.HKEY_LOCAL_MACHINE,
+        "candidate_values": [1000, 5000, 10000, 25000]
+    },
+    {
+        "parameter_name": "GamesPriority",
+        "registry_path": r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile\Tasks\Games",
+        "entry_name": "Priority",
+        "data_type": winreg.REG_DWORD,
+        "hive_root": winreg.HKEY_LOCAL_MACHINE,
+        "candidate_values": [2, 4, 6, 8]
+    },
+    {
+        "parameter_name": "GamesGpuPriority",
+        "registry_path": r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile\Tasks\Games",
+        "entry_name": "GPU Priority",
+        "data_type": winreg.REG_DWORD,
+        "hive_root": winreg.HKEY_LOCAL_MACHINE,
+        "candidate_values": [4, 6, 8]
+    }
+]
+
+
+def latency_percentile(latency_samples, percentile):
+    ordered_samples = sorted(latency_samples)
+    if not ordered_samples:
+        return float("inf")
+    rank = max(1, math.ceil(percentile / 100.0 * len(ordered_samples)))
+    return ordered_samples[rank - 1]
+
+
+def describe_hardware_fingerprint(graphics_card_type):
+    return {
+        "processor": platform.processor() or platform.machine(),
+        "logical_cores": psutil.cpu_count(logical=True),
+        "ram_gb": round(psutil.virtual_memory().total / (1024**3)),
+        "graphics": graphics_card_type
+    }
+
+
+class WorkloadLatencyObjective:
+    def __init__(self, command_runner, workload_command, percentile=99.0, timeout_seconds=300.0):
+        self.command_runner = command_runner
+        self.workload_command = workload_command
+        self.percentile = percentile
+        self.timeout_seconds = timeout_seconds
+
+    def describe(self):
+        return f"p{self.percentile:g} latency (ms) of: {self.workload_command}"
+
+    def measure(self, registry_backend, budget):
+        latency_samples = []
+        for _ in range(budget):
+            started_at = time.perf_counter()
+            try:
+                workload_result = self.command_runner.run(self.workload_command, timeout_seconds=self.timeout_seconds, text=True)
+            except subprocess.TimeoutExpired:
+                return float("inf")
+            reported_samples = []
+            for output_line in workload_result.stdout.splitlines():
+                try:
+                    reported_samples.append(float(output_line.strip()))
+                except ValueError:
+                    continue
+            latency_samples.extend(reported_samples or [(time.perf_counter() - started_at) * 1000.0])
+        return latency_percentile(latency_samples, self.percentile)
+
+
+class SyntheticLatencyObjective:
+    def __init__(self, tunable_parameters, percentile=99.0, seed=0, samples_per_budget=50):
+        self.tunable_parameters = tunable_parameters
+        self.percentile = percentile
+        self.samples_per_budget = samples_per_budget
+        self.random_generator = random.Random(seed)
+        self.hidden_optimum = {
+            parameter["parameter_name"]: self.random_generator.randrange(len(parameter["candidate_values"]))
+            for parameter in tunable_parameters
+        }
+
+    def describe(self):
+        return f"p{self.percentile:g} latency (ms) of a synthetic workload"
+
+    def measure(self, registry_backend, budget):
+        base_latency = 4.0
+        for parameter in self.tunable_parameters:
+            try:
+                current_value, _ = registry_backend.read_value(parameter["hive_root"], parameter["registry_path"], parameter["entry_name"])
+                current_index = parameter["candidate_values"].index(current_value)
+            except (OSError, ValueError):
+                current_index = 0
+            distance = (current_index - self.hidden_optimum[parameter["parameter_name"]]) / max(1, len(parameter["candidate_values"]) - 1)
+            base_latency += 3.0 * distance * distance
+
+        latency_samples = [
+            base_latency * self.random_generator.lognormvariate(0.0, 0.25)
+            for _ in range(budget * self.samples_per_budget)
+        ]
+        return latency_percentile(latency_samples, self.percentile)
+
+
+class SuccessiveHalvingTuner:
+    def __init__(self, registry_backend, objective, tunable_parameters, candidate_count=16,
+                 reduction_factor=2, minimum_budget=1, settle_seconds=0.0, seed=0):
+        self.registry_backend = registry_backend
+        self.objective = objective
+        self.tunable_parameters = tunable_parameters
+        self.candidate_count = candidate_count
+        self.reduction_factor = max(2, reduction_factor)
+        self.minimum_budget = minimum_budget
+        self.settle_seconds = settle_seconds
+        self.random_generator = random.Random(seed)
+
+    def sample_configurations(self):
+        grid_size = math.prod(len(parameter["candidate_values"]) for parameter in self.tunable_parameters)
+        sampled_configurations = []
+        seen_configurations = set()
+        while len(sampled_configurations) < min(self.candidate_count, grid_size):
+            configuration = tuple(self.random_generator.choice(parameter["candidate_values"]) for parameter in self.tunable_parameters)
+            if configuration not in seen_configurations:
+                seen_configurations.add(configuration)
+                sampled_configurations.append(configuration)
+        return sampled_configurations
+
+    def apply_configuration(self, configuration):
+        for parameter, parameter_value in zip(self.tunable_parameters, configuration):
+            self.registry_backend.write_value(
+                parameter["hive_root"], parameter["registry_path"], parameter["entry_name"], parameter_value, parameter["data_type"]
+            )
+        if self.settle_seconds:
+            time.sleep(self.settle_seconds)
+
+    def capture_original_values(self):
+        original_values = []
+        for parameter in self.tunable_parameters:
+            try:
+                original_values.append(self.registry_backend.read_value(parameter["hive_root"], parameter["registry_path"], parameter["entry_name"]))
+            except OSError:
+                original_values.append(None)
+        return original_values
+
+    def restore_original_values(self, original_values):
+        for parameter, original_value in zip(self.tunable_parameters, original_values):
+            try:
+                if original_value is None:
+                    self.registry_backend.delete_value(parameter["hive_root"], parameter["registry_path"], parameter["entry_name"])
+                else:
+                    self.registry_backend.write_value(
+                        parameter["hive_root"], parameter["registry_path"], parameter["entry_name"], original_value[0], original_value[1]
+                    )
+            except OSError:
+                pass
+
+    def run(self):
+        surviving_configurations = self.sample_configurations()
+        budget = self.minimum_budget
+        search_history = []
+        evaluation_count = 0
+
+        while True:
+            scored_configurations = []
+            for configuration in surviving_configurations:
+                self.apply_configuration(configuration)
+                score = self.objective.measure(self.registry_backend, budget)
+                evaluation_count += budget
+                scored_configurations.append((score, configuration))
+            scored_configurations.sort(key=lambda scored: scored[0])
+            search_history.append({
+                "budget": budget,
+                "evaluated": len(scored_configurations),
+                "best_score": scored_configurations[0][0],
+                "worst_score": scored_configurations[-1][0]
+            })
+            status_logger.info(
+                f"  Round {len(search_history)}: {len(scored_configurations)} candidates x budget {budget}, "
+                f"best {scored_configurations[0][0]:.3f}, worst {scored_configurations[-1][0]:.3f}"
+            )
+
+            if len(scored_configurations) == 1:
+                break
+            keep_count = max(1, math.ceil(len(scored_configurations) / self.reduction_factor))
+            surviving_configurations = [configuration for _, configuration in scored_configurations[:keep_count]]
+            budget *= self.reduction_factor
+
+        best_score, best_configuration = scored_configurations[0]
+        return {
+            "score": best_score,
+            "values": {
+                parameter["parameter_name"]: parameter_value
+                for parameter, parameter_value in zip(self.tunable_parameters, best_configuration)
+            },
+            "history": search_history,
+            "workload_runs": evaluation_count
+        }
+
+
+def save_tuned_profile(tuning_result, tunable_parameters, hardware_fingerprint, objective_description, profile_directory):
+    fingerprint_digest = hashlib.sha1(json.dumps(hardware_fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    os.makedirs(profile_directory, exist_ok=True)
+    profile_path = os.path.join(profile_directory, f"tuned_{fingerprint_digest}.json")
+    parameters_by_name = {parameter["parameter_name"]: parameter for parameter in tunable_parameters}
+    tuned_profile = {
+        "hardware_fingerprint": hardware_fingerprint,
+        "objective": objective_description,
+        "score": tuning_result["score"],
+        "history": tuning_result["history"],
+        "entries": [
+            {
+                "registry_path": parameters_by_name[parameter_name]["registry_path"],
+                "entry_name": parameters_by_name[parameter_name]["entry_name"],
+                "entry_value": parameter_value,
+                "data_type": REGISTRY_TYPE_NAMES[parameters_by_name[parameter_name]["data_type"]],
+                "hive_root": REGISTRY_HIVE_NAMES[parameters_by_name[parameter_name]["hive_root"]]
+            }
+            for parameter_name, parameter_value in tuning_result["values"].items()
+        ]
+    }
+    with open(profile_path, "w", encoding="utf-8") as profile_file:
+        json.dump(tuned_profile, profile_file, indent=2)
+    return profile_path
+
+
+SNAPSHOT_SUBTREES = [
+    (winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Control\Class", None),
+    (winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Services\Tcpip", None),
+    (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile", None),
+    (winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Enum", "\\device parameters")
+]
+
+
+def walk_registry_subtree(registry_backend, hive_root, registry_path, required_fragment=None):
+    pending_paths = [registry_path]
+    while pending_paths:
+        current_path = pending_paths.pop()
+        try:
+            subkey_names = registry_backend.enumerate_subkeys(hive_root, current_path)
+        except OSError:
+            continue
+        pending_paths.extend(f"{current_path}\\{subkey_name}" for subkey_name in reversed(subkey_names))
+
+        if required_fragment and required_fragment not in current_path.lower():
+            continue
+        try:
+            registry_values = registry_backend.enumerate_values(hive_root, current_path)
+        except OSError:
+            continue
+        if registry_values:
+            yield f"{REGISTRY_HIVE_NAMES[hive_root]}\\{current_path}", registry_values
+
+
+class RegistrySnapshotCodec:
+    SNAPSHOT_MAGIC = b"ANTS"
+    SNAPSHOT_VERSION = 1
+    HEADER = struct.Struct("<4sHHIIQ")
+    BLOCK_HEADER = struct.Struct("<IH")
+    VALUE_HEADER = struct.Struct("<HII")
+
+    def encode_value(self, entry_value, data_type):
+        if entry_value is None:
+            return b""
+        if data_type in (winreg.REG_SZ, winreg.REG_EXPAND_SZ):
+            return str(entry_value).encode("utf-8")
+        if data_type == winreg.REG_MULTI_SZ:
+            return "\x00".join(entry_value).encode("utf-8")
+        if data_type == winreg.REG_DWORD:
+            return struct.pack("<I", entry_value & 0xFFFFFFFF)
+        if data_type == winreg.REG_QWORD:
+            return struct.pack("<Q", entry_value & 0xFFFFFFFFFFFFFFFF)
+        return bytes(entry_value)
+
+    def decode_value(self, value_bytes, data_type):
+        if data_type in (winreg.REG_SZ, winreg.REG_EXPAND_SZ):
+            return value_bytes.decode("utf-8", errors="replace")
+        if data_type == winreg.REG_MULTI_SZ:
+            return value_bytes.decode("utf-8", errors="replace").split("\x00") if value_bytes else []
+        if data_type == winreg.REG_DWORD and len(value_bytes) == 4:
+            return struct.unpack("<I", value_bytes)[0]
+        if data_type == winreg.REG_QWORD and len(value_bytes) == 8:
+            return struct.unpack("<Q", value_bytes)[0]
+        return value_bytes.hex(",")
+
+    def write(self, snapshot_path, key_blocks, created_at=None):
+        sorted_blocks = sorted(key_blocks, key=lambda key_block: key_block[0].lower())
+        block_offsets = array.array('Q')
+        value_count = 0
+
+        with open(snapshot_path, "wb") as snapshot_file:
+            snapshot_file.write(bytes(self.HEADER.size))
+            for full_key_path, registry_values in sorted_blocks:
+                encoded_key = full_key_path.encode("utf-8")
+                encoded_values = []
+                for entry_name, entry_value, data_type in sorted(registry_values, key=lambda registry_value: registry_value[0].lower()):
+                    encoded_name = entry_name.encode("utf-8")
+                    value_bytes = self.encode_value(entry_value, data_type)
+                    encoded_values.append(self.VALUE_HEADER.pack(len(encoded_name), data_type, len(value_bytes)) + encoded_name + value_bytes)
+                values_payload = b"".join(encoded_values)
+
+                block_offsets.append(snapshot_file.tell())
+                snapshot_file.write(self.BLOCK_HEADER.pack(len(encoded_key) + struct.calcsize("<I") + len(values_payload), len(encoded_key)))
+                snapshot_file.write(encoded_key + struct.pack("<I", len(encoded_values)) + values_payload)
+                value_count += len(encoded_values)
+
+            index_offset = snapshot_file.tell()
+            block_offsets.tofile(snapshot_file)
+            snapshot_file.seek(0)
+            snapshot_file.write(self.HEADER.pack(
+                self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION, 0, len(block_offsets), value_count, index_offset
+            ))
+        return len(block_offsets), value_count
+
+    def open_snapshot(self, snapshot_path):
+        snapshot_file = open(snapshot_path, "rb")
+        try:
+            snapshot_map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            snapshot_file.close()
+        magic, version, _, key_count, value_count, index_offset = self.HEADER.unpack_from(snapshot_map, 0)
+        if magic != self.SNAPSHOT_MAGIC or version != self.SNAPSHOT_VERSION:
+            snapshot_map.close()
+            raise ValueError(f"{snapshot_path} is not an ANTweaker registry snapshot")
+        return snapshot_map, key_count, value_count, index_offset
+
+    def iterate_key_blocks(self, snapshot_map, key_count, index_offset):
+        for key_index in range(key_count):
+            (block_offset,) = struct.unpack_from("<Q", snapshot_map, index_offset + key_index * 8)
+            block_length, key_length = self.BLOCK_HEADER.unpack_from(snapshot_map, block_offset)
+            key_start = block_offset + self.BLOCK_HEADER.size
+            yield (
+                snapshot_map[key_start:key_start + key_length].decode("utf-8"),
+                snapshot_map[key_start + key_length:key_start + block_length]
+            )
+
+    def iterate_block_values(self, block_payload):
+        (value_count,) = struct.unpack_from("<I", block_payload, 0)
+        read_offset = 4
+        for _ in range(value_count):
+            name_length, data_type, data_length = self.VALUE_HEADER.unpack_from(block_payload, read_offset)
+            name_start = read_offset + self.VALUE_HEADER.size
+            data_start = name_start + name_length
+            read_offset = data_start + data_length
+            yield block_payload[name_start:data_start].decode("utf-8"), data_type, block_payload[data_start:read_offset]
+
+    def _diff_key_values(self, full_key_path, old_payload, new_payload):
+        old_values = self.iterate_block_values(old_payload) if old_payload is not None else iter(())
+        new_values = self.iterate_block_values(new_payload) if new_payload is not None else iter(())
+        old_value = next(old_values, None)
+        new_value = next(new_values, None)
+
+        while old_value is not None or new_value is not None:
+            old_name = old_value[0].lower() if old_value is not None else None
+            new_name = new_value[0].lower() if new_value is not None else None
+            if new_value is None or (old_value is not None and old_name < new_name):
+                yield ("removed", full_key_path, old_value[0], (old_value[1], old_value[2]), None)
+                old_value = next(old_values, None)
+            elif old_value is None or new_name < old_name:
+                yield ("added", full_key_path, new_value[0], None, (new_value[1], new_value[2]))
+                new_value = next(new_values, None)
+            else:
+                if old_value[1] != new_value[1] or old_value[2] != new_value[2]:
+                    yield ("changed", full_key_path, new_value[0], (old_value[1], old_value[2]), (new_value[1], new_value[2]))
+                old_value = next(old_values, None)
+                new_value = next(new_values, None)
+
+    def diff(self, old_snapshot_path, new_snapshot_path):
+        old_map, old_key_count, _, old_index_offset = self.open_snapshot(old_snapshot_path)
+        new_map, new_key_count, _, new_index_offset = self.open_snapshot(new_snapshot_path)
+        try:
+            old_blocks = self.iterate_key_blocks(old_map, old_key_count, old_index_offset)
+            new_blocks = self.iterate_key_blocks(new_map, new_key_count, new_index_offset)
+            old_block = next(old_blocks, None)
+            new_block = next(new_blocks, None)
+
+            while old_block is not None or new_block is not None:
+                old_key = old_block[0].lower() if old_block is not None else None
+                new_key = new_block[0].lower() if new_block is not None else None
+                if new_block is None or (old_block is not None and old_key < new_key):
+                    yield from self._diff_key_values(old_block[0], old_block[1], None)
+                    old_block = next(old_blocks, None)
+                elif old_block is None or new_key < old_key:
+                    yield from self._diff_key_values(new_block[0], None, new_block[1])
+                    new_block = next(new_blocks, None)
+                else:
+                    if old_block[1] != new_block[1]:
+                        yield from self._diff_key_values(new_block[0], old_block[1], new_block[1])
+                    old_block = next(old_blocks, None)
+                    new_block = next(new_blocks, None)
+        finally:
+            old_map.close()
+            new_map.close()
+
+
+NETWORK_ADAPTER_CLASS_PATH = r"SYSTEM\CurrentControlSet\Control\Class\{4d36e972-e325-11ce-bfc1-08002be10318}"
+
+NIC_POWER_SAVING_PROPERTIES = [
+    "SipsEnabled", "*SipsEnabled", "EEE", "*EEE", "ReduceSpeedOnPowerDown", "*ReduceSpeedOnPowerDown",
+    "ULPMode", "*ULPMode", "EEELinkAdvertisement", "*EEELinkAdvertisement", "EnableGreenEthernet", "*EnableGreenEthernet",
+    "AdvancedEEE", "*AdvancedEEE", "GigaLite", "*GigaLite", "PowerSavingMode", "*PowerSavingMode",
+    "ASPM", "*ASPM", "SelectiveSuspend", "*SelectiveSuspend"
+]
+
+NIC_PNP_CAPABILITIES_NO_POWER_OFF = 0x18
+
+NETWORK_DRIVER_INSTALLERS = [
+    ("Realtek", "Realtek.exe", ["/silent", "/S"]),
+    ("Intel", r"INTEL\Wired_driver_28.2.1_x64.exe", ["/silent", "/S"])
+]
+
+INSTALLER_REBOOT_EXIT_CODES = (1641, 3010)
+
+NIC_DEVICE_POWER_MANAGEMENT_SCRIPT = (
+    "$adapters = @(Get-NetAdapter -Physical -ErrorAction SilentlyContinue); "
+    "$adapters | Get-NetAdapterPowerManagement -ErrorAction SilentlyContinue | "
+    "Where-Object AllowComputerToTurnOffDevice -eq 'Enabled' | "
+    "ForEach-Object { $_.AllowComputerToTurnOffDevice = 'Disabled'; $_ | Set-NetAdapterPowerManagement }; "
+    "$deviceIds = @($adapters | ForEach-Object { $_.PnPDeviceID.ToUpper() }); "
+    "$changed = 0; "
+    "Get-CimInstance -Namespace root\\wmi -ClassName MSPower_DeviceEnable -ErrorAction SilentlyContinue | "
+    "Where-Object Enable | ForEach-Object { "
+    "$instance = $_; "
+    "if ($deviceIds | Where-Object { $instance.InstanceName.ToUpper().StartsWith($_) }) { "
+    "$instance.Enable = $false; Set-CimInstance -InputObject $instance; $changed++ } }; "
+    "Write-Output $changed"
+)
+
+
+class DriverInstallerOrchestrator:
+    def __init__(self, command_runner, registry_backend, discovery_interval_seconds=0.5):
+        self.command_runner = command_runner
+        self.registry_backend = registry_backend
+        self.discovery_interval_seconds = discovery_interval_seconds
+
+    def _track_descendants(self, tracked_processes, known_pids):
+        for tracked_process in list(tracked_processes.values()):
+            try:
+                descendant_processes = tracked_process.children(recursive=True)
+            except psutil.Error:
+                continue
+            for descendant_process in descendant_processes:
+                tracked_processes.setdefault(descendant_process.pid, descendant_process)
+                known_pids.add(descendant_process.pid)
+
+    def _adopt_orphans(self, tracked_processes, known_pids, launched_at):
+        for candidate_process in psutil.process_iter(["ppid", "create_time"]):
+            candidate_info = candidate_process.info
+            if candidate_process.pid in known_pids or candidate_info["ppid"] not in known_pids:
+                continue
+            if candidate_info["create_time"] is None or candidate_info["create_time"] < launched_at - 1:
+                continue
+            tracked_processes[candidate_process.pid] = candidate_process
+            known_pids.add(candidate_process.pid)
+
+    def run_installer(self, installer_path, installer_arguments, timeout_seconds):
+        installer_result = {
+            "installer_path": installer_path, "outcome": "completed", "exit_code": None,
+            "tracked_processes": 0, "elapsed_seconds": 0.0
+        }
+        started_at = time.monotonic()
+        launched_at = time.time()
+        if not os.path.isfile(installer_path):
+            installer_result["outcome"] = "missing"
+            return installer_result
+        try:
+            root_process = psutil.Popen([installer_path] + list(installer_arguments), cwd=os.path.dirname(installer_path) or None)
+        except OSError as error:
+            installer_result["outcome"] = f"launch failed: {error}"
+            return installer_result
+
+        tracked_processes = {root_process.pid: root_process}
+        known_pids = {root_process.pid}
+        deadline = started_at + timeout_seconds
+        while tracked_processes:
+            remaining_seconds = deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                for tracked_process in list(tracked_processes.values()):
+                    self.command_runner.terminate_process_tree(tracked_process.pid)
+                installer_result["outcome"] = "timeout"
+                break
+
+            self._track_descendants(tracked_processes, known_pids)
+            exited_processes, _ = psutil.wait_procs(
+                list(tracked_processes.values()), timeout=min(remaining_seconds, self.discovery_interval_seconds)
+            )
+            for exited_process in exited_processes:
+                tracked_processes.pop(exited_process.pid, None)
+                if exited_process.pid == root_process.pid:
+                    installer_result["exit_code"] = exited_process.returncode
+            if exited_processes:
+                self._adopt_orphans(tracked_processes, known_pids, launched_at)
+
+        if installer_result["outcome"] == "completed" and installer_result["exit_code"] not in (0, None) + INSTALLER_REBOOT_EXIT_CODES:
+            installer_result["outcome"] = f"exit code {installer_result['exit_code']}"
+        installer_result["tracked_processes"] = len(known_pids)
+        installer_result["elapsed_seconds"] = round(time.monotonic() - started_at, 2)
+        return installer_result
+
+    def disable_adapter_device_power_management(self, timeout_seconds=120):
+        try:
+            completed_process = self.command_runner.run(
+                ['powershell', '-NoProfile', '-Command', NIC_DEVICE_POWER_MANAGEMENT_SCRIPT], timeout_seconds=timeout_seconds, text=True
+            )
+        except subprocess.TimeoutExpired:
+            return {"outcome": "timeout", "changed": 0}
+        except OSError as error:
+            return {"outcome": f"launch failed: {error}", "changed": 0}
+        if completed_process.returncode != 0:
+            return {"outcome": f"exit code {completed_process.returncode}", "changed": 0}
+        output_lines = (completed_process.stdout or "").strip().splitlines()
+        changed_count = int(output_lines[-1]) if output_lines and output_lines[-1].strip().isdigit() else 0
+        return {"outcome": "completed", "changed": changed_count}
+
+    def tune_network_adapter_power(self):
+        adapter_changes = []
+        try:
+            adapter_subkeys = self.registry_backend.enumerate_subkeys(winreg.HKEY_LOCAL_MACHINE, NETWORK_ADAPTER_CLASS_PATH)
+        except OSError:
+            return adapter_changes
+
+        for adapter_subkey in adapter_subkeys:
+            if len(adapter_subkey) != 4 or not adapter_subkey.isdigit():
+                continue
+            adapter_path = f"{NETWORK_ADAPTER_CLASS_PATH}\\{adapter_subkey}"
+            try:
+                adapter_values = {
+                    entry_name.lower(): (entry_name, entry_value, data_type)
+                    for entry_name, entry_value, data_type in self.registry_backend.enumerate_values(winreg.HKEY_LOCAL_MACHINE, adapter_path)
+                }
+            except OSError:
+                continue
+            adapter_name = adapter_values.get("driverdesc", (None, adapter_subkey))[1]
+
+            planned_writes = []
+            for property_name in NIC_POWER_SAVING_PROPERTIES:
+                existing_value = adapter_values.get(property_name.lower())
+                if existing_value is None or existing_value[1] in (0, "0"):
+                    continue
+                zero_value = "0" if existing_value[2] in (winreg.REG_SZ, winreg.REG_EXPAND_SZ) else 0
+                planned_writes.append((existing_value[0], existing_value[1], zero_value, existing_value[2]))
+
+            device_instance = str(adapter_values.get("deviceinstanceid", (None, ""))[1]).upper()
+            if device_instance.startswith(("PCI\\", "USB\\")):
+                existing_capabilities = adapter_values.get("pnpcapabilities", (None, None))[1]
+                merged_capabilities = (existing_capabilities if isinstance(existing_capabilities, int) else 0) | NIC_PNP_CAPABILITIES_NO_POWER_OFF
+                if existing_capabilities != merged_capabilities:
+                    planned_writes.append(("PnPCapabilities", existing_capabilities, merged_capabilities, winreg.REG_DWORD))
+
+            for entry_name, old_value, new_value, data_type in planned_writes:
+                try:
+                    self.registry_backend.write_value(winreg.HKEY_LOCAL_MACHINE, adapter_path, entry_name, new_value, data_type)
+                    adapter_changes.append({"adapter": adapter_name, "entry_name": entry_name, "old_value": old_value, "new_value": new_value})
+                except OSError as error:
+                    adapter_changes.append({"adapter": adapter_name, "entry_name": entry_name, "old_value": old_value, "error": str(error)})
+        return adapter_changes
+
+
+PROFILE_LIST_PATH = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList"
+
+
+class UserProfileHiveApplier:
+    def __init__(self, command_runner, registry_backend, key_group_writer, max_workers=8):
+        self.command_runner = command_runner
+        self.registry_backend = registry_backend
+        self.key_group_writer = key_group_writer
+        self.max_workers = max_workers
+
+    def enumerate_user_profiles(self, include_default_profile=False):
+        try:
+            loaded_hives = {subkey_name.lower() for subkey_name in self.registry_backend.enumerate_subkeys(winreg.HKEY_USERS, "")}
+        except OSError:
+            loaded_hives = set()
+
+        user_profiles = []
+        for profile_sid in self.registry_backend.enumerate_subkeys(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH):
+            if not profile_sid.startswith("S-1-5-21-"):
+                continue
+            try:
+                profile_path = os.path.expandvars(
+                    self.registry_backend.read_value(winreg.HKEY_LOCAL_MACHINE, f"{PROFILE_LIST_PATH}\\{profile_sid}", "ProfileImagePath")[0]
+                )
+            except OSError:
+                continue
+            user_profiles.append({
+                "sid": profile_sid, "profile_path": profile_path,
+                "hive_path": os.path.join(profile_path, "NTUSER.DAT"), "loaded": profile_sid.lower() in loaded_hives
+            })
+
+        if include_default_profile:
+            try:
+                default_profile_path = os.path.expandvars(self.registry_backend.read_value(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH, "Default")[0])
+                user_profiles.append({
+                    "sid": "Default", "profile_path": default_profile_path,
+                    "hive_path": os.path.join(default_profile_path, "NTUSER.DAT"), "loaded": False
+                })
+            except OSError:
+                pass
+        return user_profiles
+
+    def apply_to_profile(self, user_profile, key_groups):
+        mount_name = user_profile["sid"] if user_profile["loaded"] else f"ANTweaker_{user_profile['sid']}"
+        profile_result = {
+            "sid": user_profile["sid"], "profile_path": user_profile["profile_path"], "loaded_by_us": not user_profile["loaded"],
+            "groups_written": 0, "errors": [], "outcome": "completed"
+        }
+
+        if not user_profile["loaded"]:
+            if not os.path.isfile(user_profile["hive_path"]):
+                profile_result["outcome"] = "missing hive"
+                return profile_result
+            try:
+                self.command_runner.run(["reg", "load", f"HKU\\{mount_name}", user_profile["hive_path"]], timeout_seconds=60, check=True)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as error:
+                profile_result["outcome"] = f"load failed: {error}"
+                return profile_result
+
+        try:
+            for key_group in key_groups:
+                user_key_group = dict(key_group, hive_root=winreg.HKEY_USERS, registry_path=f"{mount_name}\\{key_group['registry_path']}")
+                try:
+                    self.key_group_writer(user_key_group)
+                    profile_result["groups_written"] += 1
+                except OSError as error:
+                    profile_result["errors"].append(f"{key_group['registry_path']}: {error}")
+        finally:
+            if not user_profile["loaded"]:
+                for unload_attempt in range(3):
+                    try:
+                        self.command_runner.run(["reg", "unload", f"HKU\\{mount_name}"], timeout_seconds=60, check=True)
+                        break
+                    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as error:
+                        if unload_attempt == 2:
+                            profile_result["outcome"] = f"unload failed: {error}"
+                        else:
+                            time.sleep(1.0 * (2 ** unload_attempt))
+
+        if profile_result["errors"] and profile_result["outcome"] == "completed":
+            profile_result["outcome"] = "partial"
+        return profile_result
+
+    def apply(self, user_profiles, key_groups):
+        if not user_profiles:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(user_profiles))) as executor:
+            return list(executor.map(lambda user_profile: self.apply_to_profile(user_profile, key_groups), user_profiles))
+
+
+class GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", ctypes.c_ulong),
+        ("Data2", ctypes.c_ushort),
+        ("Data3", ctypes.c_ushort),
+        ("Data4", ctypes.c_ubyte * 8)
+    ]
+
+
+class PowerSchemeController:
+    def __init__(self):
+        self._powrprof = None
+
+    def _load_powrprof(self):
+        if self._powrprof is None:
+            try:
+                powrprof = ctypes.WinDLL('powrprof')
+            except AttributeError as error:
+                raise OSError("powrprof.dll is only available on Windows") from error
+            powrprof.PowerGetActiveScheme.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.POINTER(GUID))]
+            powrprof.PowerSetActiveScheme.argtypes = [ctypes.c_void_p, ctypes.POINTER(GUID)]
+            self._powrprof = powrprof
+        return self._powrprof
+
+    def get_active_scheme(self):
+        powrprof = self._load_powrprof()
+        scheme_pointer = ctypes.POINTER(GUID)()
+        error_code = powrprof.PowerGetActiveScheme(None, ctypes.byref(scheme_pointer))
+        if error_code:
+            raise OSError(error_code, "PowerGetActiveScheme failed")
+        try:
+            return str(uuid.UUID(bytes_le=bytes(scheme_pointer.contents)))
+        finally:
+            ctypes.windll.kernel32.LocalFree(scheme_pointer)
+
+    def set_active_scheme(self, scheme_guid):
+        powrprof = self._load_powrprof()
+        power_scheme = GUID.from_buffer_copy(uuid.UUID(scheme_guid).bytes_le)
+        error_code = powrprof.PowerSetActiveScheme(None, ctypes.byref(power_scheme))
+        if error_code:
+            raise OSError(error_code, f"PowerSetActiveScheme {scheme_guid} failed")
+
+
+BALANCED_POWER_SCHEME = "381b4222-f694-41f0-9685-ff5bb260df2e"
+
+GAME_PROFILE_DEFINITIONS = {
+    "competitive": {
+        "description": "GameDVR/FSE behaviour, MMCSS responsiveness, network throttling and the Ultimate Performance scheme",
+        "selectors": [
+            {
+                "hive_root": winreg.HKEY_CURRENT_USER, "registry_path": r"System\GameConfigStore",
+                "baseline": {
+                    "GameDVR_Enabled": 1,
+                    "GameDVR_HonorUserFSEBehaviorMode": 0,
+                    "GameDVR_DXGIHonorFSEWindowsCompatible": 0,
+                    "GameDVR_EFSEFeatureFlags": 0,
+                    "GameDVR_FSEBehaviorMode": None,
+                    "GameDVR_FSEBehavior": None,
+                    "GameDVR_DSEBehavior": None
+                }
+            },
+            {
+                "hive_root": winreg.HKEY_LOCAL_MACHINE,
+                "registry_path": r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile",
+                "entry_names": ["SystemResponsiveness", "NetworkThrottlingIndex"],
+                "baseline": {"SystemResponsiveness": 20, "NetworkThrottlingIndex": 10}
+            }
+        ],
+        "power_scheme": "e9a42b02-d5df-448d-aa00-03f14749eb61",
+        "baseline_power_scheme": BALANCED_POWER_SCHEME
+    }
+}
+
+
+def load_game_profile_definitions(definitions_path=None):
+    profile_definitions = dict(GAME_PROFILE_DEFINITIONS)
+    if not definitions_path:
+        return profile_definitions
+    with open(definitions_path, "r", encoding="utf-8") as definitions_file:
+        for profile_name, profile_definition in json.load(definitions_file).items():
+            profile_definitions[profile_name] = {
+                "description": profile_definition.get("description", ""),
+                "selectors": [
+                    {
+                        "hive_root": REGISTRY_HIVES_BY_NAME[selector["hive"].upper()],
+                        "registry_path": selector["registry_path"],
+                        **({"entry_names": selector["entry_names"]} if "entry_names" in selector else {}),
+                        **({"baseline": selector["baseline"]} if "baseline" in selector else {})
+                    }
+                    for selector in profile_definition["selectors"]
+                ],
+                "power_scheme": profile_definition.get("power_scheme"),
+                "baseline_power_scheme": profile_definition.get("baseline_power_scheme", BALANCED_POWER_SCHEME)
+            }
+    return profile_definitions
+
+
+class GameProfileSwitcher:
+    def __init__(self, registry_backend, power_controller, profile_directory="profiles"):
+        self.registry_backend = registry_backend
+        self.power_controller = power_controller
+        self.profile_directory = profile_directory
+        self.journal_path = os.path.join(profile_directory, "game_switch_journal.jsonl")
+        self.journal_compaction_threshold = 256
+
+    def compiled_profile_path(self, profile_name):
+        return os.path.join(self.profile_directory, f"game_{profile_name}.json")
+
+    def _encode_value(self, entry_value):
+        return {"hex": entry_value.hex()} if isinstance(entry_value, bytes) else entry_value
+
+    def _decode_value(self, entry_value):
+        return bytes.fromhex(entry_value["hex"]) if isinstance(entry_value, dict) else entry_value
+
+    def _select_plan_values(self, profile_definition, optimization_plan):
+        selected_groups = []
+        for selector in profile_definition["selectors"]:
+            selector_key = normalize_registry_key(selector["hive_root"], selector["registry_path"])
+            wanted_names = {entry_name.lower() for entry_name in selector.get("entry_names", [])}
+            for key_group in optimization_plan["key_groups"]:
+                if normalize_registry_key(key_group["hive_root"], key_group["registry_path"]) != selector_key:
+                    continue
+                planned_values = [
+                    planned_value for planned_value in key_group["values"]
+                    if planned_value["action"] == "set" and (not wanted_names or planned_value["entry_name"].lower() in wanted_names)
+                ]
+                if planned_values:
+                    baseline_values = {entry_name.lower(): entry_value for entry_name, entry_value in selector.get("baseline", {}).items()}
+                    selected_groups.append((key_group["hive_root"], key_group["registry_path"], planned_values, baseline_values))
+        return selected_groups
+
+    def compile_profile(self, profile_name, profile_definition, optimization_plan):
+        if self.read_switch_state().get(profile_name) == "on":
+            raise RuntimeError(f"Profile {profile_name} is switched on; switch it off before recompiling its baseline")
+
+        on_groups, off_groups, baseline_warnings = [], [], []
+        for hive_root, registry_path, planned_values, baseline_values in self._select_plan_values(profile_definition, optimization_plan):
+            on_values, off_values = [], []
+            for planned_value in planned_values:
+                on_values.append({
+                    "action": "set", "entry_name": planned_value["entry_name"],
+                    "entry_value": self._encode_value(planned_value["entry_value"]), "data_type": planned_value["data_type"]
+                })
+                # The live value is only a baseline if the main run has not already written the profile value
+                if planned_value["entry_name"].lower() in baseline_values:
+                    baseline_value, baseline_type = baseline_values[planned_value["entry_name"].lower()], planned_value["data_type"]
+                else:
+                    try:
+                        baseline_value, baseline_type = self.registry_backend.read_value(hive_root, registry_path, planned_value["entry_name"])
+                    except FileNotFoundError:
+                        baseline_value, baseline_type = None, None
+                    if baseline_value == planned_value["entry_value"] and baseline_type == planned_value["data_type"]:
+                        baseline_warnings.append(f"{REGISTRY_HIVE_NAMES[hive_root]}\\{registry_path}\\{planned_value['entry_name']}")
+                        baseline_value = None
+                if baseline_value is None:
+                    off_values.append({"action": "delete", "entry_name": planned_value["entry_name"]})
+                else:
+                    off_values.append({
+                        "action": "set", "entry_name": planned_value["entry_name"],
+                        "entry_value": self._encode_value(baseline_value), "data_type": baseline_type
+                    })
+            hive_name = REGISTRY_HIVE_NAMES[hive_root]
+            on_groups.append({"hive": hive_name, "registry_path": registry_path, "values": on_values})
+            off_groups.append({"hive": hive_name, "registry_path": registry_path, "values": off_values})
+
+        baseline_scheme = None
+        if profile_definition.get("power_scheme"):
+            baseline_scheme = self.power_controller.get_active_scheme()
+            if baseline_scheme.lower() == profile_definition["power_scheme"].lower():
+                baseline_scheme = profile_definition.get("baseline_power_scheme", BALANCED_POWER_SCHEME)
+
+        compiled_profile = {
+            "profile_name": profile_name,
+            "description": profile_definition.get("description", ""),
+            "compiled_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "on": {"key_groups": on_groups, "power_scheme": profile_definition.get("power_scheme")},
+            "off": {"key_groups": off_groups, "power_scheme": baseline_scheme},
+            "baseline_warnings": baseline_warnings
+        }
+        os.makedirs(self.profile_directory, exist_ok=True)
+        with open(self.compiled_profile_path(profile_name), "w", encoding="utf-8") as profile_file:
+            json.dump(compiled_profile, profile_file, indent=2, ensure_ascii=False)
+        return compiled_profile
+
+    def _append_journal(self, journal_record):
+        os.makedirs(self.profile_directory, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(journal_record) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def _read_journal(self):
+        journal_records = []
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as journal_file:
+                for journal_line in journal_file:
+                    try:
+                        journal_records.append(json.loads(journal_line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        return journal_records
+
+    def read_switch_state(self):
+        switch_state = {}
+        for journal_record in self._read_journal():
+            if journal_record["event"] == "switch_completed":
+                switch_state[journal_record["profile"]] = journal_record["direction"]
+        return switch_state
+
+    def _compact_journal(self):
+        journal_records = self._read_journal()
+        if len(journal_records) < self.journal_compaction_threshold:
+            return
+        compacted_path = self.journal_path + ".tmp"
+        with open(compacted_path, "w", encoding="utf-8") as journal_file:
+            for profile_name, direction in self.read_switch_state().items():
+                journal_file.write(json.dumps({"event": "switch_completed", "profile": profile_name, "direction": direction}) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(compacted_path, self.journal_path)
+
+    def pending_switch(self):
+        journal_records = self._read_journal()
+        if journal_records and journal_records[-1]["event"] == "switch_started":
+            return journal_records[-1]
+        return None
+
+    def _apply_delta(self, profile_delta):
+        failures = []
+        for key_group in profile_delta["key_groups"]:
+            writer_group = {
+                "hive_root": REGISTRY_HIVES_BY_NAME[key_group["hive"]],
+                "registry_path": key_group["registry_path"],
+                "values": [
+                    dict(planned_value, entry_value=self._decode_value(planned_value["entry_value"]))
+                    if planned_value["action"] == "set" else planned_value
+                    for planned_value in key_group["values"]
+                ]
+            }
+            try:
+                self.registry_backend.write_key_group(writer_group)
+            except OSError as error:
+                failures.append(f"{key_group['hive']}\\{key_group['registry_path']}: {error}")
+        if profile_delta.get("power_scheme"):
+            try:
+                self.power_controller.set_active_scheme(profile_delta["power_scheme"])
+            except OSError as error:
+                failures.append(f"power scheme {profile_delta['power_scheme']}: {error}")
+        return failures
+
+    def switch(self, profile_name, direction):
+        switch_started_at = time.perf_counter()
+        with open(self.compiled_profile_path(profile_name), "r", encoding="utf-8") as profile_file:
+            compiled_profile = json.load(profile_file)
+
+        self._append_journal({"event": "switch_started", "profile": profile_name, "direction": direction, "at": round(time.time(), 3)})
+        failures = self._apply_delta(compiled_profile[direction])
+        if not failures:
+            self._append_journal({"event": "switch_completed", "profile": profile_name, "direction": direction, "at": round(time.time(), 3)})
+            self._compact_journal()
+        return {
+            "profile_name": profile_name, "direction": direction, "failures": failures,
+            "value_count": sum(len(key_group["values"]) for key_group in compiled_profile[direction]["key_groups"]),
+            "elapsed_ms": (time.perf_counter() - switch_started_at) * 1000
+        }
+
+    def recover(self):
+        pending_record = self.pending_switch()
+        if pending_record is None:
+            return None
+        return self.switch(pending_record["profile"], pending_record["direction"])
+
+
+PCI_ENUM_PATH = r"SYSTEM\CurrentControlSet\Enum\PCI"
+MSI_PROPERTIES_SUBPATH = r"Device Parameters\Interrupt Management\MessageSignaledInterruptProperties"
+AFFINITY_POLICY_SUBPATH = r"Device Parameters\Interrupt Management\Affinity Policy"
+IRQ_POLICY_SPECIFIED_PROCESSORS = 4
+KAFFINITY_BITS = 64
+
+INTERRUPT_POLICY_DEFAULTS = {
+    "gpu": {"class_guid": "{4d36e968-e325-11ce-bfc1-08002be10318}", "services": None, "msi": True, "message_limit": None, "affinity": "auto"},
+    "nic": {"class_guid": "{4d36e972-e325-11ce-bfc1-08002be10318}", "services": None, "msi": True, "message_limit": None, "affinity": "auto"},
+    "xhci": {"class_guid": "{36fc9e60-c465-11cf-8056-444553540000}", "services": ["usbxhci"], "msi": True, "message_limit": None, "affinity": "auto"}
+}
+
+
+def load_interrupt_policy(config_path=None, device_categories=None):
+    interrupt_policy = {category: dict(policy) for category, policy in INTERRUPT_POLICY_DEFAULTS.items()}
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as config_file:
+            for category, overrides in json.load(config_file).items():
+                if category not in interrupt_policy:
+                    raise ValueError(f"Unknown device category {category}; expected one of {', '.join(interrupt_policy)}")
+                interrupt_policy[category].update(overrides)
+    if device_categories:
+        interrupt_policy = {category: policy for category, policy in interrupt_policy.items() if category in device_categories}
+    return interrupt_policy
+
+
+def describe_affinity_mask(assignment_mask):
+    if not assignment_mask:
+        return "default"
+    return "CPU " + ",".join(str(cpu_index) for cpu_index in range(assignment_mask.bit_length()) if assignment_mask >> cpu_index & 1)
+
+
+class InterruptPolicyEngine:
+    def __init__(self, registry_backend, logical_cpu_count=None, physical_core_count=None):
+        self.registry_backend = registry_backend
+        self.logical_cpu_count = logical_cpu_count or psutil.cpu_count(logical=True) or 1
+        self.physical_core_count = physical_core_count or psutil.cpu_count(logical=False) or self.logical_cpu_count
+
+    def _read_optional_value(self, registry_path, entry_name):
+        try:
+            return self.registry_backend.read_value(winreg.HKEY_LOCAL_MACHINE, registry_path, entry_name)[0]
+        except OSError:
+            return None
+
+    def read_interrupt_state(self, instance_path):
+        msi_path = f"{instance_path}\\{MSI_PROPERTIES_SUBPATH}"
+        affinity_path = f"{instance_path}\\{AFFINITY_POLICY_SUBPATH}"
+        try:
+            self.registry_backend.enumerate_values(winreg.HKEY_LOCAL_MACHINE, msi_path)
+            msi_capable = True
+        except OSError:
+            msi_capable = False
+
+        assignment_override = self._read_optional_value(affinity_path, "AssignmentSetOverride")
+        if isinstance(assignment_override, bytes):
+            assignment_override = int.from_bytes(assignment_override, "little")
+        return {
+            "msi_capable": msi_capable,
+            "msi_supported": self._read_optional_value(msi_path, "MSISupported"),
+            "message_limit": self._read_optional_value(msi_path, "MessageNumberLimit"),
+            "device_policy": self._read_optional_value(affinity_path, "DevicePolicy"),
+            "assignment_mask": assignment_override or 0
+        }
+
+    def enumerate_pci_devices(self, interrupt_policy):
+        pci_devices = []
+        try:
+            hardware_ids = self.registry_backend.enumerate_subkeys(winreg.HKEY_LOCAL_MACHINE, PCI_ENUM_PATH)
+        except OSError:
+            return pci_devices
+
+        for hardware_id in hardware_ids:
+            try:
+                instance_ids = self.registry_backend.enumerate_subkeys(winreg.HKEY_LOCAL_MACHINE, f"{PCI_ENUM_PATH}\\{hardware_id}")
+            except OSError:
+                continue
+            for instance_id in instance_ids:
+                instance_path = f"{PCI_ENUM_PATH}\\{hardware_id}\\{instance_id}"
+                try:
+                    instance_values = {
+                        entry_name.lower(): entry_value
+                        for entry_name, entry_value, _ in self.registry_backend.enumerate_values(winreg.HKEY_LOCAL_MACHINE, instance_path)
+                    }
+                    instance_subkeys = {subkey_name.lower() for subkey_name in self.registry_backend.enumerate_subkeys(winreg.HKEY_LOCAL_MACHINE, instance_path)}
+                except OSError:
+                    continue
+
+                class_guid = str(instance_values.get("classguid", "")).lower()
+                service_name = str(instance_values.get("service", "")).lower()
+                for category, policy in interrupt_policy.items():
+                    if class_guid != policy["class_guid"].lower():
+                        continue
+                    if policy.get("services") and service_name not in [service.lower() for service in policy["services"]]:
+                        continue
+                    device_description = str(instance_values.get("friendlyname") or instance_values.get("devicedesc") or hardware_id)
+                    pci_devices.append({
+                        "category": category,
+                        "device_name": device_description.split(";")[-1],
+                        "instance_path": instance_path,
+                        "present": "control" in instance_subkeys,
+                        "before": self.read_interrupt_state(instance_path)
+                    })
+                    break
+        return pci_devices
+
+    def _automatic_affinity_cpus(self):
+        threads_per_core = max(1, self.logical_cpu_count // max(1, self.physical_core_count))
+        return [
+            core_index * threads_per_core for core_index in range(1, self.physical_core_count)
+            if core_index * threads_per_core < KAFFINITY_BITS
+        ]
+
+    def plan(self, interrupt_policy, pci_devices):
+        automatic_cpus = self._automatic_affinity_cpus()
+        automatic_index = 0
+        planned_devices = []
+        for pci_device in sorted(pci_devices, key=lambda device: list(interrupt_policy).index(device["category"])):
+            policy = interrupt_policy[pci_device["category"]]
+            before_state = pci_device["before"]
+            target_state = dict(before_state)
+            validation_notes = []
+
+            if not pci_device["present"]:
+                validation_notes.append("device not present, left unchanged")
+                planned_devices.append(dict(pci_device, target=target_state, notes=validation_notes, changed=False))
+                continue
+
+            if policy.get("msi") is not None:
+                if not before_state["msi_capable"]:
+                    validation_notes.append("driver does not declare MSI support (no MessageSignaledInterruptProperties key)")
+                else:
+                    target_state["msi_supported"] = 1 if policy["msi"] else 0
+
+            message_limit = policy.get("message_limit")
+            if message_limit is not None:
+                if not before_state["msi_capable"] or target_state["msi_supported"] != 1:
+                    validation_notes.append("message limit ignored without MSI mode")
+                elif not isinstance(message_limit, int) or not 1 <= message_limit <= 2048:
+                    validation_notes.append(f"message limit {message_limit} outside 1-2048")
+                else:
+                    target_state["message_limit"] = message_limit
+
+            affinity_setting = policy.get("affinity")
+            if affinity_setting == "auto":
+                if not automatic_cpus:
+                    validation_notes.append("single core system, affinity left to Windows")
+                else:
+                    affinity_cpus = [automatic_cpus[automatic_index % len(automatic_cpus)]]
+                    automatic_index += 1
+                    target_state["device_policy"] = IRQ_POLICY_SPECIFIED_PROCESSORS
+                    target_state["assignment_mask"] = 1 << affinity_cpus[0]
+            elif affinity_setting and not isinstance(affinity_setting, list):
+                validation_notes.append(f"affinity {affinity_setting!r} must be \"auto\" or a list of CPU indexes")
+            elif affinity_setting:
+                malformed_cpus = [cpu_index for cpu_index in affinity_setting if type(cpu_index) is not int or cpu_index < 0]
+                missing_cpus = [cpu_index for cpu_index in affinity_setting if cpu_index not in malformed_cpus and cpu_index >= self.logical_cpu_count]
+                unaddressable_cpus = [cpu_index for cpu_index in affinity_setting if cpu_index not in malformed_cpus and cpu_index >= KAFFINITY_BITS]
+                if malformed_cpus:
+                    validation_notes.append(f"CPU entries {malformed_cpus} are not non-negative integers, affinity left unchanged")
+                elif missing_cpus:
+                    validation_notes.append(f"CPU {missing_cpus} not present ({self.logical_cpu_count} logical CPUs)")
+                elif unaddressable_cpus:
+                    validation_notes.append(f"CPU {unaddressable_cpus} outside the first {KAFFINITY_BITS} (AssignmentSetOverride holds a single KAFFINITY)")
+                else:
+                    if 0 in affinity_setting:
+                        validation_notes.append("affinity includes core 0")
+                    target_state["device_policy"] = IRQ_POLICY_SPECIFIED_PROCESSORS
+                    target_state["assignment_mask"] = sum(1 << cpu_index for cpu_index in set(affinity_setting))
+
+            changed = any(target_state[state_key] != before_state[state_key] for state_key in ("msi_supported", "message_limit", "device_policy", "assignment_mask"))
+            planned_devices.append(dict(pci_device, target=target_state, notes=validation_notes, changed=changed))
+        return planned_devices
+
+    def apply(self, planned_devices):
+        for planned_device in planned_devices:
+            if not planned_device["changed"]:
+                planned_device["after"] = planned_device["before"]
+                continue
+            before_state, target_state = planned_device["before"], planned_device["target"]
+            msi_values = [
+                {"action": "set", "entry_name": entry_name, "entry_value": target_state[state_key], "data_type": winreg.REG_DWORD}
+                for entry_name, state_key in (("MSISupported", "msi_supported"), ("MessageNumberLimit", "message_limit"))
+                if target_state[state_key] is not None and target_state[state_key] != before_state[state_key]
+            ]
+            affinity_values = []
+            if not 0 <= (target_state["assignment_mask"] or 0) < 1 << KAFFINITY_BITS:
+                planned_device["notes"].append(f"affinity mask 0x{target_state['assignment_mask']:X} does not fit a {KAFFINITY_BITS}-bit KAFFINITY, not written")
+            elif target_state["assignment_mask"] != before_state["assignment_mask"] or target_state["device_policy"] != before_state["device_policy"]:
+                affinity_values = [
+                    {"action": "set", "entry_name": "DevicePolicy", "entry_value": target_state["device_policy"], "data_type": winreg.REG_DWORD},
+                    {"action": "set", "entry_name": "AssignmentSetOverride", "entry_value": target_state["assignment_mask"].to_bytes(8, "little"), "data_type": winreg.REG_BINARY}
+                ]
+            try:
+                if msi_values:
+                    self.registry_backend.write_key_group({
+                        "hive_root": winreg.HKEY_LOCAL_MACHINE, "registry_path": f"{planned_device['instance_path']}\\{MSI_PROPERTIES_SUBPATH}", "values": msi_values
+                    })
+                if affinity_values:
+                    self.registry_backend.write_key_group({
+                        "hive_root": winreg.HKEY_LOCAL_MACHINE, "registry_path": f"{planned_device['instance_path']}\\{AFFINITY_POLICY_SUBPATH}", "values": affinity_values
+                    })
+            except OSError as error:
+                planned_device["notes"].append(f"write failed: {error}")
+            planned_device["after"] = self.read_interrupt_state(planned_device["instance_path"])
+        return planned_devices
+
+
+class TOGGLEKEYS(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.wintypes.UINT), ("dwFlags", ctypes.wintypes.DWORD)]
+
+
+SPI_SETTOGGLEKEYS = 0x0035
+SPI_SETMENUSHOWDELAY = 0x006B
+SPIF_UPDATEINIFILE = 0x0001
+SPIF_SENDCHANGE = 0x0002
+
+ACTIVATION_RULES = [
+    {
+        "hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Desktop",
+        "entry_names": {"menushowdelay"}, "activation": "spi", "spi_action": SPI_SETMENUSHOWDELAY
+    },
+    {
+        "hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Desktop",
+        "entry_names": {"hungapptimeout", "waittokillapptimeout", "autoendtasks", "lowlevelhookstimeout"}, "activation": "logon"
+    },
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Desktop", "activation": "settings-broadcast"},
+    {
+        "hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Mouse",
+        "entry_names": {"rawmousethrottleduration"}, "activation": "logon"
+    },
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Mouse", "activation": "settings-broadcast"},
+    {
+        "hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Accessibility\ToggleKeys",
+        "entry_names": {"flags"}, "activation": "spi", "spi_action": SPI_SETTOGGLEKEYS
+    },
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"Control Panel\Accessibility", "activation": "logon"},
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"System\GameConfigStore", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"SOFTWARE\Microsoft\GameBar", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_CURRENT_USER, "path_prefix": r"SOFTWARE\Microsoft\Windows\CurrentVersion\GameDVR", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Microsoft\PolicyManager\default\ApplicationManagement\AllowGameDVR", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Policies\Microsoft\Windows\GameDVR", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Microsoft\Direct3D", "activation": "next-launch"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\WOW6432Node\Microsoft\Direct3D", "activation": "next-launch"},
+    {
+        "hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SYSTEM\CurrentControlSet\Control\PriorityControl",
+        "entry_names": {"win32priorityseparation"}, "activation": "live"
+    },
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Microsoft\Windows\CurrentVersion\DriverSearching", "activation": "live"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Policies\Microsoft\Windows\WindowsUpdate", "activation": "live"},
+    {"hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SOFTWARE\Microsoft\Windows\CurrentVersion\WindowsUpdate", "activation": "live"},
+    {
+        "hive_root": winreg.HKEY_LOCAL_MACHINE, "path_prefix": r"SYSTEM\CurrentControlSet\Control\Power",
+        "entry_names": {"hibernateenabled"}, "activation": "powercfg",
+        "refresh_commands": {0: "powercfg /hibernate off", 1: "powercfg /hibernate on"}
+    }
+]
+
+REBOOT_REQUIRED_COMMAND_STEPS = [
+    (11, "Boot configuration timing (bcdedit tick and TSC policy)"),
+    (12, "Device-level power saving flags under Enum"),
+    (14, "Memory compression adjustment")
+]
+
+
+def classify_entry_activation(optimization_entry, entry_name, entry_value):
+    if optimization_entry.get("managed_service"):
+        return "service-stop", optimization_entry["managed_service"]
+
+    normalized_hive, normalized_path = normalize_registry_key(optimization_entry["hive_root"], optimization_entry["registry_path"])
+    for activation_rule in ACTIVATION_RULES:
+        rule_hive, rule_path = normalize_registry_key(activation_rule["hive_root"], activation_rule["path_prefix"])
+        if rule_hive != normalized_hive or not (normalized_path + "\\").startswith(rule_path + "\\"):
+            continue
+        if "entry_names" in activation_rule and (entry_name or "").lower() not in activation_rule["entry_names"]:
+            continue
+        if activation_rule["activation"] == "powercfg":
+            refresh_command = activation_rule["refresh_commands"].get(entry_value)
+            return ("powercfg", refresh_command) if refresh_command else ("reboot", None)
+        if activation_rule["activation"] == "spi":
+            try:
+                return "spi", (activation_rule["spi_action"], int(entry_value))
+            except (TypeError, ValueError):
+                return "logon", None
+        return activation_rule["activation"], None
+    return "reboot", None
+
+
 class WindowsPerformanceOptimizer:
-    def __init__(self, graphics_hardware=None, storage_drive=None):
+    def __init__(self, graphics_hardware=None, storage_drive=None, apply_method="registry-api",
+                 command_timeout_seconds=120.0, run_budget_seconds=None):
+        self.apply_method = apply_method
+        self.run_report_path = None
+        self.hot_apply = False
+        self.activation_records = []
+        self.failed_registry_keys = set()
+        self.checkpoint_path = None
+        self.resume_run = False
+        self.checkpoint_journal = None
+        self.current_stage_key = None
+        self.command_runner = DeadlineCommandRunner(command_timeout_seconds, run_budget_seconds)
+        self.registry_codec = RegistryFileCodec()
+        self.registry_backend = WindowsRegistryBackend()
+        self.plan_compiler = OptimizationPlanCompiler()
         self.graphics_card_type = graphics_hardware or self.identify_graphics_hardware()
         self.storage_medium_type = storage_drive or self.determine_storage_media_type()
         self.ram_gb = self.get_total_ram_gb()
+        self.service_controller = WindowsServiceController()
         
         self._initialize_core_system_settings()
         self._initialize_latency_reduction_settings()
@@ -34,15 +3023,18 @@ class WindowsPerformanceOptimizer:
 
     def identify_graphics_hardware(self):
         try:
-            query_result = subprocess.run(
-                'wmic path win32_VideoController get name',
-                shell=True, capture_output=True, text=True
-            )
-            raw_output = query_result.stdout.lower()
+            try:
+                query_result = self.command_runner.run(
+                    'wmic path win32_VideoController get name',
+                    timeout_seconds=20, text=True
+                )
+                raw_output = query_result.stdout.lower()
+            except subprocess.TimeoutExpired:
+                raw_output = ''
             if not raw_output.strip() or 'name' not in raw_output:
-                query_result = subprocess.run(
+                query_result = self.command_runner.run(
                     ['powershell', '-Command', 'Get-CimInstance Win32_VideoController | Select-Object -ExpandProperty Name'],
-                    capture_output=True, text=True
+                    timeout_seconds=30, retries=1, text=True
                 )
                 raw_output = query_result.stdout.lower()
 
@@ -59,9 +3051,9 @@ class WindowsPerformanceOptimizer:
 
     def determine_storage_media_type(self):
         try:
-            disk_query = subprocess.run(
+            disk_query = self.command_runner.run(
                 ['powershell', '-Command', 'Get-PhysicalDisk | Select-Object MediaType'],
-                capture_output=True, text=True
+                timeout_seconds=30, retries=1, text=True
             )
             raw_output = disk_query.stdout.lower()
             
@@ -81,7 +3073,7 @@ class WindowsPerformanceOptimizer:
         except:
             try:
                 # Fallback to wmic if psutil fails
-                query = subprocess.run('wmic computersystem get totalphysicalmemory', shell=True, capture_output=True, text=True)
+                query = self.command_runner.run('wmic computersystem get totalphysicalmemory', timeout_seconds=20, text=True)
                 total_bytes = int(query.stdout.split('\n')[1].strip())
                 return round(total_bytes / (1024**3))
             except:
@@ -122,6 +3114,7 @@ class WindowsPerformanceOptimizer:
             },
             {
                 "registry_path": r"SYSTEM\ControlSet001\Services\luafv",
+                "managed_service": "luafv",
                 "entry_name": "Start",
                 "entry_value": 4,
                 "data_type": winreg.REG_DWORD,
@@ -154,6 +3147,7 @@ class WindowsPerformanceOptimizer:
             },
             {
                 "registry_path": r"SYSTEM\CurrentControlSet\Services\EventLog",
+                "managed_service": "EventLog",
                 "entry_name": "Start",
                 "entry_value": 4,
                 "data_type": winreg.REG_DWORD,
@@ -638,6 +3632,7 @@ class WindowsPerformanceOptimizer:
             },
             {
                 "registry_path": r"SYSTEM\CurrentControlSet\Services\Ndu",
+                "managed_service": "Ndu",
                 "entry_name": "Start",
                 "entry_value": 4,
                 "data_type": winreg.REG_DWORD,
@@ -666,44 +3661,336 @@ class WindowsPerformanceOptimizer:
             }
         ]
 
+    def collect_registry_stages(self):
+        if self.video_card_optimizations:
+            video_card_stage_title = f"{self.graphics_card_type} Graphics Specific Tuning"
+        else:
+            video_card_stage_title = f"Skipping Video Card Tuning (Hardware: {self.graphics_card_type})"
+
+        return [
+            (1, "Core System Adjustments", self.core_system_adjustments),
+            (2, "Processing Latency Reductions", self.delay_reduction_optimizations),
+            (3, "Memory Allocation Optimizations", self.memory_optimization_settings),
+            (4, f"Storage Optimization ({self.storage_medium_type})", self.storage_adjustments),
+            (5, "Processor Efficiency Adjustments", self.processor_performance_tweaks),
+            (6, "Display Frame Rate Smoothing", self.frame_rate_adjustments),
+            (7, "Power Delivery Configuration", self.energy_management_optimizations),
+            (8, video_card_stage_title, self.video_card_optimizations),
+            (9, "Network Throughput Optimizations", self.internet_connection_settings),
+            (10, "Peripheral and Driver Configuration", self.peripheral_and_driver_optimizations)
+        ]
+
+    def apply_tuned_profile(self, profile_path, ignore_fingerprint=False):
+        with open(profile_path, "r", encoding="utf-8") as profile_file:
+            tuned_profile = json.load(profile_file)
+
+        current_fingerprint = describe_hardware_fingerprint(self.graphics_card_type)
+        profile_fingerprint = tuned_profile.get("hardware_fingerprint", {})
+        mismatched_fields = [
+            field_name for field_name in current_fingerprint
+            if profile_fingerprint.get(field_name) != current_fingerprint[field_name]
+        ]
+        if mismatched_fields:
+            mismatch_description = ", ".join(
+                f"{field_name} {profile_fingerprint.get(field_name)!r} != {current_fingerprint[field_name]!r}" for field_name in mismatched_fields
+            )
+            if not ignore_fingerprint:
+                status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Tuned profile {profile_path} was measured on different hardware ({mismatch_description}); not applied")
+                return 0
+            status_logger.info(f"  {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} Tuned profile hardware differs ({mismatch_description}); applying anyway")
+
+        registry_types_by_name = {type_name: data_type for data_type, type_name in REGISTRY_TYPE_NAMES.items()}
+
+        overridden_count = 0
+        for tuned_entry in tuned_profile["entries"]:
+            tuned_key = normalize_registry_key(REGISTRY_HIVES_BY_NAME[tuned_entry["hive_root"]], tuned_entry["registry_path"])
+            for _, _, stage_entries in self.collect_registry_stages():
+                for optimization_entry in stage_entries:
+                    if normalize_registry_key(optimization_entry["hive_root"], optimization_entry["registry_path"]) != tuned_key:
+                        continue
+                    if optimization_entry["data_type"] != registry_types_by_name[tuned_entry["data_type"]]:
+                        continue
+                    if tuned_entry["entry_name"] in optimization_entry.get("multiple_entries", {}):
+                        optimization_entry["multiple_entries"][tuned_entry["entry_name"]] = tuned_entry["entry_value"]
+                        overridden_count += 1
+                    elif optimization_entry.get("entry_name") == tuned_entry["entry_name"]:
+                        optimization_entry["entry_value"] = tuned_entry["entry_value"]
+                        overridden_count += 1
+        status_logger.info(f"Tuned profile: {overridden_count} catalog values overridden from {profile_path}")
+        return overridden_count
+
     def check_administrative_privileges(self):
         try:
             return ctypes.windll.shell32.IsUserAnAdmin()
         except:
             return False
 
-    def execute_shell_command(self, shell_command, visual_description):
+    def open_checkpoint_journal(self):
+        if not self.checkpoint_path:
+            return
+        run_options = {
+            "apply_method": self.apply_method, "graphics_hardware": self.graphics_card_type,
+            "storage_medium": self.storage_medium_type, "hot_apply": self.hot_apply
+        }
+        self.checkpoint_journal = RunCheckpointJournal(self.checkpoint_path)
+        resume = False
+        if self.resume_run:
+            if not self.checkpoint_journal.load():
+                status_logger.info(f"{Fore.YELLOW}[NOTICE]{Style.RESET_ALL} No checkpoint at {self.checkpoint_path}, starting from stage 1")
+            elif self.checkpoint_journal.run_completed:
+                status_logger.info(f"{Fore.YELLOW}[NOTICE]{Style.RESET_ALL} The checkpointed run already finished, starting from stage 1")
+            elif self.checkpoint_journal.run_options != run_options:
+                status_logger.info(f"{Fore.YELLOW}[NOTICE]{Style.RESET_ALL} The checkpoint was written with different options, starting from stage 1")
+            else:
+                resume = True
+                in_flight_stage = self.checkpoint_journal.in_flight_stage()
+                status_logger.info(
+                    f"Resume: {len(self.checkpoint_journal.completed_stages)} stages and "
+                    f"{len(self.checkpoint_journal.completed_commands)} commands already completed"
+                    + (f", re-verifying stage {in_flight_stage}" if in_flight_stage else "")
+                )
+        self.checkpoint_journal.open(run_options, resume)
+
+    def begin_checkpoint_stage(self, stage_key):
+        self.current_stage_key = stage_key
+        if self.checkpoint_journal is None:
+            return True
+        if stage_key in self.checkpoint_journal.completed_stages:
+            status_logger.info(f"  {Fore.GREEN}[CHECKPOINT]{Style.RESET_ALL} Completed in a previous run, skipping")
+            return False
+        self.checkpoint_journal.record_stage_started(stage_key)
+        return True
+
+    def complete_checkpoint_stage(self, stage_key):
+        if self.checkpoint_journal is not None:
+            self.checkpoint_journal.record_stage_completed(stage_key)
+
+    def _command_checkpoint_key(self, shell_command):
+        command_text = shell_command if isinstance(shell_command, str) else "\x00".join(shell_command)
+        return f"{self.current_stage_key}:{hashlib.sha1(command_text.encode('utf-8')).hexdigest()[:16]}"
+
+    def execute_shell_command(self, shell_command, visual_description, timeout_seconds=None, retries=0):
         status_logger.info(f"System: {visual_description}")
+        command_key = self._command_checkpoint_key(shell_command)
+        if self.checkpoint_journal is not None and command_key in self.checkpoint_journal.completed_commands:
+            status_logger.info(f"  {Fore.GREEN}[CHECKPOINT]{Style.RESET_ALL} Completed in a previous run, skipping")
+            return True
         try:
-            is_using_shell = isinstance(shell_command, str)
-            subprocess.run(shell_command, shell=is_using_shell, check=True, capture_output=True)
+            self.command_runner.run(shell_command, timeout_seconds=timeout_seconds, retries=retries, check=True)
             status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL}")
+            if self.checkpoint_journal is not None:
+                self.checkpoint_journal.record_command_completed(command_key)
             return True
         except subprocess.CalledProcessError as error:
             status_logger.error(f"  {Fore.RED}[ERROR] {error}{Style.RESET_ALL}")
             return False
+        except subprocess.TimeoutExpired as error:
+            if error.timeout:
+                status_logger.error(f"  {Fore.RED}[TIMEOUT]{Style.RESET_ALL} Process tree terminated after {error.timeout:.0f}s, continuing")
+            else:
+                status_logger.error(f"  {Fore.RED}[SKIPPED]{Style.RESET_ALL} Run time budget exhausted")
+            return False
+        except OSError as error:
+            status_logger.error(f"  {Fore.RED}[ERROR] {error}{Style.RESET_ALL}")
+            return False
 
     def modify_registry_configuration(self, optimization_entry):
+        if optimization_entry.get("managed_service"):
+            status_logger.info(f"Service: {optimization_entry['task_description']}")
+            self.configure_service_start_types({optimization_entry["managed_service"]: optimization_entry["entry_value"]})
+            return
+
         status_logger.info(f"Registry: {optimization_entry['task_description']}")
         
         if optimization_entry.get("apply_to_all_subkeys"):
             self._apply_settings_to_all_subkeys(optimization_entry)
             return
 
-        active_entries = {}
-        if "multiple_entries" in optimization_entry:
-            active_entries = optimization_entry["multiple_entries"]
-        else:
-            active_entries = {optimization_entry["entry_name"]: optimization_entry["entry_value"]}
-
         try:
-            with winreg.CreateKeyEx(optimization_entry["hive_root"], optimization_entry["registry_path"], 0, winreg.KEY_SET_VALUE) as registry_handle:
-                for name, val in active_entries.items():
-                    winreg.SetValueEx(registry_handle, name, 0, optimization_entry["data_type"], val)
+            self._write_registry_entry(optimization_entry)
             status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL}")
         except OSError as error:
+            self.record_registry_write_failure(optimization_entry["hive_root"], optimization_entry["registry_path"])
             status_logger.error(f"  {Fore.RED}[ERROR] {error}{Style.RESET_ALL}")
 
+    def record_registry_write_failure(self, hive_root, registry_path):
+        self.failed_registry_keys.add(normalize_registry_key(hive_root, registry_path))
+
+    def _write_registry_entry(self, optimization_entry):
+        if optimization_entry.get("delete_key"):
+            self._delete_registry_tree(optimization_entry["hive_root"], optimization_entry["registry_path"])
+            return
+
+        with winreg.CreateKeyEx(optimization_entry["hive_root"], optimization_entry["registry_path"], 0, winreg.KEY_SET_VALUE) as registry_handle:
+            for name in optimization_entry.get("delete_entries", []):
+                try:
+                    winreg.DeleteValue(registry_handle, name)
+                except FileNotFoundError:
+                    pass
+            for name, val in iterate_entry_values(optimization_entry):
+                winreg.SetValueEx(registry_handle, name, 0, optimization_entry["data_type"], val)
+
+    def _delete_registry_tree(self, hive_root, registry_path):
+        self.registry_backend.delete_key_tree(hive_root, registry_path)
+
+    def _expand_subkey_entries(self, registry_template):
+        expanded_entries = []
+        with winreg.OpenKey(registry_template["hive_root"], registry_template["registry_path"], 0, winreg.KEY_READ) as parent_key:
+            while True:
+                try:
+                    subkey_name = winreg.EnumKey(parent_key, len(expanded_entries))
+                except OSError:
+                    break
+                expanded_entry = {key: value for key, value in registry_template.items() if key != "apply_to_all_subkeys"}
+                expanded_entry["registry_path"] = f"{registry_template['registry_path']}\\{subkey_name}"
+                expanded_entries.append(expanded_entry)
+        return expanded_entries
+
+    def build_registry_bundle_entries(self, catalog_entries):
+        bundle_entries = []
+        direct_entries = []
+        for optimization_entry in catalog_entries:
+            if optimization_entry.get("managed_service"):
+                direct_entries.append(optimization_entry)
+            elif optimization_entry.get("apply_to_all_subkeys"):
+                try:
+                    bundle_entries.extend(self._expand_subkey_entries(optimization_entry))
+                except OSError:
+                    direct_entries.append(optimization_entry)
+            else:
+                bundle_entries.append(optimization_entry)
+        return bundle_entries, direct_entries
+
+    def import_registry_bundle(self, bundle_entries, visual_description):
+        bundle_handle, bundle_path = tempfile.mkstemp(prefix="antweaker_", suffix=".reg")
+        os.close(bundle_handle)
+        try:
+            self.registry_codec.write_bundle(bundle_entries, bundle_path)
+            return self.execute_shell_command(["reg", "import", bundle_path], visual_description)
+        finally:
+            os.remove(bundle_path)
+
+    def apply_catalog_with_reg_import(self, registry_stages):
+        optimization_plan = self.plan_compiler.compile(registry_stages)
+        self._report_plan_diagnostics(optimization_plan)
+        bundle_entries, direct_entries = self.build_registry_bundle_entries(
+            self.plan_compiler.plan_to_catalog_entries(optimization_plan) + optimization_plan["subkey_templates"]
+        )
+        value_count = sum(len(list(iterate_entry_values(entry))) for entry in bundle_entries)
+
+        if not self.import_registry_bundle(bundle_entries, f"Importing compiled catalog bundle ({len(bundle_entries)} keys, {value_count} values)"):
+            status_logger.info(f"  {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} Bundle import failed, falling back to grouped writes")
+            self.execute_optimization_plan(optimization_plan)
+            return
+
+        for optimization_entry in direct_entries:
+            self.modify_registry_configuration(optimization_entry)
+        if optimization_plan["service_start_types"]:
+            status_logger.info("Service: Apply catalog service start types")
+            self.configure_service_start_types(optimization_plan["service_start_types"])
+
+    def compile_optimization_plan(self, stage_numbers=None):
+        registry_stages = [
+            stage for stage in self.collect_registry_stages() if not stage_numbers or stage[0] in stage_numbers
+        ]
+        return self.plan_compiler.compile(registry_stages)
+
+    def apply_catalog_to_user_profiles(self, stage_numbers=None, include_default_profile=False):
+        optimization_plan = self.compile_optimization_plan(stage_numbers)
+        user_key_groups = [key_group for key_group in optimization_plan["key_groups"] if key_group["hive_root"] == winreg.HKEY_CURRENT_USER]
+        profile_applier = UserProfileHiveApplier(self.command_runner, self.registry_backend, self.write_key_group)
+        user_profiles = profile_applier.enumerate_user_profiles(include_default_profile)
+        status_logger.info(f"Profiles: {len(user_key_groups)} HKEY_CURRENT_USER keys for {len(user_profiles)} user profiles")
+
+        profile_results = profile_applier.apply(user_profiles, user_key_groups)
+        for profile_result in profile_results:
+            profile_label = f"{os.path.basename(profile_result['profile_path'])} ({profile_result['sid']})"
+            hive_note = "offline hive loaded and unloaded" if profile_result["loaded_by_us"] else "hive already loaded"
+            if profile_result["outcome"] == "completed":
+                status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {profile_label}: {profile_result['groups_written']} keys, {hive_note}")
+            elif profile_result["outcome"] == "missing hive":
+                status_logger.info(f"  {Fore.YELLOW}[SKIPPED]{Style.RESET_ALL} {profile_label}: NTUSER.DAT not found")
+            else:
+                status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {profile_label}: {profile_result['outcome']}")
+            for error_message in profile_result["errors"]:
+                status_logger.error(f"    {Fore.RED}[ERROR]{Style.RESET_ALL} {error_message}")
+        return profile_results
+
+    def _report_plan_diagnostics(self, optimization_plan):
+        plan_statistics = optimization_plan["statistics"]
+        status_logger.info(
+            f"Plan: {plan_statistics['catalog_values']} catalog values -> {plan_statistics['planned_values']} writes "
+            f"across {plan_statistics['keys']} keys ({plan_statistics['redundant_writes']} redundant dropped)"
+        )
+        for conflict in optimization_plan["diagnostics"]["conflicts"]:
+            status_logger.info(
+                f"  {Fore.YELLOW}[CONFLICT]{Style.RESET_ALL} {conflict['target']}: stage {conflict['previous']['stages']} "
+                f"{conflict['previous']['entry_value']!r} ({conflict['previous']['data_type']}) overridden by stage "
+                f"{conflict['winning']['stages']} {conflict['winning']['entry_value']!r} ({conflict['winning']['data_type']})"
+            )
+
+    def write_key_group(self, key_group):
+        self.registry_backend.write_key_group(key_group)
+
+    def execute_optimization_plan(self, optimization_plan):
+        failed_groups = 0
+        for key_group in optimization_plan["key_groups"]:
+            try:
+                self.write_key_group(key_group)
+            except OSError as error:
+                failed_groups += 1
+                self.record_registry_write_failure(key_group["hive_root"], key_group["registry_path"])
+                status_logger.error(
+                    f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {REGISTRY_HIVE_NAMES[key_group['hive_root']]}\\{key_group['registry_path']}: {error}"
+                )
+        status_logger.info(
+            f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {len(optimization_plan['key_groups']) - failed_groups}/{len(optimization_plan['key_groups'])} keys written"
+        )
+
+        for subkey_template in optimization_plan["subkey_templates"]:
+            self.modify_registry_configuration(subkey_template)
+        if optimization_plan["service_start_types"]:
+            status_logger.info("Service: Apply catalog service start types")
+            self.configure_service_start_types(optimization_plan["service_start_types"])
+
+    def benchmark_registry_apply_methods(self, key_count=500, values_per_key=20):
+        benchmark_root = r"Software\ANTweaker\Benchmark"
+        synthetic_entries = [
+            {
+                "registry_path": f"{benchmark_root}\\Key{key_index:05d}",
+                "multiple_entries": {f"Value{value_index:03d}": key_index * values_per_key + value_index for value_index in range(values_per_key)},
+                "data_type": winreg.REG_DWORD,
+                "hive_root": winreg.HKEY_CURRENT_USER,
+                "task_description": f"Synthetic benchmark key {key_index}"
+            }
+            for key_index in range(key_count)
+        ]
+
+        status_logger.info(f"Benchmark: {key_count} keys x {values_per_key} values under HKEY_CURRENT_USER\\{benchmark_root}")
+        self._delete_registry_tree(winreg.HKEY_CURRENT_USER, benchmark_root)
+
+        started_at = time.perf_counter()
+        for synthetic_entry in synthetic_entries:
+            self._write_registry_entry(synthetic_entry)
+        per_value_seconds = time.perf_counter() - started_at
+        self._delete_registry_tree(winreg.HKEY_CURRENT_USER, benchmark_root)
+
+        started_at = time.perf_counter()
+        bundle_handle, bundle_path = tempfile.mkstemp(prefix="antweaker_", suffix=".reg")
+        os.close(bundle_handle)
+        try:
+            self.registry_codec.write_bundle(synthetic_entries, bundle_path)
+            self.command_runner.run(["reg", "import", bundle_path], timeout_seconds=600, check=True)
+        finally:
+            os.remove(bundle_path)
+        reg_import_seconds = time.perf_counter() - started_at
+        self._delete_registry_tree(winreg.HKEY_CURRENT_USER, benchmark_root)
+
+        status_logger.info(f"  Per-value API writes: {Fore.YELLOW}{per_value_seconds:.3f}s{Style.RESET_ALL}")
+        status_logger.info(f"  Single reg import:    {Fore.YELLOW}{reg_import_seconds:.3f}s{Style.RESET_ALL} (including bundle compilation)")
+        status_logger.info(f"  Speedup:              {Fore.GREEN}{per_value_seconds / reg_import_seconds:.2f}x{Style.RESET_ALL}")
+        return {"per_value_seconds": per_value_seconds, "reg_import_seconds": reg_import_seconds}
+
     def _apply_settings_to_all_subkeys(self, registry_template):
         try:
             with winreg.OpenKey(registry_template["hive_root"], registry_template["registry_path"], 0, winreg.KEY_READ) as parent_key:
@@ -721,8 +4008,45 @@ class WindowsPerformanceOptimizer:
                         break
             status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} Modifications applied to all subkeys")
         except OSError as error:
+            self.record_registry_write_failure(registry_template["hive_root"], registry_template["registry_path"])
             status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Access denied to subkeys: {error}")
 
+    def configure_service_start_types(self, start_type_by_service):
+        configuration_results = self.service_controller.configure_start_types(start_type_by_service)
+        for service_name, configuration_method in configuration_results.items():
+            start_type_name = SERVICE_START_TYPE_NAMES.get(start_type_by_service[service_name], start_type_by_service[service_name])
+            if configuration_method in ("scm", "registry"):
+                status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {service_name} start type set to {start_type_name} ({configuration_method})")
+            elif configuration_method == "missing":
+                status_logger.info(f"  {Fore.YELLOW}[SKIPPED]{Style.RESET_ALL} {service_name} is not installed")
+            else:
+                status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {service_name}: {configuration_method}")
+        return configuration_results
+
+    def stop_services_and_report(self, service_names):
+        try:
+            stop_results = self.service_controller.stop_services_concurrently(service_names)
+        except OSError as error:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Service Control Manager unavailable: {error}")
+            return []
+        for stop_result in stop_results:
+            self._report_service_stop_result(stop_result, indent="  ")
+        return stop_results
+
+    def _report_service_stop_result(self, stop_result, indent):
+        for dependent_result in stop_result["dependents"]:
+            self._report_service_stop_result(dependent_result, indent + "  ")
+
+        timing = f"{stop_result['elapsed_seconds']:.2f}s"
+        if stop_result["outcome"] == "stopped":
+            status_logger.info(f"{indent}{Fore.GREEN}[STOPPED]{Style.RESET_ALL} {stop_result['service_name']} in {timing}")
+        elif stop_result["outcome"] == "missing":
+            status_logger.info(f"{indent}{Fore.YELLOW}[SKIPPED]{Style.RESET_ALL} {stop_result['service_name']} is not installed")
+        elif stop_result["outcome"] == "timeout":
+            status_logger.error(f"{indent}{Fore.RED}[TIMEOUT]{Style.RESET_ALL} {stop_result['service_name']} still {stop_result['final_state']} after {timing}")
+        else:
+            status_logger.error(f"{indent}{Fore.RED}[ERROR]{Style.RESET_ALL} {stop_result['service_name']}: {stop_result['outcome']}")
+
     def deactivate_usb_energy_management(self):
         status_logger.info("Hardware: Deactivating USB Selective Suspend features")
         powershell_script = (
@@ -750,7 +4074,7 @@ class WindowsPerformanceOptimizer:
             "Set-ItemProperty -Path $keyPath -Name $flag -Value 0 -Type DWord -ErrorAction SilentlyContinue; "
             "} } }; exit 0"
         )
-        self.execute_shell_command(['powershell', '-Command', powershell_batch_scan], "Applying deep hardware power saving deactivation flags via registry recursion")
+        self.execute_shell_command(['powershell', '-Command', powershell_batch_scan], "Applying deep hardware power saving deactivation flags via registry recursion", timeout_seconds=600)
 
         wmi_power_management_disable = (
             "$devices = Get-CimInstance Win32_PnPEntity; "
@@ -764,7 +4088,7 @@ class WindowsPerformanceOptimizer:
             "Set-CimInstance -CimInstance $p; "
             "} } }"
         )
-        self.execute_shell_command(['powershell', '-Command', wmi_power_management_disable], "Disabling per-device power management overrides via CIM/WMI")
+        self.execute_shell_command(['powershell', '-Command', wmi_power_management_disable], "Disabling per-device power management overrides via CIM/WMI", timeout_seconds=300)
 
     def disable_web_browser_telemetry(self):
         status_logger.info("Web Browsers: Stopping background data collection and telemetry")
@@ -849,9 +4173,70 @@ class WindowsPerformanceOptimizer:
             self.modify_registry_configuration(modification)
         
         update_services = ["wuauserv", "UsoSvc", "WaaSMedicSvc"]
-        for service_name in update_services:
-            self.execute_shell_command(f'sc config {service_name} start=disabled', f"Configure {service_name} service to disabled start")
-            self.execute_shell_command(f'sc stop {service_name}', f"Immediately stop {service_name} service")
+        status_logger.info("Service: Configure Windows Update services to disabled start")
+        self.configure_service_start_types({service_name: 4 for service_name in update_services})
+
+        status_logger.info("Service: Immediately stop Windows Update services")
+        try:
+            service_states = self.service_controller.query_service_states(update_services)
+        except OSError as error:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Service state query failed: {error}")
+            service_states = {service_name: {"state": "unknown"} for service_name in update_services}
+        active_services = [
+            service_name for service_name, service_state in service_states.items()
+            if service_state["state"] not in ("stopped", "missing")
+        ]
+        if active_services:
+            self.stop_services_and_report(active_services)
+        else:
+            status_logger.info(f"  {Fore.GREEN}[ALREADY STOPPED]{Style.RESET_ALL} {', '.join(update_services)}")
+
+    def install_network_drivers(self, driver_directory, installer_timeout_seconds, skip_installers=False, discovery_interval_seconds=0.5):
+        driver_orchestrator = DriverInstallerOrchestrator(self.command_runner, self.registry_backend, discovery_interval_seconds)
+        if not skip_installers:
+            for vendor_name, installer_relative_path, installer_arguments in NETWORK_DRIVER_INSTALLERS:
+                status_logger.info(f"Driver: Installing {vendor_name} network driver")
+                installer_result = driver_orchestrator.run_installer(
+                    os.path.join(driver_directory, installer_relative_path), installer_arguments, installer_timeout_seconds
+                )
+                timing = f"{installer_result['elapsed_seconds']:.1f}s, {installer_result['tracked_processes']} processes"
+                if installer_result["outcome"] == "completed":
+                    reboot_note = " (restart requested)" if installer_result["exit_code"] in INSTALLER_REBOOT_EXIT_CODES else ""
+                    status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {timing}{reboot_note}")
+                elif installer_result["outcome"] == "missing":
+                    status_logger.info(f"  {Fore.YELLOW}[SKIPPED]{Style.RESET_ALL} {installer_result['installer_path']} not found")
+                elif installer_result["outcome"] == "timeout":
+                    status_logger.error(f"  {Fore.RED}[TIMEOUT]{Style.RESET_ALL} Installer tree terminated after {timing}")
+                else:
+                    status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {installer_result['outcome']} ({timing})")
+
+        status_logger.info("Network: Disabling adapter power saving properties")
+        adapter_changes = driver_orchestrator.tune_network_adapter_power()
+        for adapter_change in adapter_changes:
+            if "error" in adapter_change:
+                status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {adapter_change['adapter']} {adapter_change['entry_name']}: {adapter_change['error']}")
+            else:
+                status_logger.info(
+                    f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {adapter_change['adapter']} {adapter_change['entry_name']}: "
+                    f"{adapter_change['old_value']} -> {adapter_change['new_value']}"
+                )
+        if not adapter_changes:
+            status_logger.info(f"  {Fore.GREEN}[ALREADY APPLIED]{Style.RESET_ALL} No adapter power saving properties left to change")
+
+        status_logger.info("Network: Disabling device power management for physical adapters")
+        power_management_result = driver_orchestrator.disable_adapter_device_power_management()
+        if power_management_result["outcome"] == "completed":
+            status_logger.info(
+                f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} MSPower_DeviceEnable cleared on {power_management_result['changed']} devices"
+            )
+        elif power_management_result["outcome"] == "timeout":
+            status_logger.error(f"  {Fore.RED}[TIMEOUT]{Style.RESET_ALL} Adapter power management script did not finish")
+        else:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} Adapter power management script: {power_management_result['outcome']}")
+
+    def apply_network_stack_commands(self):
+        self.execute_shell_command("netsh int tcp set global ecncapability=enabled", "Enabling Explicit Congestion Notification (ECN) in TCP stack")
+        self.execute_shell_command("netsh int ip set global taskoffload=enabled", "Enabling IP Task Offload in network stack")
 
     def configure_high_performance_power_scheme(self):
         status_logger.info("Power Management: Activating Ultimate Performance profile")
@@ -881,12 +4266,12 @@ class WindowsPerformanceOptimizer:
         status_logger.info("License: Verifying and ensuring Windows activation status")
         try:
             check_command = "Get-CimInstance SoftwareLicensingProduct | Where-Object { $_.PartialProductKey } | Select-Object -ExpandProperty LicenseStatus"
-            status_result = subprocess.run(['powershell', '-Command', check_command], capture_output=True, text=True)
+            status_result = self.command_runner.run(['powershell', '-Command', check_command], timeout_seconds=60, retries=1, text=True)
             
             if '1' not in status_result.stdout:
                 status_logger.info(f"  {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} Windows is not activated. Initiating automated activation sequence...")
                 activation_script = "Start-Process powershell -ArgumentList '-Command iex (irm https://get.activated.win)' -WindowStyle Hidden"
-                subprocess.run(['powershell', '-Command', activation_script])
+                self.command_runner.run(['powershell', '-Command', activation_script], timeout_seconds=60)
                 status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} Activation request dispatched")
             else:
                 status_logger.info(f"  {Fore.GREEN}[ALREADY ACTIVE]{Style.RESET_ALL} Windows is correctly licensed")
@@ -904,6 +4289,164 @@ class WindowsPerformanceOptimizer:
         
         self.execute_shell_command(['powershell', '-Command', cmd], desc)
 
+    def classify_registry_stages(self, registry_stages):
+        activation_records = []
+        for stage_number, _, stage_entries in registry_stages:
+            for optimization_entry in stage_entries:
+                write_succeeded = optimization_entry.get("managed_service") is not None or normalize_registry_key(
+                    optimization_entry["hive_root"], optimization_entry["registry_path"]
+                ) not in self.failed_registry_keys
+                entry_values = list(iterate_entry_values(optimization_entry)) or [(None, None)]
+                entry_values += [(entry_name, None) for entry_name in optimization_entry.get("delete_entries", [])]
+                for entry_name, entry_value in entry_values:
+                    activation, refresh_target = classify_entry_activation(optimization_entry, entry_name, entry_value)
+                    activation_records.append({
+                        "stage_number": stage_number,
+                        "task_description": optimization_entry["task_description"],
+                        "registry_key": f"{REGISTRY_HIVE_NAMES[optimization_entry['hive_root']]}\\{optimization_entry['registry_path']}",
+                        "entry_name": entry_name,
+                        "activation": activation,
+                        "refresh_target": refresh_target,
+                        "write_succeeded": write_succeeded,
+                        "status": "pending"
+                    })
+        return activation_records
+
+    def broadcast_setting_change(self):
+        try:
+            user32 = ctypes.WinDLL("user32", use_last_error=True)
+        except (AttributeError, OSError) as error:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} user32 unavailable: {error}")
+            return False
+        user32.SendMessageTimeoutW.argtypes = [
+            ctypes.wintypes.HWND, ctypes.wintypes.UINT, ctypes.wintypes.WPARAM, ctypes.c_wchar_p,
+            ctypes.wintypes.UINT, ctypes.wintypes.UINT, ctypes.POINTER(ctypes.c_size_t)
+        ]
+        message_result = ctypes.c_size_t()
+        hwnd_broadcast, wm_settingchange, smto_abortifhung = 0xFFFF, 0x001A, 0x0002
+        if not user32.SendMessageTimeoutW(hwnd_broadcast, wm_settingchange, 0, None, smto_abortifhung, 5000, ctypes.byref(message_result)):
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} WM_SETTINGCHANGE broadcast failed: {ctypes.get_last_error()}")
+            return False
+        status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} WM_SETTINGCHANGE broadcast to top-level windows")
+        return True
+
+    def apply_system_parameter(self, spi_action, parameter_value):
+        try:
+            user32 = ctypes.WinDLL("user32", use_last_error=True)
+        except (AttributeError, OSError) as error:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} user32 unavailable: {error}")
+            return False
+        user32.SystemParametersInfoW.argtypes = [ctypes.wintypes.UINT, ctypes.wintypes.UINT, ctypes.c_void_p, ctypes.wintypes.UINT]
+        if spi_action == SPI_SETTOGGLEKEYS:
+            toggle_keys = TOGGLEKEYS(ctypes.sizeof(TOGGLEKEYS), parameter_value)
+            parameter_applied = user32.SystemParametersInfoW(
+                spi_action, ctypes.sizeof(TOGGLEKEYS), ctypes.byref(toggle_keys), SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
+            )
+        else:
+            parameter_applied = user32.SystemParametersInfoW(spi_action, parameter_value, None, SPIF_UPDATEINIFILE | SPIF_SENDCHANGE)
+        if not parameter_applied:
+            status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} SystemParametersInfo(0x{spi_action:04X}) failed: {ctypes.get_last_error()}")
+            return False
+        status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} SystemParametersInfo(0x{spi_action:04X}, {parameter_value}) applied")
+        return True
+
+    def hot_apply_activation_records(self, activation_records):
+        for activation_record in activation_records:
+            if not activation_record["write_succeeded"]:
+                activation_record["status"] = "failed"
+        written_records = [record for record in activation_records if record["status"] != "failed"]
+
+        broadcast_records = [record for record in written_records if record["activation"] == "settings-broadcast"]
+        if broadcast_records:
+            reloaded = self.execute_shell_command(
+                "rundll32.exe user32.dll,UpdatePerUserSystemParameters 1, True",
+                "Reloading per-user desktop, mouse and accessibility parameters"
+            )
+            broadcast_status = "active" if reloaded and self.broadcast_setting_change() else "reboot"
+            for activation_record in broadcast_records:
+                activation_record["status"] = broadcast_status
+
+        service_records = [record for record in written_records if record["activation"] == "service-stop"]
+        if service_records:
+            status_logger.info("Service: Stopping services whose start type was disabled")
+            service_names = list(dict.fromkeys(record["refresh_target"] for record in service_records))
+            stop_outcomes = {
+                stop_result["service_name"].lower(): stop_result["outcome"]
+                for stop_result in self.stop_services_and_report(service_names)
+            }
+            for activation_record in service_records:
+                stopped = stop_outcomes.get(activation_record["refresh_target"].lower()) in ("stopped", "missing")
+                activation_record["status"] = "active" if stopped else "reboot"
+
+        command_status = {}
+        for activation_record in written_records:
+            if activation_record["activation"] == "spi":
+                spi_action, parameter_value = activation_record["refresh_target"]
+                status_logger.info(f"Refresh: Applying {activation_record['entry_name']} through SystemParametersInfo")
+                activation_record["status"] = "active" if self.apply_system_parameter(spi_action, parameter_value) else "logon"
+            elif activation_record["activation"] == "powercfg":
+                refresh_command = activation_record["refresh_target"]
+                if refresh_command not in command_status:
+                    command_status[refresh_command] = self.execute_shell_command(refresh_command, f"Applying {activation_record['entry_name']} through powercfg")
+                activation_record["status"] = "active" if command_status[refresh_command] else "reboot"
+            elif activation_record["activation"] == "live":
+                activation_record["status"] = "active"
+            elif activation_record["activation"] == "next-launch":
+                activation_record["status"] = "next-launch"
+            elif activation_record["activation"] == "logon":
+                activation_record["status"] = "logon"
+            elif activation_record["activation"] == "reboot":
+                activation_record["status"] = "reboot"
+        return activation_records
+
+    def _report_activation_summary(self, activation_records):
+        status_counts = {"active": 0, "next-launch": 0, "logon": 0, "reboot": 0, "failed": 0}
+        for activation_record in activation_records:
+            status_counts[activation_record["status"]] = status_counts.get(activation_record["status"], 0) + 1
+        status_logger.info(
+            f"Hot apply: {status_counts['active']} values active now, {status_counts['next-launch']} on next application launch, "
+            f"{status_counts['logon']} at next sign-in, {status_counts['reboot']} waiting for a restart, "
+            f"{status_counts['failed']} not written"
+        )
+
+        for activation_record in activation_records:
+            if activation_record["status"] == "failed":
+                status_logger.error(
+                    f"  {Fore.RED}[FAILED]{Style.RESET_ALL} Stage {activation_record['stage_number']}: "
+                    f"{activation_record['registry_key']}\\{activation_record['entry_name'] or '(Default)'} was not written"
+                )
+        for stage_number, task_description in dict.fromkeys(
+            (activation_record["stage_number"], activation_record["task_description"])
+            for activation_record in activation_records if activation_record["status"] == "logon"
+        ):
+            status_logger.info(f"  {Fore.YELLOW}[SIGN-IN REQUIRED]{Style.RESET_ALL} Stage {stage_number}: {task_description}")
+
+        pending_tasks = list(dict.fromkeys(
+            (activation_record["stage_number"], activation_record["task_description"])
+            for activation_record in activation_records if activation_record["status"] == "reboot"
+        ))
+        for stage_number, task_description in pending_tasks + REBOOT_REQUIRED_COMMAND_STEPS:
+            status_logger.info(f"  {Fore.YELLOW}[RESTART REQUIRED]{Style.RESET_ALL} Stage {stage_number}: {task_description}")
+        return pending_tasks
+
+    def build_run_report(self):
+        return {
+            "graphics_hardware": self.graphics_card_type,
+            "storage_medium": self.storage_medium_type,
+            "apply_method": self.apply_method,
+            "activation": self.activation_records,
+            "elapsed_seconds": round(time.monotonic() - self.command_runner.run_started_at, 2),
+            "commands": dict(
+                self.command_runner.command_statistics,
+                command_seconds=round(self.command_runner.command_statistics["command_seconds"], 2)
+            )
+        }
+
+    def write_run_report(self, report_path):
+        with open(report_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.build_run_report(), report_file, indent=2, ensure_ascii=False)
+        status_logger.info(f"Run report written to {report_path}")
+
     def start_optimization_sequence(self):
         if not self.check_administrative_privileges():
             status_logger.error(f"{Fore.RED}Administrative privileges are required to run this performance optimizer.{Style.RESET_ALL}")
@@ -916,77 +4459,532 @@ class WindowsPerformanceOptimizer:
         print(f"Storage Medium: {Fore.YELLOW}{self.storage_medium_type}{Style.RESET_ALL}")
         print("\n" + Fore.CYAN + "="*60 + Style.RESET_ALL + "\n")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 1: Core System Adjustments{Style.RESET_ALL}")
-        for adjustment in self.core_system_adjustments:
-            self.modify_registry_configuration(adjustment)
+        registry_stages = self.collect_registry_stages()
+        self.open_checkpoint_journal()
+        if self.apply_method == "reg-import":
+            status_logger.info(f"\n{Fore.CYAN}Stages 1-10: Registry Catalog (single reg import){Style.RESET_ALL}")
+            if self.begin_checkpoint_stage("1-10"):
+                self.apply_catalog_with_reg_import(registry_stages)
+                self.apply_network_stack_commands()
+                self.complete_checkpoint_stage("1-10")
+        elif self.apply_method == "plan":
+            status_logger.info(f"\n{Fore.CYAN}Stages 1-10: Registry Catalog (compiled plan){Style.RESET_ALL}")
+            if self.begin_checkpoint_stage("1-10"):
+                optimization_plan = self.plan_compiler.compile(registry_stages)
+                self._report_plan_diagnostics(optimization_plan)
+                self.execute_optimization_plan(optimization_plan)
+                self.apply_network_stack_commands()
+                self.complete_checkpoint_stage("1-10")
+        else:
+            for stage_number, stage_title, stage_entries in registry_stages:
+                status_logger.info(f"\n{Fore.CYAN}Stage {stage_number}: {stage_title}{Style.RESET_ALL}")
+                if not self.begin_checkpoint_stage(str(stage_number)):
+                    continue
+                for optimization_entry in stage_entries:
+                    self.modify_registry_configuration(optimization_entry)
+                if stage_number == 9:
+                    self.apply_network_stack_commands()
+                self.complete_checkpoint_stage(str(stage_number))
+
+        status_logger.info(f"\n{Fore.CYAN}Stage 11: Low-Level Boot Configuration Timing{Style.RESET_ALL}")
+        if self.begin_checkpoint_stage("11"):
+            self.execute_shell_command("bcdedit /set disabledynamictick yes", "Disabling dynamic kernel ticks to improve timing consistency")
+            self.execute_shell_command("bcdedit /set useplatformtick yes", "Enforcing use of high-resolution platform ticks")
+            self.execute_shell_command("bcdedit /set tscsyncpolicy enhanced", "Setting enhanced TSC synchronization policy across cores")
+            self.complete_checkpoint_stage("11")
+
+        status_logger.info(f"\n{Fore.CYAN}Stage 12: Peripheral Interrupt Tuning{Style.RESET_ALL}")
+        if self.begin_checkpoint_stage("12"):
+            self.deactivate_usb_energy_management()
+            self.deep_deactivate_all_device_power_saving()
+            self.complete_checkpoint_stage("12")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 2: Processing Latency Reductions{Style.RESET_ALL}")
-        for optimization in self.delay_reduction_optimizations:
-            self.modify_registry_configuration(optimization)
+        status_logger.info(f"\n{Fore.CYAN}Stage 13: Data Privacy and System Services Cleanup{Style.RESET_ALL}")
+        if self.begin_checkpoint_stage("13"):
+            self.disable_web_browser_telemetry()
+            self.prevent_automatic_windows_updates()
+            self.configure_high_performance_power_scheme()
+            self.complete_checkpoint_stage("13")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 3: Memory Allocation Optimizations{Style.RESET_ALL}")
-        for setting in self.memory_optimization_settings:
-            self.modify_registry_configuration(setting)
+        status_logger.info(f"\n{Fore.CYAN}Stage 14: System Licensing & Performance Finalization{Style.RESET_ALL}")
+        if self.begin_checkpoint_stage("14"):
+            self.apply_memory_compression_tweak()
+            self.ensure_windows_license_is_active()
+            self.complete_checkpoint_stage("14")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 4: Storage Optimization ({self.storage_medium_type}){Style.RESET_ALL}")
-        for adjustment in self.storage_adjustments:
-            self.modify_registry_configuration(adjustment)
+        if self.hot_apply:
+            status_logger.info(f"\n{Fore.CYAN}Hot Apply: Live Refresh{Style.RESET_ALL}")
+            if self.begin_checkpoint_stage("hot-apply"):
+                self.activation_records = self.hot_apply_activation_records(self.classify_registry_stages(registry_stages))
+                self._report_activation_summary(self.activation_records)
+                self.complete_checkpoint_stage("hot-apply")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 5: Processor Efficiency Adjustments{Style.RESET_ALL}")
-        for tweak in self.processor_performance_tweaks:
-            self.modify_registry_configuration(tweak)
+        if self.checkpoint_journal:
+            self.checkpoint_journal.close(run_completed=True)
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 6: Display Frame Rate Smoothing{Style.RESET_ALL}")
-        for adjustment in self.frame_rate_adjustments:
-            self.modify_registry_configuration(adjustment)
+        command_statistics = self.command_runner.command_statistics
+        if command_statistics["timeouts"] or command_statistics["budget_skips"]:
+            status_logger.info(f"\n{Fore.CYAN}Command Timeouts{Style.RESET_ALL}")
+            for timed_out_command in command_statistics["timed_out_commands"]:
+                status_logger.info(
+                    f"  {Fore.RED}[TIMEOUT]{Style.RESET_ALL} {timed_out_command['command'][:80]} "
+                    f"({timed_out_command['timeout_seconds']}s x {timed_out_command['attempts']})"
+                )
+            if command_statistics["budget_skips"]:
+                status_logger.info(f"  {Fore.RED}[SKIPPED]{Style.RESET_ALL} {command_statistics['budget_skips']} commands after the run budget ran out")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 7: Power Delivery Configuration{Style.RESET_ALL}")
-        for optimization in self.energy_management_optimizations:
-            self.modify_registry_configuration(optimization)
+        if self.run_report_path:
+            self.write_run_report(self.run_report_path)
 
-        if self.video_card_optimizations:
-            status_logger.info(f"\n{Fore.CYAN}Stage 8: {self.graphics_card_type} Graphics Specific Tuning{Style.RESET_ALL}")
-            for tuning in self.video_card_optimizations:
-                self.modify_registry_configuration(tuning)
+        print("\n" + Fore.CYAN + "="*60 + Style.RESET_ALL)
+        print(f"  {Fore.GREEN}✓ All performance optimizations have been applied successfully.{Style.RESET_ALL}")
+        if self.hot_apply:
+            print(f"  {Fore.YELLOW}⚠ Live settings are active. Restart only for the [RESTART REQUIRED] items listed above.{Style.RESET_ALL}")
         else:
-            status_logger.info(f"\n{Fore.CYAN}Stage 8: Skipping Video Card Tuning (Hardware: {self.graphics_card_type}){Style.RESET_ALL}")
+            print(f"  {Fore.RED}⚠ A FULL SYSTEM RESTART IS MANDATORY FOR ALL CHANGES TO TAKE EFFECT.{Style.RESET_ALL}")
+        print(Fore.CYAN + "="*60 + Style.RESET_ALL + "\n")
+        
+        input(f"{Fore.YELLOW}Оптимизация завершена. Нажмите Enter, чтобы закрыть программу...{Style.RESET_ALL}")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 9: Network Throughput Optimizations{Style.RESET_ALL}")
-        for setting in self.internet_connection_settings:
-            self.modify_registry_configuration(setting)
+def parse_command_line_arguments(argument_list=None):
+    argument_parser = argparse.ArgumentParser(description="ANTweaker - Windows performance optimizer")
+    argument_parser.add_argument("--graphics", choices=["NVIDIA", "AMD", "Intel", "Unknown"], help="Skip graphics hardware detection")
+    argument_parser.add_argument("--storage", choices=["SSD", "HDD", "Unknown"], help="Skip storage media detection")
+    argument_parser.add_argument(
+        "--apply-method", choices=["registry-api", "plan", "reg-import"], default="registry-api",
+        help="Write catalog values one by one, through the deduplicated plan, or as a single reg import"
+    )
+    argument_parser.add_argument("--command-timeout", type=float, default=120.0, help="Default deadline for each external command in seconds")
+    argument_parser.add_argument("--run-budget", type=float, help="Overall time budget for external commands in seconds")
+    argument_parser.add_argument("--report", help="Write a JSON run report to this path")
+    argument_parser.add_argument("--hot-apply", action="store_true", help="Refresh live settings after applying and list only the changes that need a restart")
+    argument_parser.add_argument("--checkpoint", default="antweaker_checkpoint.jsonl", help="Journal of completed stages and commands")
+    argument_parser.add_argument("--resume", action="store_true", help="Skip stages and commands completed by an interrupted run")
+    argument_parser.add_argument("--tuned-profile", help="Override catalog values with a profile saved by the tune command")
+    argument_parser.add_argument("--ignore-fingerprint", action="store_true", help="Apply a tuned profile even if it was measured on different hardware")
+    command_parsers = argument_parser.add_subparsers(dest="command")
 
-        self.execute_shell_command("netsh int tcp set global ecncapability=enabled", "Enabling Explicit Congestion Notification (ECN) in TCP stack")
-        self.execute_shell_command("netsh int ip set global taskoffload=enabled", "Enabling IP Task Offload in network stack")
+    compile_parser = command_parsers.add_parser("compile-reg", help="Compile catalog stages into a .reg bundle")
+    compile_parser.add_argument("output_path")
+    compile_parser.add_argument("--stages", type=int, nargs="+", help="Stage numbers to include (default: all registry stages)")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 10: Peripheral and Driver Configuration{Style.RESET_ALL}")
-        for optimization in self.peripheral_and_driver_optimizations:
-            self.modify_registry_configuration(optimization)
+    convert_parser = command_parsers.add_parser("reg-to-catalog", help="Parse .reg files or folders into catalog entries")
+    convert_parser.add_argument("registry_file_paths", nargs="+")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 11: Low-Level Boot Configuration Timing{Style.RESET_ALL}")
-        self.execute_shell_command("bcdedit /set disabledynamictick yes", "Disabling dynamic kernel ticks to improve timing consistency")
-        self.execute_shell_command("bcdedit /set useplatformtick yes", "Enforcing use of high-resolution platform ticks")
-        self.execute_shell_command("bcdedit /set tscsyncpolicy enhanced", "Setting enhanced TSC synchronization policy across cores")
+    plan_parser = command_parsers.add_parser("compile-plan", help="Flatten the catalog into a deduplicated operation plan")
+    plan_parser.add_argument("output_path")
+    plan_parser.add_argument("--stages", type=int, nargs="+", help="Stage numbers to include (default: all registry stages)")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 12: Peripheral Interrupt Tuning{Style.RESET_ALL}")
-        self.deactivate_usb_energy_management()
-        self.deep_deactivate_all_device_power_saving()
+    tune_parser = command_parsers.add_parser("tune", help="Search numeric tweak values against a measured latency objective")
+    tune_parser.add_argument(
+        "--parameters", nargs="+", choices=[parameter["parameter_name"] for parameter in TUNABLE_CATALOG_PARAMETERS],
+        help="Parameters to tune (default: all)"
+    )
+    tune_parser.add_argument("--workload", help="Command whose stdout lists latency samples in ms, one per line (wall time is used otherwise)")
+    tune_parser.add_argument("--simulate", action="store_true", help="Run the search offline against a simulated registry and a synthetic objective")
+    tune_parser.add_argument("--percentile", type=float, default=99.0)
+    tune_parser.add_argument("--candidates", type=int, default=16, help="Configurations sampled for the first round")
+    tune_parser.add_argument("--reduction-factor", type=int, default=2, help="Keep 1/N of the candidates per round")
+    tune_parser.add_argument("--min-budget", type=int, default=1, help="Workload runs per candidate in the first round")
+    tune_parser.add_argument("--settle", type=float, default=0.0, help="Seconds to wait after applying a candidate")
+    tune_parser.add_argument("--seed", type=int, default=0)
+    tune_parser.add_argument("--profile-dir", default="profiles")
 
-        status_logger.info(f"\n{Fore.CYAN}Stage 13: Data Privacy and System Services Cleanup{Style.RESET_ALL}")
-        self.disable_web_browser_telemetry()
-        self.prevent_automatic_windows_updates()
-        self.configure_high_performance_power_scheme()
-        
-        status_logger.info(f"\n{Fore.CYAN}Stage 14: System Licensing & Performance Finalization{Style.RESET_ALL}")
-        self.apply_memory_compression_tweak()
-        self.ensure_windows_license_is_active()
+    monitor_parser = command_parsers.add_parser("monitor", help="Sample latency-related system metrics at a fixed rate")
+    monitor_parser.add_argument("--rate", type=float, default=5.0, help="Samples per second")
+    monitor_parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until Ctrl+C)")
+    monitor_parser.add_argument("--window", type=float, default=60.0, help="Rolling aggregate window in seconds")
+    monitor_parser.add_argument("--export-interval", type=float, default=5.0)
+    monitor_parser.add_argument("--textfile", default="antweaker.prom", help="Prometheus textfile collector output")
+    monitor_parser.add_argument("--binary-log", default="antweaker_metrics.bin")
+    monitor_parser.add_argument("--top", type=int, default=5, help="Number of top processes to export")
+    monitor_parser.add_argument("--dump", action="store_true", help="Print the binary log as CSV and exit")
+
+    snapshot_parser = command_parsers.add_parser("snapshot", help="Save the triage subtrees into a binary registry snapshot")
+    snapshot_parser.add_argument("output_path")
+
+    snapshot_diff_parser = command_parsers.add_parser("snapshot-diff", help="Compare two registry snapshots")
+    snapshot_diff_parser.add_argument("old_snapshot_path")
+    snapshot_diff_parser.add_argument("new_snapshot_path")
+    snapshot_diff_parser.add_argument("--limit", type=int, default=200, help="Maximum number of differences to print (0 for no limit)")
+    snapshot_diff_parser.add_argument("--json", dest="json_path", help="Write every difference to this JSON lines file")
+
+    profiles_parser = command_parsers.add_parser("apply-user-profiles", help="Apply the HKEY_CURRENT_USER tweaks to every user profile")
+    profiles_parser.add_argument("--stages", type=int, nargs="+", help="Stage numbers to include (default: all registry stages)")
+    profiles_parser.add_argument("--include-default", action="store_true", help="Also update the Default profile used for new accounts")
+
+    game_parser = command_parsers.add_parser("game-profile", help="Compile, switch and recover per-game tweak profiles")
+    game_parser.add_argument("action", choices=["compile", "on", "off", "status", "recover"])
+    game_parser.add_argument("profile_name", nargs="?")
+    game_parser.add_argument("--definitions", help="JSON file with additional profile definitions")
+    game_parser.add_argument("--profile-dir", default="profiles")
+
+    interrupts_parser = command_parsers.add_parser("interrupts", help="Plan or apply MSI mode and interrupt affinity for GPU, NIC and xHCI controllers")
+    interrupts_parser.add_argument("--apply", action="store_true", help="Write the planned changes (default: report only)")
+    interrupts_parser.add_argument("--config", help="JSON overrides per category, e.g. {\"nic\": {\"affinity\": [4, 6]}}")
+    interrupts_parser.add_argument("--devices", nargs="+", choices=list(INTERRUPT_POLICY_DEFAULTS), help="Device categories to configure (default: all)")
+
+    drivers_parser = command_parsers.add_parser("install-network-drivers", help="Run the Realtek and Intel installers, then disable adapter power saving")
+    drivers_parser.add_argument("--driver-dir", default=os.path.join("Optimization", "5. Интернет"))
+    drivers_parser.add_argument("--installer-timeout", type=float, default=900.0, help="Deadline for each installer and its child processes in seconds")
+    drivers_parser.add_argument(
+        "--discovery-interval", type=float, default=0.5,
+        help="How often new child processes of an installer are looked for in seconds; the wait ends as soon as the last tracked process exits"
+    )
+    drivers_parser.add_argument("--skip-installers", action="store_true", help="Only apply the adapter power settings")
+
+    memory_parser = command_parsers.add_parser("memory-manager", help="Trim background working sets and purge the standby list under memory pressure")
+    memory_parser.add_argument("--interval", type=float, default=5.0, help="Seconds between memory checks")
+    memory_parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until Ctrl+C)")
+    memory_parser.add_argument("--processes", nargs="+", help="Background process names to trim (default: chat, browser and launcher processes)")
+    memory_parser.add_argument("--trim-below", type=float, default=15.0, help="Start trimming when available memory drops below this percent")
+    memory_parser.add_argument("--trim-above", type=float, default=25.0, help="Stop trimming once available memory rises above this percent")
+    memory_parser.add_argument("--min-working-set", type=float, default=100.0, help="Only trim processes above this working set in MB")
+    memory_parser.add_argument("--trim-cooldown", type=float, default=120.0, help="Seconds before the same process is trimmed again")
+    memory_parser.add_argument("--purge-free-below", type=float, default=1024.0, help="Purge the standby list when free memory drops below this many MB")
+    memory_parser.add_argument("--purge-standby-above", type=float, default=2048.0, help="...and the standby list holds more than this many MB")
+    memory_parser.add_argument("--purge-cooldown", type=float, default=300.0)
+    memory_parser.add_argument("--simulate", action="store_true", help="Run the policy against a simulated machine with growing memory use")
+
+    benchmark_parser = command_parsers.add_parser("benchmark-reg", help="Compare per-value writes with a single reg import")
+    benchmark_parser.add_argument("--keys", type=int, default=500)
+    benchmark_parser.add_argument("--values", type=int, default=20)
+
+    return argument_parser.parse_args(argument_list)
+
+
+def run_game_profile_command(command_line, optimizer_instance=None):
+    profile_switcher = GameProfileSwitcher(WindowsRegistryBackend(), PowerSchemeController(), command_line.profile_dir)
+    pending_record = profile_switcher.pending_switch()
+    if pending_record and command_line.action != "status":
+        status_logger.info(f"{Fore.YELLOW}[NOTICE]{Style.RESET_ALL} Completing interrupted switch of {pending_record['profile']} to {pending_record['direction']}")
+        report_game_profile_switch(profile_switcher.recover())
+
+    if command_line.action == "status":
+        for profile_name, direction in sorted(profile_switcher.read_switch_state().items()):
+            status_logger.info(f"  {profile_name}: {direction}")
+        if pending_record:
+            status_logger.info(f"  {Fore.YELLOW}[PENDING]{Style.RESET_ALL} {pending_record['profile']} -> {pending_record['direction']} (run recover)")
+    elif command_line.action == "compile":
+        profile_definitions = load_game_profile_definitions(command_line.definitions)
+        if command_line.profile_name not in profile_definitions:
+            status_logger.error(f"{Fore.RED}Unknown profile {command_line.profile_name}; known: {', '.join(sorted(profile_definitions))}{Style.RESET_ALL}")
+            sys.exit(2)
+        try:
+            compiled_profile = profile_switcher.compile_profile(
+                command_line.profile_name, profile_definitions[command_line.profile_name], optimizer_instance.compile_optimization_plan()
+            )
+        except RuntimeError as error:
+            status_logger.error(f"{Fore.RED}{error}{Style.RESET_ALL}")
+            sys.exit(2)
+        value_count = sum(len(key_group["values"]) for key_group in compiled_profile["on"]["key_groups"])
+        for value_path in compiled_profile["baseline_warnings"]:
+            status_logger.info(
+                f"  {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} {value_path} already holds the profile value and has no baseline "
+                f"in the definition; switching off deletes it"
+            )
+        status_logger.info(
+            f"Game profile: {command_line.profile_name} compiled with {value_count} values, "
+            f"baseline power scheme {compiled_profile['off']['power_scheme']}, saved to {profile_switcher.compiled_profile_path(command_line.profile_name)}"
+        )
+    elif command_line.action in ("on", "off"):
+        if not os.path.isfile(profile_switcher.compiled_profile_path(command_line.profile_name or "")):
+            status_logger.error(f"{Fore.RED}Profile {command_line.profile_name} is not compiled; run game-profile compile first.{Style.RESET_ALL}")
+            sys.exit(2)
+        report_game_profile_switch(profile_switcher.switch(command_line.profile_name, command_line.action))
+
+
+def report_game_profile_switch(switch_result):
+    for failure in switch_result["failures"]:
+        status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {failure}")
+    latency_color = Fore.GREEN if switch_result["elapsed_ms"] < 100 else Fore.YELLOW
+    outcome = "[COMPLETED]" if not switch_result["failures"] else "[PARTIAL]"
+    status_logger.info(
+        f"  {latency_color}{outcome}{Style.RESET_ALL} {switch_result['profile_name']} {switch_result['direction']}: "
+        f"{switch_result['value_count']} values in {switch_result['elapsed_ms']:.1f} ms"
+    )
+
+
+def describe_interrupt_state(interrupt_state):
+    msi_mode = {None: "unset", 0: "off", 1: "on"}.get(interrupt_state["msi_supported"], interrupt_state["msi_supported"])
+    message_limit = interrupt_state["message_limit"] if interrupt_state["message_limit"] is not None else "-"
+    affinity = describe_affinity_mask(interrupt_state["assignment_mask"]) if interrupt_state["device_policy"] == IRQ_POLICY_SPECIFIED_PROCESSORS else "default"
+    return f"MSI {msi_mode}, limit {message_limit}, affinity {affinity}"
+
+
+def run_interrupt_command(command_line):
+    try:
+        interrupt_policy = load_interrupt_policy(command_line.config, command_line.devices)
+    except (OSError, ValueError) as error:
+        status_logger.error(f"{Fore.RED}Interrupt policy: {error}{Style.RESET_ALL}")
+        sys.exit(2)
+
+    policy_engine = InterruptPolicyEngine(WindowsRegistryBackend())
+    planned_devices = policy_engine.plan(interrupt_policy, policy_engine.enumerate_pci_devices(interrupt_policy))
+    if command_line.apply:
+        policy_engine.apply(planned_devices)
+    status_logger.info(
+        f"Interrupts: {len(planned_devices)} devices, {policy_engine.logical_cpu_count} logical CPUs on {policy_engine.physical_core_count} cores"
+    )
+
+    for planned_device in planned_devices:
+        device_label = f"{planned_device['category'].upper()} {planned_device['device_name']}"
+        if not planned_device["changed"]:
+            status_logger.info(f"  {Fore.GREEN}[UNCHANGED]{Style.RESET_ALL} {device_label}: {describe_interrupt_state(planned_device['before'])}")
+        elif command_line.apply:
+            status_logger.info(
+                f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {device_label}: {describe_interrupt_state(planned_device['before'])} -> "
+                f"{describe_interrupt_state(planned_device['after'])}"
+            )
+        else:
+            status_logger.info(
+                f"  {Fore.YELLOW}[PLANNED]{Style.RESET_ALL} {device_label}: {describe_interrupt_state(planned_device['before'])} -> "
+                f"{describe_interrupt_state(planned_device['target'])}"
+            )
+        for validation_note in planned_device["notes"]:
+            status_logger.info(f"    {Fore.YELLOW}[NOTICE]{Style.RESET_ALL} {validation_note}")
+    if command_line.apply and any(planned_device["changed"] for planned_device in planned_devices):
+        status_logger.info(f"{Fore.YELLOW}Interrupt changes take effect after the devices restart (reboot).{Style.RESET_ALL}")
+
+
+def report_memory_action(memory_status, policy_action):
+    available_mb = memory_status["available_bytes"] / (1024 * 1024)
+    if policy_action["action"] == "pressure_on":
+        status_logger.info(f"  {Fore.YELLOW}[PRESSURE]{Style.RESET_ALL} Available memory {policy_action['available_percent']:.1f}% ({available_mb:.0f} MB), trimming background processes")
+    elif policy_action["action"] == "pressure_off":
+        status_logger.info(f"  {Fore.GREEN}[RELIEVED]{Style.RESET_ALL} Available memory back to {policy_action['available_percent']:.1f}% ({available_mb:.0f} MB)")
+    elif "error" in policy_action:
+        target = f"{policy_action['name']} (pid {policy_action['pid']})" if policy_action["action"] == "trim" else "standby list"
+        status_logger.error(f"  {Fore.RED}[ERROR]{Style.RESET_ALL} {target}: {policy_action['error']}")
+    elif policy_action["action"] == "trim":
+        status_logger.info(
+            f"  {Fore.GREEN}[TRIMMED]{Style.RESET_ALL} {policy_action['name']} (pid {policy_action['pid']}): "
+            f"{policy_action['reclaimed_bytes'] / (1024 * 1024):.1f} MB reclaimed"
+        )
+    elif policy_action["action"] == "purge":
+        status_logger.info(f"  {Fore.GREEN}[PURGED]{Style.RESET_ALL} Standby list: {policy_action['reclaimed_bytes'] / (1024 * 1024):.1f} MB released")
+
+
+def run_memory_manager_command(command_line):
+    if command_line.simulate:
+        gigabyte = 1024 ** 3
+        memory_backend = SimulatedMemoryBackend(
+            16 * gigabyte, 5 * gigabyte, 3 * gigabyte, 2 * gigabyte,
+            processes=[
+                {"pid": 4100, "name": "Discord.exe", "working_set_bytes": 600 * 1024 * 1024},
+                {"pid": 4200, "name": "chrome.exe", "working_set_bytes": 900 * 1024 * 1024},
+                {"pid": 4300, "name": "game.exe", "working_set_bytes": 6 * gigabyte}
+            ],
+            drift_bytes=256 * 1024 * 1024
+        )
+    else:
+        memory_backend = WindowsMemoryBackend()
+
+    memory_manager = MemoryPressureManager(
+        memory_backend, command_line.processes, command_line.trim_below, command_line.trim_above,
+        command_line.min_working_set, command_line.trim_cooldown, command_line.purge_free_below,
+        command_line.purge_standby_above, command_line.purge_cooldown
+    )
+    status_logger.info(
+        f"Memory manager: checking every {command_line.interval:g}s, trimming below {command_line.trim_below:g}% "
+        f"available until {command_line.trim_above:g}% (Ctrl+C to stop)"
+    )
+    try:
+        reclaim_statistics = memory_manager.run(command_line.interval, command_line.duration, report_memory_action)
+    except OSError as error:
+        status_logger.error(f"{Fore.RED}Memory manager: {error}{Style.RESET_ALL}")
+        sys.exit(1)
+    status_logger.info(
+        f"Memory manager: {reclaim_statistics['trims']} trims ({reclaim_statistics['trimmed_bytes'] / (1024 * 1024):.0f} MB), "
+        f"{reclaim_statistics['purges']} standby purges ({reclaim_statistics['purged_bytes'] / (1024 * 1024):.0f} MB), "
+        f"{reclaim_statistics['errors']} errors"
+    )
+
+
+def run_tuning_command(command_line):
+    tunable_parameters = [
+        parameter for parameter in TUNABLE_CATALOG_PARAMETERS
+        if not command_line.parameters or parameter["parameter_name"] in command_line.parameters
+    ]
+
+    if command_line.simulate:
+        registry_backend = SimulatedRegistryBackend()
+        objective = SyntheticLatencyObjective(tunable_parameters, command_line.percentile, command_line.seed)
+        graphics_card_type = command_line.graphics or "Simulated"
+    else:
+        if not command_line.workload:
+            status_logger.error(f"{Fore.RED}tune needs --workload (or --simulate for an offline run).{Style.RESET_ALL}")
+            sys.exit(2)
+        optimizer_instance = WindowsPerformanceOptimizer(command_line.graphics, command_line.storage, command_timeout_seconds=command_line.command_timeout)
+        if not optimizer_instance.check_administrative_privileges():
+            status_logger.error(f"{Fore.RED}Administrative privileges are required to tune registry values.{Style.RESET_ALL}")
+            sys.exit(1)
+        registry_backend = WindowsRegistryBackend()
+        objective = WorkloadLatencyObjective(optimizer_instance.command_runner, command_line.workload, command_line.percentile, command_line.command_timeout)
+        graphics_card_type = optimizer_instance.graphics_card_type
+
+    tuner = SuccessiveHalvingTuner(
+        registry_backend, objective, tunable_parameters, command_line.candidates,
+        command_line.reduction_factor, command_line.min_budget, command_line.settle, command_line.seed
+    )
+    status_logger.info(f"Tuning: {', '.join(parameter['parameter_name'] for parameter in tunable_parameters)}")
+    status_logger.info(f"Objective: {objective.describe()}")
+
+    original_values = tuner.capture_original_values()
+    try:
+        tuning_result = tuner.run()
+    finally:
+        tuner.restore_original_values(original_values)
+
+    for parameter_name, parameter_value in tuning_result["values"].items():
+        status_logger.info(f"  {Fore.GREEN}[BEST]{Style.RESET_ALL} {parameter_name} = {parameter_value}")
+    profile_path = save_tuned_profile(
+        tuning_result, tunable_parameters, describe_hardware_fingerprint(graphics_card_type), objective.describe(), command_line.profile_dir
+    )
+    status_logger.info(
+        f"Tuning: score {tuning_result['score']:.3f} after {tuning_result['workload_runs']} workload runs, profile saved to {profile_path}"
+    )
+
+
+def run_snapshot_command(command_line):
+    snapshot_started_at = time.perf_counter()
+    registry_backend = WindowsRegistryBackend()
+    key_blocks = []
+    for hive_root, registry_path, required_fragment in SNAPSHOT_SUBTREES:
+        subtree_blocks = list(walk_registry_subtree(registry_backend, hive_root, registry_path, required_fragment))
+        status_logger.info(f"  {Fore.GREEN}[COMPLETED]{Style.RESET_ALL} {REGISTRY_HIVE_NAMES[hive_root]}\\{registry_path}: {len(subtree_blocks)} keys")
+        key_blocks.extend(subtree_blocks)
+    key_count, value_count = RegistrySnapshotCodec().write(command_line.output_path, key_blocks)
+    status_logger.info(
+        f"Snapshot: {key_count} keys, {value_count} values written to {command_line.output_path} "
+        f"in {time.perf_counter() - snapshot_started_at:.2f}s"
+    )
+
+
+def run_snapshot_diff_command(command_line):
+    diff_started_at = time.perf_counter()
+    snapshot_codec = RegistrySnapshotCodec()
+    change_counts = {"added": 0, "removed": 0, "changed": 0}
+    change_colors = {"added": Fore.GREEN, "removed": Fore.RED, "changed": Fore.YELLOW}
+    json_file = open(command_line.json_path, "w", encoding="utf-8") if command_line.json_path else None
+
+    try:
+        for change_kind, full_key_path, entry_name, old_value, new_value in snapshot_codec.diff(
+            command_line.old_snapshot_path, command_line.new_snapshot_path
+        ):
+            change_counts[change_kind] += 1
+            old_text = snapshot_codec.decode_value(old_value[1], old_value[0]) if old_value else None
+            new_text = snapshot_codec.decode_value(new_value[1], new_value[0]) if new_value else None
+            if json_file:
+                json_file.write(json.dumps({
+                    "change": change_kind, "key": full_key_path, "entry_name": entry_name,
+                    "old_value": old_text, "new_value": new_text,
+                    "old_type": REGISTRY_TYPE_NAMES.get(old_value[0], old_value[0]) if old_value else None,
+                    "new_type": REGISTRY_TYPE_NAMES.get(new_value[0], new_value[0]) if new_value else None
+                }, ensure_ascii=False) + "\n")
+            if not command_line.limit or sum(change_counts.values()) <= command_line.limit:
+                status_logger.info(
+                    f"  {change_colors[change_kind]}[{change_kind.upper()}]{Style.RESET_ALL} "
+                    f"{full_key_path}\\{entry_name or '(Default)'}: {old_text!r} -> {new_text!r}"
+                )
+    finally:
+        if json_file:
+            json_file.close()
+
+    status_logger.info(
+        f"Snapshot diff: {change_counts['added']} added, {change_counts['removed']} removed, "
+        f"{change_counts['changed']} changed in {time.perf_counter() - diff_started_at:.2f}s"
+    )
 
-        print("\n" + Fore.CYAN + "="*60 + Style.RESET_ALL)
-        print(f"  {Fore.GREEN}✓ All performance optimizations have been applied successfully.{Style.RESET_ALL}")
-        print(f"  {Fore.RED}⚠ A FULL SYSTEM RESTART IS MANDATORY FOR ALL CHANGES TO TAKE EFFECT.{Style.RESET_ALL}")
-        print(Fore.CYAN + "="*60 + Style.RESET_ALL + "\n")
-        
-        input(f"{Fore.YELLOW}Оптимизация завершена. Нажмите Enter, чтобы закрыть программу...{Style.RESET_ALL}")
 
 if __name__ == "__main__":
-    optimizer_instance = WindowsPerformanceOptimizer()
-    optimizer_instance.start_optimization_sequence()
+    command_line = parse_command_line_arguments()
+
+    if command_line.command == "tune":
+        run_tuning_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "reg-to-catalog":
+        catalog_entries = RegistryFileCodec().parse_paths(command_line.registry_file_paths)
+        print(json.dumps([describe_catalog_entry(entry) for entry in catalog_entries], indent=2, ensure_ascii=False))
+        sys.exit(0)
+
+    if command_line.command == "game-profile" and command_line.action != "compile":
+        run_game_profile_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "memory-manager":
+        run_memory_manager_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "interrupts":
+        run_interrupt_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "snapshot":
+        run_snapshot_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "snapshot-diff":
+        run_snapshot_diff_command(command_line)
+        sys.exit(0)
+
+    if command_line.command == "monitor" and command_line.dump:
+        sys.exit(0 if dump_binary_metric_log(command_line.binary_log) else 1)
+
+    if command_line.command == "monitor":
+        metrics_sampler = RealTimeMetricsSampler(
+            command_line.rate, command_line.window, command_line.export_interval,
+            command_line.textfile, command_line.binary_log, command_line.top
+        )
+        status_logger.info(f"Monitor: sampling at {command_line.rate:g} Hz, exporting to {command_line.textfile} (Ctrl+C to stop)")
+        sample_count = metrics_sampler.run(command_line.duration)
+        status_logger.info(f"Monitor: {sample_count} samples, sampler CPU {metrics_sampler.sampler_cpu_percent:.2f}% of one core")
+        sys.exit(0)
+
+    optimizer_instance = WindowsPerformanceOptimizer(
+        command_line.graphics, command_line.storage, command_line.apply_method,
+        command_line.command_timeout, command_line.run_budget
+    )
+    optimizer_instance.run_report_path = command_line.report
+    optimizer_instance.hot_apply = command_line.hot_apply
+    optimizer_instance.checkpoint_path = command_line.checkpoint
+    optimizer_instance.resume_run = command_line.resume
+    if command_line.tuned_profile:
+        optimizer_instance.apply_tuned_profile(command_line.tuned_profile, command_line.ignore_fingerprint)
+
+    if command_line.command == "compile-reg":
+        optimization_plan = optimizer_instance.compile_optimization_plan(command_line.stages)
+        bundle_entries, direct_entries = optimizer_instance.build_registry_bundle_entries(
+            optimizer_instance.plan_compiler.plan_to_catalog_entries(optimization_plan) + optimization_plan["subkey_templates"]
+        )
+        optimizer_instance.registry_codec.write_bundle(bundle_entries, command_line.output_path)
+        status_logger.info(f"Bundle: {len(bundle_entries)} keys written to {command_line.output_path}")
+        for optimization_entry in direct_entries:
+            status_logger.info(f"  {Fore.YELLOW}[NOT BUNDLED]{Style.RESET_ALL} {optimization_entry['task_description']}")
+        for service_name in optimization_plan["service_start_types"]:
+            status_logger.info(f"  {Fore.YELLOW}[NOT BUNDLED]{Style.RESET_ALL} {service_name} start type (applied through the SCM)")
+    elif command_line.command == "compile-plan":
+        optimization_plan = optimizer_instance.compile_optimization_plan(command_line.stages)
+        optimizer_instance._report_plan_diagnostics(optimization_plan)
+        with open(command_line.output_path, "w", encoding="utf-8") as plan_file:
+            json.dump(optimizer_instance.plan_compiler.describe_plan(optimization_plan), plan_file, indent=2, ensure_ascii=False)
+        status_logger.info(f"Plan written to {command_line.output_path}")
+    elif command_line.command == "game-profile":
+        run_game_profile_command(command_line, optimizer_instance)
+    elif command_line.command == "apply-user-profiles":
+        if not optimizer_instance.check_administrative_privileges():
+            status_logger.error(f"{Fore.RED}Administrative privileges are required to load user hives.{Style.RESET_ALL}")
+            sys.exit(1)
+        optimizer_instance.apply_catalog_to_user_profiles(command_line.stages, command_line.include_default)
+    elif command_line.command == "install-network-drivers":
+        if not optimizer_instance.check_administrative_privileges():
+            status_logger.error(f"{Fore.RED}Administrative privileges are required to install drivers.{Style.RESET_ALL}")
+            sys.exit(1)
+        optimizer_instance.install_network_drivers(
+            command_line.driver_dir, command_line.installer_timeout, command_line.skip_installers, command_line.discovery_interval
+        )
+    elif command_line.command == "benchmark-reg":
+        optimizer_instance.benchmark_registry_apply_methods(command_line.keys, command_line.values)
+    else:
+        optimizer_instance.start_optimization_sequence()
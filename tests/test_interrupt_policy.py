@@ -0,0 +1,102 @@
+import antweaker
+
+HKLM = antweaker.winreg.HKEY_LOCAL_MACHINE
+GPU_INSTANCE_PATH = rf"{antweaker.PCI_ENUM_PATH}\VEN_10DE&DEV_2684\4&1a2b3c4d&0&0008"
+NIC_INSTANCE_PATH = rf"{antweaker.PCI_ENUM_PATH}\VEN_8086&DEV_15F3\4&5e6f7a8b&0&00E0"
+
+
+def build_simulated_hive(msi_capable=True):
+    registry_backend = antweaker.SimulatedRegistryBackend()
+    for instance_path, category, device_description in (
+        (GPU_INSTANCE_PATH, "gpu", "NVIDIA GeForce RTX 4090"),
+        (NIC_INSTANCE_PATH, "nic", "Intel(R) Ethernet Controller I225-V")
+    ):
+        class_guid = antweaker.INTERRUPT_POLICY_DEFAULTS[category]["class_guid"]
+        registry_backend.write_value(HKLM, instance_path, "ClassGUID", class_guid, antweaker.winreg.REG_SZ)
+        registry_backend.write_value(HKLM, instance_path, "DeviceDesc", device_description, antweaker.winreg.REG_SZ)
+        registry_backend.create_key(HKLM, f"{instance_path}\\Control")
+        if msi_capable:
+            registry_backend.create_key(HKLM, f"{instance_path}\\{antweaker.MSI_PROPERTIES_SUBPATH}")
+    return registry_backend
+
+
+def plan_devices(policy_engine, policy_overrides):
+    interrupt_policy = antweaker.load_interrupt_policy(device_categories=["gpu", "nic"])
+    for category, overrides in policy_overrides.items():
+        interrupt_policy[category].update(overrides)
+    planned_devices = policy_engine.plan(interrupt_policy, policy_engine.enumerate_pci_devices(interrupt_policy))
+    return {planned_device["category"]: planned_device for planned_device in planned_devices}
+
+
+def test_msi_mode_is_enabled_and_reverted():
+    registry_backend = build_simulated_hive()
+    policy_engine = antweaker.InterruptPolicyEngine(registry_backend, logical_cpu_count=8, physical_core_count=8)
+
+    planned_devices = plan_devices(policy_engine, {"gpu": {"affinity": None}, "nic": {"affinity": None}})
+    assert planned_devices["gpu"]["before"]["msi_supported"] is None
+    policy_engine.apply(list(planned_devices.values()))
+    assert registry_backend.read_value(HKLM, f"{GPU_INSTANCE_PATH}\\{antweaker.MSI_PROPERTIES_SUBPATH}", "MSISupported") == (1, antweaker.winreg.REG_DWORD)
+    assert policy_engine.read_interrupt_state(NIC_INSTANCE_PATH)["msi_supported"] == 1
+
+    planned_devices = plan_devices(policy_engine, {"gpu": {"msi": False, "affinity": None}, "nic": {"msi": False, "affinity": None}})
+    assert planned_devices["gpu"]["changed"]
+    policy_engine.apply(list(planned_devices.values()))
+    assert policy_engine.read_interrupt_state(GPU_INSTANCE_PATH)["msi_supported"] == 0
+    assert policy_engine.read_interrupt_state(NIC_INSTANCE_PATH)["msi_supported"] == 0
+
+
+def test_msi_is_not_forced_on_drivers_without_the_msi_key():
+    policy_engine = antweaker.InterruptPolicyEngine(build_simulated_hive(msi_capable=False), logical_cpu_count=8, physical_core_count=8)
+
+    planned_devices = plan_devices(policy_engine, {"gpu": {"affinity": None}, "nic": {"affinity": None}})
+
+    assert not planned_devices["gpu"]["changed"]
+    assert any("MSI support" in validation_note for validation_note in planned_devices["gpu"]["notes"])
+
+
+def test_affinity_mask_is_encoded_as_little_endian_kaffinity():
+    registry_backend = build_simulated_hive()
+    policy_engine = antweaker.InterruptPolicyEngine(registry_backend, logical_cpu_count=16, physical_core_count=8)
+
+    planned_devices = plan_devices(policy_engine, {"gpu": {"affinity": [2, 9]}, "nic": {"affinity": "auto"}})
+    policy_engine.apply(list(planned_devices.values()))
+
+    affinity_path = f"{GPU_INSTANCE_PATH}\\{antweaker.AFFINITY_POLICY_SUBPATH}"
+    assert registry_backend.read_value(HKLM, affinity_path, "AssignmentSetOverride") == (
+        bytes([0x04, 0x02, 0, 0, 0, 0, 0, 0]), antweaker.winreg.REG_BINARY
+    )
+    assert registry_backend.read_value(HKLM, affinity_path, "DevicePolicy")[0] == antweaker.IRQ_POLICY_SPECIFIED_PROCESSORS
+    assert policy_engine.read_interrupt_state(GPU_INSTANCE_PATH)["assignment_mask"] == (1 << 2) | (1 << 9)
+    assert planned_devices["nic"]["target"]["assignment_mask"] == 1 << 2
+    assert antweaker.describe_affinity_mask((1 << 2) | (1 << 9)) == "CPU 2,9"
+
+
+def test_affinity_rejects_cpus_out_of_range_or_beyond_one_kaffinity():
+    registry_backend = build_simulated_hive()
+    policy_engine = antweaker.InterruptPolicyEngine(registry_backend, logical_cpu_count=128, physical_core_count=64)
+
+    for affinity_setting, expected_note in (
+        ([200], "not present"),
+        ([70], "outside the first 64"),
+        ([-1], "non-negative integers"),
+        (["3"], "non-negative integers"),
+        ("1,2", "must be \"auto\"")
+    ):
+        planned_devices = plan_devices(policy_engine, {"gpu": {"msi": None, "affinity": affinity_setting}, "nic": {"msi": None, "affinity": None}})
+        assert not planned_devices["gpu"]["changed"]
+        assert planned_devices["gpu"]["target"]["assignment_mask"] == 0
+        assert any(expected_note in validation_note for validation_note in planned_devices["gpu"]["notes"])
+
+    assert max(policy_engine._automatic_affinity_cpus()) < antweaker.KAFFINITY_BITS
+
+
+def test_apply_refuses_masks_wider_than_kaffinity():
+    registry_backend = build_simulated_hive()
+    policy_engine = antweaker.InterruptPolicyEngine(registry_backend, logical_cpu_count=128, physical_core_count=64)
+    planned_device = plan_devices(policy_engine, {"gpu": {"msi": None, "affinity": None}, "nic": {"msi": None, "affinity": None}})["gpu"]
+    planned_device.update(changed=True, target=dict(planned_device["before"], device_policy=antweaker.IRQ_POLICY_SPECIFIED_PROCESSORS, assignment_mask=1 << 70))
+
+    policy_engine.apply([planned_device])
+
+    assert any("does not fit" in validation_note for validation_note in planned_device["notes"])
+    assert policy_engine.read_interrupt_state(GPU_INSTANCE_PATH)["assignment_mask"] == 0
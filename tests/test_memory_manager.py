@@ -0,0 +1,93 @@
+import antweaker
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+def make_backend(available_percent, processes, free_bytes=4 * GB, standby_bytes=1 * GB, trim_fraction=0.6):
+    total_bytes = 16 * GB
+    return antweaker.SimulatedMemoryBackend(
+        total_bytes, int(total_bytes * available_percent / 100), free_bytes, standby_bytes,
+        processes=[dict(process) for process in processes], trim_fraction=trim_fraction
+    )
+
+
+def run_manager(memory_manager, duration_seconds=0.05):
+    recorded_actions = []
+    memory_manager.run(
+        poll_interval_seconds=0.01, duration_seconds=duration_seconds,
+        action_callback=lambda memory_status, policy_action: recorded_actions.append(policy_action)
+    )
+    return recorded_actions
+
+
+def test_run_purges_standby_once_when_free_memory_crosses_threshold():
+    memory_backend = make_backend(60, [], free_bytes=512 * MB, standby_bytes=3 * GB)
+    memory_manager = antweaker.MemoryPressureManager(memory_backend)
+
+    recorded_actions = run_manager(memory_manager)
+
+    purge_actions = [policy_action for policy_action in recorded_actions if policy_action["action"] == "purge"]
+    assert len(purge_actions) == 1
+    assert purge_actions[0]["reclaimed_bytes"] == 3 * GB
+    assert memory_backend.standby_bytes == 0
+    assert memory_manager.reclaim_statistics["purges"] == 1
+
+
+def test_run_does_not_purge_while_free_memory_is_above_threshold():
+    memory_backend = make_backend(60, [], free_bytes=4 * GB, standby_bytes=6 * GB)
+    memory_manager = antweaker.MemoryPressureManager(memory_backend)
+
+    recorded_actions = run_manager(memory_manager)
+
+    assert not [policy_action for policy_action in recorded_actions if policy_action["action"] == "purge"]
+
+
+def test_run_trims_background_processes_largest_first():
+    memory_backend = make_backend(5, [
+        {"pid": 10, "name": "Discord.exe", "working_set_bytes": 300 * MB},
+        {"pid": 11, "name": "chrome.exe", "working_set_bytes": 800 * MB},
+        {"pid": 12, "name": "Spotify.exe", "working_set_bytes": 50 * MB},
+        {"pid": 13, "name": "game.exe", "working_set_bytes": 2 * GB}
+    ], trim_fraction=0.1)
+    memory_manager = antweaker.MemoryPressureManager(memory_backend)
+
+    recorded_actions = run_manager(memory_manager)
+
+    trimmed_pids = [policy_action["pid"] for policy_action in recorded_actions if policy_action["action"] == "trim"]
+    assert recorded_actions[0]["action"] == "pressure_on"
+    assert trimmed_pids == [11, 10]
+
+
+def test_trimming_stops_once_pressure_is_relieved():
+    memory_backend = make_backend(14, [
+        {"pid": 20, "name": "chrome.exe", "working_set_bytes": 3 * GB},
+        {"pid": 21, "name": "Discord.exe", "working_set_bytes": 1 * GB}
+    ])
+    memory_manager = antweaker.MemoryPressureManager(memory_backend)
+
+    recorded_actions = run_manager(memory_manager)
+
+    trimmed_pids = [policy_action["pid"] for policy_action in recorded_actions if policy_action["action"] == "trim"]
+    assert trimmed_pids == [20]
+    assert memory_backend.processes[1]["working_set_bytes"] == 1 * GB
+    assert recorded_actions[-1]["action"] == "pressure_off"
+
+
+def test_trim_history_is_pruned_for_exited_and_cooled_down_processes():
+    memory_backend = make_backend(5, [
+        {"pid": 30, "name": "chrome.exe", "working_set_bytes": 800 * MB},
+        {"pid": 31, "name": "msedge.exe", "working_set_bytes": 600 * MB}
+    ], trim_fraction=0.1)
+    memory_manager = antweaker.MemoryPressureManager(memory_backend, trim_cooldown_seconds=120)
+
+    memory_manager.evaluate(current_time=0)
+    assert set(memory_manager.last_trim_at) == {30, 31}
+
+    memory_backend.processes = [process for process in memory_backend.processes if process["pid"] != 31]
+    memory_manager.evaluate(current_time=10)
+    assert set(memory_manager.last_trim_at) == {30}
+
+    memory_backend.available_bytes = memory_backend.total_bytes // 2
+    memory_manager.evaluate(current_time=200)
+    assert memory_manager.last_trim_at == {}
@@ -0,0 +1,37 @@
+import antweaker
+
+REG_EXPAND_SZ = antweaker.winreg.REG_EXPAND_SZ
+REG_MULTI_SZ = antweaker.winreg.REG_MULTI_SZ
+
+
+def parse_single_value(header, value_line):
+    file_text = "\r\n".join([header, "", r"[HKEY_LOCAL_MACHINE\SOFTWARE\ANTweaker]", value_line, ""])
+    catalog_entry, = antweaker.RegistryFileCodec().parse_text(file_text)
+    return catalog_entry["entry_value"], catalog_entry["data_type"]
+
+
+def test_regedit4_strings_are_single_byte():
+    expand_value = parse_single_value("REGEDIT4", '"Path"=hex(2):25,53,79,73,74,65,6d,52,6f,6f,74,25,00')
+    multi_value = parse_single_value("REGEDIT4", '"Items"=hex(7):61,00,62,63,00,00')
+    assert expand_value == ("%SystemRoot%", REG_EXPAND_SZ)
+    assert multi_value == (["a", "bc"], REG_MULTI_SZ)
+
+
+def test_version5_strings_are_utf16():
+    expand_value = parse_single_value(antweaker.RegistryFileCodec.HEADER_UNICODE, '"Path"=hex(2):25,00,54,00,25,00,00,00')
+    assert expand_value == ("%T%", REG_EXPAND_SZ)
+
+
+def test_multi_string_keeps_empty_items():
+    assert parse_single_value("REGEDIT4", '"Items"=hex(7):61,00,00,62,00,00') == (["a", "", "b"], REG_MULTI_SZ)
+    assert parse_single_value("REGEDIT4", '"Items"=hex(7):00') == ([], REG_MULTI_SZ)
+
+
+def test_multi_string_round_trips_through_bundle():
+    registry_codec = antweaker.RegistryFileCodec()
+    catalog_entry = {
+        "registry_path": r"SOFTWARE\ANTweaker", "entry_name": "Items", "entry_value": ["", "a", "", "b", ""],
+        "data_type": REG_MULTI_SZ, "hive_root": antweaker.winreg.HKEY_LOCAL_MACHINE
+    }
+    parsed_entry, = registry_codec.parse_text(registry_codec.compile_entries([catalog_entry]))
+    assert parsed_entry["entry_value"] == catalog_entry["entry_value"]
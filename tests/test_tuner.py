@@ -0,0 +1,77 @@
+import json
+import math
+
+import antweaker
+
+BOOT_ONLY_PARAMETERS = {"AdditionalCriticalWorkerThreads", "TcpAckFrequency"}
+
+
+def test_successive_halving_converges_on_synthetic_optimum():
+    tunable_parameters = antweaker.TUNABLE_CATALOG_PARAMETERS
+    grid_size = math.prod(len(parameter["candidate_values"]) for parameter in tunable_parameters)
+    synthetic_objective = antweaker.SyntheticLatencyObjective(tunable_parameters, seed=0, samples_per_budget=400)
+    tuner = antweaker.SuccessiveHalvingTuner(
+        antweaker.SimulatedRegistryBackend(), synthetic_objective, tunable_parameters, candidate_count=grid_size, seed=0
+    )
+
+    tuning_result = tuner.run()
+
+    assert tuning_result["values"] == {
+        parameter["parameter_name"]: parameter["candidate_values"][synthetic_objective.hidden_optimum[parameter["parameter_name"]]]
+        for parameter in tunable_parameters
+    }
+    assert tuning_result["history"][0]["evaluated"] == grid_size
+    assert tuning_result["history"][-1]["evaluated"] == 1
+
+
+def test_boot_only_parameters_are_not_tunable():
+    tunable_names = {parameter["parameter_name"] for parameter in antweaker.TUNABLE_CATALOG_PARAMETERS}
+    tunable_entries = {parameter["entry_name"].lower() for parameter in antweaker.TUNABLE_CATALOG_PARAMETERS}
+
+    assert not tunable_names & BOOT_ONLY_PARAMETERS
+    assert not tunable_entries & {parameter_name.lower() for parameter_name in BOOT_ONLY_PARAMETERS}
+
+
+def write_tuned_profile(profile_path, hardware_fingerprint):
+    profile_path.write_text(json.dumps({
+        "hardware_fingerprint": hardware_fingerprint,
+        "entries": [{
+            "registry_path": r"SYSTEM\ControlSet001\Control\PriorityControl",
+            "entry_name": "Win32PrioritySeparation",
+            "entry_value": 0x1A,
+            "data_type": "REG_DWORD",
+            "hive_root": "HKEY_LOCAL_MACHINE"
+        }]
+    }), encoding="utf-8")
+    return str(profile_path)
+
+
+def win32_priority_separation_values(optimizer_instance):
+    return [
+        optimization_entry.get("multiple_entries", {}).get("Win32PrioritySeparation", optimization_entry.get("entry_value"))
+        for _, _, stage_entries in optimizer_instance.collect_registry_stages()
+        for optimization_entry in stage_entries
+        if "Win32PrioritySeparation" in optimization_entry.get("multiple_entries", {})
+        or optimization_entry.get("entry_name") == "Win32PrioritySeparation"
+    ]
+
+
+def test_apply_tuned_profile_checks_hardware_fingerprint(tmp_path):
+    optimizer_instance = antweaker.WindowsPerformanceOptimizer("NVIDIA", "SSD")
+    catalog_values = win32_priority_separation_values(optimizer_instance)
+    assert catalog_values and 0x1A not in catalog_values
+
+    foreign_fingerprint = dict(antweaker.describe_hardware_fingerprint("NVIDIA"), logical_cores=4096)
+    assert optimizer_instance.apply_tuned_profile(write_tuned_profile(tmp_path / "foreign.json", foreign_fingerprint)) == 0
+    assert win32_priority_separation_values(optimizer_instance) == catalog_values
+
+    local_fingerprint = antweaker.describe_hardware_fingerprint("NVIDIA")
+    assert optimizer_instance.apply_tuned_profile(write_tuned_profile(tmp_path / "local.json", local_fingerprint)) > 0
+    assert set(win32_priority_separation_values(optimizer_instance)) == {0x1A}
+
+
+def test_apply_tuned_profile_can_ignore_fingerprint(tmp_path):
+    optimizer_instance = antweaker.WindowsPerformanceOptimizer("NVIDIA", "SSD")
+    foreign_fingerprint = dict(antweaker.describe_hardware_fingerprint("NVIDIA"), graphics="AMD")
+
+    assert optimizer_instance.apply_tuned_profile(write_tuned_profile(tmp_path / "foreign.json", foreign_fingerprint), ignore_fingerprint=True) > 0